@@ -13,7 +13,9 @@ if backend_dir not in sys.path:
 
 from langgraph.graph import StateGraph, START, END
 from agent.state import AgentState
-from agent.nodes import classify_intent_node, query_node, generate_response_node
+from app.turn_memo import turn_scope
+from agent.nodes import classify_intent_node, query_node, generate_response_node, route_after_classify
+from nlu.conversation_memory import update_memory
 
 logger = logging.getLogger(__name__)
 
@@ -35,7 +37,12 @@ class BookingAgent:
         
         # Define edges
         self.workflow.add_edge(START, "classify_intent")
-        self.workflow.add_edge("classify_intent", "query")
+        # Fused NLU replies skip the query/response round (see NLU_FUSED_MODE)
+        self.workflow.add_conditional_edges(
+            "classify_intent",
+            route_after_classify,
+            {"query": "query", "done": END}
+        )
         self.workflow.add_edge("query", "generate_response")
         self.workflow.add_edge("generate_response", END)
         
@@ -56,6 +63,29 @@ class BookingAgent:
         Returns:
             Agent response string
         """
+        result = await self.process_turn(user_phone, message, conversation_history)
+        return result["response"]
+    
+    async def process_turn(
+        self,
+        user_phone: str,
+        message: str,
+        conversation_history: list = None,
+        memory: dict = None
+    ) -> dict:
+        """
+        Process a user message and fold the turn into the conversation memory
+        
+        Args:
+            user_phone: User's phone number
+            message: User's message
+            conversation_history: Previous conversation messages
+            memory: Conversation memory stored with the session (None for a new
+                session or callers that don't keep one - prompts then use the history)
+        
+        Returns:
+            {"response": agent response string, "memory": updated memory to store}
+        """
         try:
             logger.info(f"Processing message from {user_phone}: {message}")
             
@@ -79,7 +109,9 @@ class BookingAgent:
                 "booking_in_progress": False,
                 "vendor_id": None,
                 "vendor_data": None,
+                "memory": memory,
                 "query_result": None,
+                "booking_result": None,
                 "response": ""
             }
             
@@ -103,7 +135,9 @@ class BookingAgent:
             except Exception:
                 pass
             # #endregion
-            final_state = await self.app.ainvoke(initial_state)
+            # One memo per turn: lookups repeated across nodes hit Firestore once
+            with turn_scope():
+                final_state = await self.app.ainvoke(initial_state)
             # #region agent log
             try:
                 log_entry = {
@@ -142,11 +176,11 @@ class BookingAgent:
             
             logger.info(f"Agent response: {response[:100]}...")
             
-            return response
+            return {"response": response, "memory": update_memory(memory, final_state)}
             
         except Exception as e:
             logger.error(f"Error processing message: {e}")
             import traceback
             logger.error(f"Traceback: {traceback.format_exc()}")
-            return "Sorry, I encountered an error. Please try again."
+            return {"response": "Sorry, I encountered an error. Please try again.", "memory": memory}
 
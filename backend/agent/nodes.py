@@ -9,7 +9,13 @@ from datetime import datetime, timedelta
 from agent.state import AgentState
 from agent.tools import check_availability, get_pricing, get_vendor_info, suggest_alternatives
 from agent.duration import parse_duration, calculate_price_for_duration, format_duration
+from nlu.datetime_parser import parse_datetime, parse_date, parse_time, parse_duration_hours
 from nlu.agent import NLUAgent
+from nlu.rules import rule_classifier
+from nlu.local_classifier import local_classifier
+from nlu.gemini_client import gemini_client
+from app.config import settings
+from app.metrics import metrics
 
 logger = logging.getLogger(__name__)
 
@@ -25,137 +31,52 @@ def debug_log(hypothesis_id: str, location: str, message: str, data: dict = None
 nlu_agent = NLUAgent()
 
 
+def degraded_classification(message: str, rule_result: Dict[str, Any] = None) -> Dict[str, Any]:
+    """
+    Classification without Gemini (circuit open)
+    
+    Low-confidence rule matches are accepted, and a message that carries
+    service and date ("padel kal 7 baje") is treated as an availability query
+    so the database lookup and slot template still run.
+    """
+    if rule_result and rule_result["confidence"] > 0:
+        result = dict(rule_result)
+    else:
+        result = {"intent": "unknown", "entities": rule_classifier.extract_entities(message), "confidence": 0.0}
+    
+    entities = result.get("entities", {})
+    if result["intent"] in ["unknown", "service_selection", "date_selection", "time_selection"] \
+            and entities.get("service_type") and entities.get("date"):
+        result["intent"] = "availability_inquiry"
+    return result
+
+
+def route_after_classify(state: AgentState) -> str:
+    """Turns answered by the fused NLU call end here; everything else goes to query"""
+    return "done" if state.get("response") else "query"
+
+
 def normalize_date(date_text: str) -> str:
     """
     Normalize date text to YYYY-MM-DD format
-    Handles: "tomorrow", "today", "kal", "Friday", "2025-12-17", etc.
+    Handles: "tomorrow", "today", "kal", "Friday", "agle Friday", "2025-12-17", etc.
+    (see nlu/datetime_parser.py)
     """
-    today = datetime.now()
-    date_lower = date_text.lower().strip()
-    
-    # First, check if it's already in YYYY-MM-DD format or contains a date
-    import re
-    
-    # Pattern for YYYY-MM-DD (with or without time/timezone)
-    date_pattern = r'(\d{4}-\d{2}-\d{2})'
-    match = re.search(date_pattern, date_text)
-    if match:
-        extracted_date = match.group(1)
-        # Validate it's a real date
-        try:
-            parsed = datetime.strptime(extracted_date, "%Y-%m-%d")
-            return extracted_date
-        except:
-            pass  # If invalid, continue to other checks
-    
-    # Handle relative dates
-    if date_lower in ["today", "aaj"]:
-        return today.strftime("%Y-%m-%d")
-    elif date_lower in ["tomorrow", "kal"]:
-        tomorrow = today + timedelta(days=1)
-        return tomorrow.strftime("%Y-%m-%d")
-    elif "day after tomorrow" in date_lower or "parson" in date_lower:
-        day_after = today + timedelta(days=2)
-        return day_after.strftime("%Y-%m-%d")
-    
-    # Try to parse full date formats like "December 15, 2025" or "15 December 2025"
-    date_formats = [
-        '%B %d, %Y',      # "December 15, 2025"
-        '%d %B %Y',       # "15 December 2025"
-        '%B %d %Y',       # "December 15 2025"
-        '%m/%d/%Y',       # "12/15/2025"
-        '%d/%m/%Y',       # "15/12/2025"
-    ]
-    
-    for fmt in date_formats:
-        try:
-            parsed = datetime.strptime(date_text, fmt)
-            return parsed.strftime("%Y-%m-%d")
-        except ValueError:
-            continue
-    
-    # Try to parse as day name (find next occurrence)
-    day_names = {
-        "monday": 0, "tuesday": 1, "wednesday": 2, "thursday": 3,
-        "friday": 4, "saturday": 5, "sunday": 6
-    }
-    for day_name, day_num in day_names.items():
-        if day_name in date_lower:
-            days_ahead = day_num - today.weekday()
-            if days_ahead <= 0:
-                days_ahead += 7
-            target_date = today + timedelta(days=days_ahead)
-            return target_date.strftime("%Y-%m-%d")
+    date = parse_date(date_text)
+    if date:
+        return date
     
     # Default to today if can't parse
     logger.warning(f"⚠️  Could not parse date '{date_text}', defaulting to today")
-    return today.strftime("%Y-%m-%d")
+    return datetime.now().strftime("%Y-%m-%d")
 
 def normalize_time(time_text: str) -> Dict[str, str]:
     """
     Normalize time text to time range dict
-    Handles: "evening", "shaam", "6-9", "after 6", etc.
+    Handles: "evening", "shaam", "6-9", "after 6", "7 baje", "8:30 pm", etc.
+    (see nlu/datetime_parser.py)
     """
-    time_lower = time_text.lower().strip()
-    
-    # Handle relative times
-    if "evening" in time_lower or "shaam" in time_lower:
-        return {"start": "18:00", "end": "23:00"}  # Evening is 6 PM to 11 PM
-    elif "morning" in time_lower or "subah" in time_lower:
-        return {"start": "09:00", "end": "12:00"}
-    elif "afternoon" in time_lower:
-        return {"start": "12:00", "end": "18:00"}
-    elif "night" in time_lower or "raat" in time_lower:
-        return {"start": "21:00", "end": "23:00"}
-    
-    # Handle "after X" pattern
-    if "after" in time_lower:
-        import re
-        match = re.search(r"after\s+(\d+)", time_lower)
-        if match:
-            hour = int(match.group(1))
-            return {"start": f"{hour:02d}:00"}
-    
-    # Handle time range "6-9" or "6:00-9:00"
-    if "-" in time_lower:
-        import re
-        match = re.search(r"(\d+)[:\s]?(\d+)?\s*-\s*(\d+)[:\s]?(\d+)?", time_lower)
-        if match:
-            start_hour = int(match.group(1))
-            end_hour = int(match.group(3))
-            return {"start": f"{start_hour:02d}:00", "end": f"{end_hour:02d}:00"}
-    
-    # Handle single time "7pm" or "19:00"
-    import re
-    pm_match = re.search(r"(\d+)\s*pm", time_lower)
-    am_match = re.search(r"(\d+)\s*am", time_lower)
-    if pm_match:
-        hour = int(pm_match.group(1))
-        if hour < 12:
-            hour += 12
-        return {"start": f"{hour:02d}:00", "end": f"{(hour+1):02d}:00"}
-    elif am_match:
-        hour = int(am_match.group(1))
-        return {"start": f"{hour:02d}:00", "end": f"{(hour+1):02d}:00"}
-    
-    # Handle Roman Urdu time patterns: "5 bajay", "5 baje", "5 bajay kei around"
-    bajay_match = re.search(r"(\d+)\s*baj(?:ay|e|ey)(?:\s+kei?\s+around)?", time_lower)
-    if bajay_match:
-        hour = int(bajay_match.group(1))
-        # Assume PM if hour is 1-11, AM if 12 or mentioned
-        if hour <= 11 and "subah" not in time_lower and "morning" not in time_lower:
-            hour += 12  # Assume PM
-        return {"start": f"{hour:02d}:00", "end": f"{(hour+1):02d}:00"}
-    
-    # Handle "around X" pattern
-    around_match = re.search(r"around\s+(\d+)", time_lower)
-    if around_match:
-        hour = int(around_match.group(1))
-        if hour <= 11:
-            hour += 12  # Assume PM
-        return {"start": f"{hour:02d}:00", "end": f"{(hour+1):02d}:00"}
-    
-    return None
+    return parse_time(time_text)
 
 
 async def classify_intent_node(state: AgentState) -> AgentState:
@@ -185,39 +106,61 @@ async def classify_intent_node(state: AgentState) -> AgentState:
         debug_log("A", "nodes.py:133", "Last message extracted", {"last_message": last_message, "message_type": type(last_message).__name__})
         # #endregion
         
-        # FALLBACK: Check for common greetings BEFORE calling NLU (avoids quota issues)
-        last_message_lower = last_message.lower().strip()
-        common_greetings = ["hi", "hello", "hey", "aoa", "salam", "salaam", "assalam", "assalamu", "assalamu alaikum"]
+        # Tier-1: deterministic rules for short formulaic messages ("Aoa", "han g", "kal", "6 baje")
+        last_assistant = next(
+            (msg.get("content") for msg in reversed(messages[:-1]) if msg.get("role") == "assistant"),
+            None
+        )
+        rule_result = rule_classifier.classify(last_message, last_assistant)
+        use_rules = bool(rule_result) and rule_result["confidence"] >= settings.NLU_RULES_CONFIDENCE_THRESHOLD
+        
+        if use_rules:
+            rule_classifier.record_accepted(rule_result)
+            logger.info(f"✅ Rule classifier: '{rule_result['intent']}' ({rule_result['rule']}, confidence {rule_result['confidence']})")
+        
+        conversation_history = [
+            {"role": msg.get("role"), "content": msg.get("content")}
+            for msg in messages[:-1]  # All except last message
+        ]
         
-        # Check if message is exactly a greeting or starts with a greeting word
-        is_greeting = (last_message_lower in common_greetings or 
-                      any(last_message_lower.startswith(greeting + " ") or last_message_lower == greeting 
-                          for greeting in common_greetings))
+        # Tier-1b: offline-trained local model (see scripts/train_intent_model.py),
+        # unless the rules deferred a negation / bare "nahi" to Gemini on purpose
+        skip_local = use_rules or bool(rule_result and rule_result["llm_only"])
+        local_result = None if skip_local else local_classifier.classify(last_message, conversation_history)
+        use_local = bool(local_result) and local_result["confidence"] >= settings.NLU_LOCAL_CONFIDENCE_THRESHOLD
+        if use_local:
+            logger.info(f"✅ Local classifier: '{local_result['intent']}' (confidence {local_result['confidence']})")
+        fast_result = rule_result if use_rules else local_result if use_local else None
         
-        if is_greeting:
+        if fast_result and fast_result["intent"] == "greeting":
             # #region agent log
-            debug_log("A", "nodes.py:142", "GREETING FALLBACK TRIGGERED", {"last_message": last_message, "detected_via": "fallback"})
+            debug_log("A", "nodes.py:142", "GREETING FALLBACK TRIGGERED", {"last_message": last_message, "detected_via": fast_result["source"]})
             # #endregion
-            logger.info(f"✅ Detected greeting via fallback: '{last_message}'")
             state["current_intent"] = "greeting"
             state["entities"] = {}
             state["vendor_id"] = "ace_padel_club"
             return state
         
-        # Extract intent and entities using NLU
-        conversation_history = [
-            {"role": msg.get("role"), "content": msg.get("content")}
-            for msg in messages[:-1]  # All except last message
-        ]
-        
-        # Use NLU agent - node is async so we can await
-        # #region agent log
-        debug_log("A", "nodes.py:155", "BEFORE NLU call", {"last_message": last_message, "history_len": len(conversation_history)})
-        # #endregion
-        nlu_result = await nlu_agent.extract_intent(last_message, conversation_history)
-        # #region agent log
-        debug_log("A", "nodes.py:144", "AFTER NLU call", {"nlu_result": nlu_result, "nlu_result_type": type(nlu_result).__name__})
-        # #endregion
+        if fast_result:
+            nlu_result = fast_result
+        elif gemini_client.degraded:
+            # Degraded mode: Gemini circuit is open - best rule guess instead of an LLM call
+            nlu_result = degraded_classification(last_message, rule_result)
+            metrics.inc('nlu_degraded_turns_total', intent=nlu_result["intent"])
+            logger.warning(f"⚠️  Gemini circuit open - degraded classification: '{nlu_result['intent']}'")
+        elif settings.NLU_FUSED_MODE:
+            # Tier-2 (fused): intent, entities and reply draft in one Gemini call
+            nlu_result = await nlu_agent.fused_turn(last_message, conversation_history, state.get("memory"))
+        else:
+            # Tier-2: Gemini
+            # Use NLU agent - node is async so we can await
+            # #region agent log
+            debug_log("A", "nodes.py:155", "BEFORE NLU call", {"last_message": last_message, "history_len": len(conversation_history)})
+            # #endregion
+            nlu_result = await nlu_agent.extract_intent(last_message, conversation_history, state.get("memory"))
+            # #region agent log
+            debug_log("A", "nodes.py:144", "AFTER NLU call", {"nlu_result": nlu_result, "nlu_result_type": type(nlu_result).__name__})
+            # #endregion
         
         # Extract intent and entities from NLU result
         intent = nlu_result.get("intent", "unknown")
@@ -251,6 +194,7 @@ async def classify_intent_node(state: AgentState) -> AgentState:
         
         # Normalize time if present (can be string or dict from NLU)
         time_value = entities.get("time")
+        time_kind = None
         if time_value:
             try:
                 if isinstance(time_value, dict):
@@ -259,7 +203,8 @@ async def classify_intent_node(state: AgentState) -> AgentState:
                     time_text = str(time_value)
                 
                 if time_text:
-                    time_range = normalize_time(time_text)
+                    parsed_time = parse_datetime(time_text)
+                    time_range, time_kind = parsed_time["time_range"], parsed_time["time_kind"]
                     if time_range:
                         entities["time_range"] = time_range
                         logger.info(f"✅ Normalized time: {time_range}")
@@ -267,28 +212,24 @@ async def classify_intent_node(state: AgentState) -> AgentState:
                 logger.warning(f"Time normalization failed: {e}, keeping original: {time_value}")
                 # Keep original value if normalization fails
         
-        # Parse duration if present (e.g., "30 mins", "1.5 hours", "1 ghanta")
-        duration_text = entities.get("duration")
-        if not duration_text:
-            # Check message for duration patterns (Roman Urdu: "1 ghanta")
-            last_message_lower = last_message.lower()
-            if "ghanta" in last_message_lower or "hour" in last_message_lower or "minute" in last_message_lower or "min" in last_message_lower:
-                duration_text = last_message
-        
-        if duration_text:
-            try:
-                duration_info = parse_duration(str(duration_text))
-                if duration_info:
-                    entities["duration_hours"] = duration_info["hours"]
-                    state["selected_duration"] = duration_info["hours"]
-                    logger.info(f"✅ Parsed duration: {duration_info['hours']} hours")
-            except Exception as e:
-                logger.warning(f"Duration parsing failed: {e}")
+        # Date, time and duration mentioned in the message itself (one tokenizer pass)
+        parsed_message = parse_datetime(last_message)
         
-        # Extract slot selection from message (e.g., "11-12", "11:00-12:00", "8 am", "8:00 am")
+        # Parse duration if present (e.g., "30 mins", "1.5 hours", "1 ghanta", "dedh ghanta")
+        duration_text = entities.get("duration")
+        duration_hours = parse_duration_hours(str(duration_text)) if duration_text else parsed_message["duration_hours"]
+        if duration_text and not duration_hours:
+            # Bare numbers ("30", "1.5") - legacy heuristic
+            duration_info = parse_duration(str(duration_text))
+            duration_hours = duration_info["hours"] if duration_info else None
+        
+        if duration_hours:
+            entities["duration_hours"] = duration_hours
+            state["selected_duration"] = duration_hours
+            logger.info(f"✅ Parsed duration: {duration_hours} hours")
+        
+        # Extract slot selection (e.g., "11-12", "11:00-12:00", "8 am", "7 baje")
         slot_match = None
-        last_message_lower = last_message.lower()
-        import re
         
         # First try to extract time from entities (already normalized)
         if entities.get("time") or entities.get("time_range"):
@@ -298,57 +239,28 @@ async def classify_intent_node(state: AgentState) -> AgentState:
                 if slot_time:
                     slot_match = {
                         "slot_time": slot_time,
-                        "end_time": time_data.get("end", "")
+                        "end_time": time_data.get("end", ""),
+                        "time_kind": time_kind
                     }
             elif isinstance(time_data, str):
                 # Try to normalize the time string
-                normalized = normalize_time(time_data)
+                parsed_time = parse_datetime(time_data)
+                normalized = parsed_time["time_range"]
                 if normalized:
                     slot_match = {
                         "slot_time": normalized.get("start", ""),
-                        "end_time": normalized.get("end", "")
+                        "end_time": normalized.get("end", ""),
+                        "time_kind": parsed_time["time_kind"]
                     }
         
-        # If no slot from entities, try direct extraction from message
-        if not slot_match:
-            # Pattern for "X am" or "X pm" (e.g., "8 am", "8:00 am")
-            am_pm_pattern = r"(\d{1,2})(?::(\d{2}))?\s*(am|pm)"
-            am_pm_match = re.search(am_pm_pattern, last_message_lower)
-            if am_pm_match:
-                hour = int(am_pm_match.group(1))
-                minute = int(am_pm_match.group(2)) if am_pm_match.group(2) else 0
-                period = am_pm_match.group(3)
-                
-                if period == "pm" and hour < 12:
-                    hour += 12
-                elif period == "am" and hour == 12:
-                    hour = 0
-                
-                slot_time = f"{hour:02d}:{minute:02d}"
-                # Default to 1 hour duration
-                end_hour = (hour + 1) % 24
-                end_time = f"{end_hour:02d}:{minute:02d}"
-                
-                slot_match = {
-                    "slot_time": slot_time,
-                    "end_time": end_time
-                }
-            else:
-                # Pattern for "X-Y" or "X:00-Y:00" time ranges
-                slot_pattern = r"(\d{1,2})[:\s-]+(\d{1,2})"
-                slot_m = re.search(slot_pattern, last_message)
-                if slot_m:
-                    try:
-                        start_hour = int(slot_m.group(1))
-                        end_hour = int(slot_m.group(2))
-                        # Assume 24-hour format if both are reasonable hours
-                        if start_hour < 24 and end_hour < 24:
-                            slot_match = {
-                                "slot_time": f"{start_hour:02d}:00",
-                                "end_time": f"{end_hour:02d}:00"
-                            }
-                    except (ValueError, IndexError) as e:
-                        logger.warning(f"Slot pattern parsing failed: {e}")
+        # If no slot from entities, use a clock time / range from the message itself
+        message_range = parsed_message["time_range"]
+        if not slot_match and message_range and parsed_message["time_kind"] not in (None, "period", "after"):
+            slot_match = {
+                "slot_time": message_range["start"],
+                "end_time": message_range.get("end", ""),
+                "time_kind": parsed_message["time_kind"]
+            }
         
         if slot_match:
             state["selected_slot"] = slot_match
@@ -374,6 +286,23 @@ async def classify_intent_node(state: AgentState) -> AgentState:
         # Set final state
         state["current_intent"] = intent
         state["entities"] = entities
+        
+        # Fused reply is final unless the turn needs the database (tool round)
+        fused_reply = nlu_result.get("reply")
+        if fused_reply:
+            lookup_context = {
+                "phone_number": state.get("user_phone", ""),
+                "selected_slot": state.get("selected_slot"),
+                "selected_date": state.get("selected_date"),
+                "conversation_history": conversation_history,
+                "memory": state.get("memory")
+            }
+            if nlu_result.get("needs_lookup") or nlu_agent.requires_lookup(intent, entities, lookup_context):
+                metrics.inc('nlu_fused_turns_total', route='lookup')
+            else:
+                metrics.inc('nlu_fused_turns_total', route='direct')
+                state["response"] = fused_reply
+                logger.info("⚡ Fused NLU reply used - skipping query and response generation")
         # #region agent log
         debug_log("A", "nodes.py:238", "BEFORE RETURN from classify_intent_node", {"state_intent": state.get("current_intent"), "state_intent_type": type(state.get("current_intent")).__name__, "state_intent_repr": repr(state.get("current_intent")), "state_keys": list(state.keys())})
         # #endregion
@@ -413,7 +342,15 @@ async def query_node(state: AgentState) -> AgentState:
         
         query_result = {"success": False}  # FIX: Initialize as dict, not None
         
-        if intent == "availability_inquiry" or intent == "booking_request":
+        if (intent == "availability_inquiry" or intent == "booking_request") \
+                and nlu_agent._should_check_availability(intent, entities):
+            # Service + date known: the single-vendor lookup generate_response needs,
+            # done once here and handed over as a typed AvailabilityResult
+            query_result = await nlu_agent._check_database_availability(entities)
+            if query_result.get("success") and query_result.get("vendor_id"):
+                state["vendor_id"] = query_result["vendor_id"]
+            
+        elif intent == "availability_inquiry" or intent == "booking_request":
             # Check availability - now requires sport_type and area
             sport_type = entities.get("sport_type", "padel")  # Default to padel if not specified
             area = entities.get("area", "DHA")  # Default to DHA if not specified
@@ -485,10 +422,16 @@ async def generate_response_node(state: AgentState) -> AgentState:
         if messages:
             last_user_msg = messages[-1].get("content", "")
         
+        # A complete availability query was already looked up by query_node -
+        # hand it over typed instead of repeating it (and don't send it twice as tool data)
+        availability = query_result if query_result.get("kind") == "availability" else None
+        
         # Prepare comprehensive context for Gemini
         context = {
-            "query_result": query_result,  # Database availability data from query_node
+            "query_result": {} if availability else query_result,  # Database data from query_node
+            "availability": availability,
             "conversation_history": messages[:-1],  # Previous messages (exclude current)
+            "memory": state.get("memory"),  # Slots and summary from earlier turns
             "current_message": last_user_msg,
             "phone_number": state.get("user_phone", ""),
             "selected_slot": state.get("selected_slot"),
@@ -501,6 +444,10 @@ async def generate_response_node(state: AgentState) -> AgentState:
         # Use Gemini to generate comprehensive response
         logger.info("🤖 Calling Gemini to generate response...")
         response = await nlu_agent.generate_response(intent, entities, context)
+        if context.get("booking_result"):
+            state["booking_result"] = context["booking_result"]
+        elif context.get("booking_error"):
+            state["booking_result"] = {"success": False, "error": context["booking_error"]}
         
         # Ensure response is not empty
         if not response or not response.strip():
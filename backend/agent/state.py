@@ -5,6 +5,25 @@ Agent State Definition for LangGraph
 from typing import TypedDict, List, Dict, Any, Optional
 
 
+class AvailabilityResult(TypedDict, total=False):
+    """
+    Single-vendor availability for a turn (NLUAgent._check_database_availability)
+    
+    Computed once in query_node and read by generate_response, so the
+    lookup is not repeated when the reply is rendered.
+    """
+    kind: str  # Always "availability"
+    success: bool
+    date: str  # Date the slots are for (next_available_date if the requested day was full)
+    requested_date: str
+    next_available_date: Optional[str]
+    vendor_id: str
+    available_slots: List[Dict[str, Any]]  # Slot documents (id, time, price, resource_id, ...)
+    total_available: int
+    time_filter: Optional[Dict[str, str]]
+    error: str
+
+
 class AgentState(TypedDict):
     """State maintained throughout the agent conversation"""
     
@@ -28,8 +47,14 @@ class AgentState(TypedDict):
     vendor_id: str  # Always "ace_padel_club"
     vendor_data: Optional[Dict[str, Any]]  # Vendor info, pricing, etc.
     
+    # Compact conversation memory from earlier turns (nlu.conversation_memory) - prompts read this, not the transcript
+    memory: Optional[Dict[str, Any]]
+    
     # Query results
-    query_result: Optional[Dict[str, Any]]  # Results from tool execution
+    query_result: Optional[Dict[str, Any]]  # Results from tool execution (AvailabilityResult for complete availability queries)
+    
+    # Booking outcome of this turn ({success, booking_id} or {success: False, error}), if one was attempted
+    booking_result: Optional[Dict[str, Any]]
     
     # Response
     response: str  # Final response to send to user
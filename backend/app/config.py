@@ -25,17 +25,56 @@ class Settings(BaseSettings):
     # AI/NLU (Gemini)
     GEMINI_API_KEY: str
     GEMINI_MODEL: str = "gemini-2.5-flash"  # Fastest model for lowest latency
+    GEMINI_MAX_CONCURRENCY: int = 8  # Max in-flight Gemini requests per process
+    GEMINI_TIMEOUT_SECONDS: float = 20.0  # Per-call timeout
+    GEMINI_BREAKER_ERROR_RATE: float = 0.5  # Failure share (errors, timeouts, slow calls) that opens the circuit
+    GEMINI_BREAKER_MIN_CALLS: int = 5  # Calls in the window before the rate is trusted
+    GEMINI_BREAKER_WINDOW_SECONDS: float = 60.0
+    GEMINI_BREAKER_SLOW_CALL_SECONDS: float = 8.0  # Slower calls count as failures
+    GEMINI_BREAKER_OPEN_SECONDS: float = 30.0  # Cool-down before a half-open probe
+    NLU_RULES_CONFIDENCE_THRESHOLD: float = 0.85  # Rule classifier results at/above this skip Gemini
+    NLU_INTENT_CACHE_SIZE: int = 2048  # LRU entries for cached intent classifications
+    NLU_INTENT_CACHE_TTL_SECONDS: float = 3600.0
+    NLU_LOCAL_MODEL_PATH: str = "nlu/models/intent_model.json"  # Relative to backend/; missing file disables the local tier
+    NLU_LOCAL_CONFIDENCE_THRESHOLD: float = 0.9  # Local model results at/above this skip Gemini
+    NLU_TRAINING_LOG_PATH: str = ""  # JSONL export of Gemini-labelled turns for retraining (empty = off)
+    NLU_FUSED_MODE: bool = False  # One structured Gemini call for intent + entities + reply
+    RESPONSE_TEMPLATES_ENABLED: bool = True  # Render data-determined replies without Gemini
+    SESSION_CACHE_SIZE: int = 10000  # Conversation sessions kept in process (LRU)
+    SESSION_CACHE_IDLE_SECONDS: float = 1800.0  # Sessions idle longer are re-read from Firestore
     
     # WhatsApp (Meta Business API)
     WHATSAPP_ACCESS_TOKEN: str
     WHATSAPP_PHONE_NUMBER_ID: str
     WHATSAPP_VERIFY_TOKEN: str
+    WHATSAPP_DEBOUNCE_SECONDS: float = 1.5  # Messages from one phone this close together become one turn
+    WHATSAPP_DEBOUNCE_MAX_SECONDS: float = 5.0  # Longest a burst is held before its turn starts
+    WHATSAPP_QUEUE_SIZE: int = 1000  # Acknowledged messages whose turn hasn't finished; beyond this the webhook answers 503
+    WHATSAPP_WORKERS: int = 16  # Queue workers moving messages into the conversation actors (they don't wait for turns)
+    WHATSAPP_TURN_CONCURRENCY: int = 16  # Agent turns (NLU + reply send) running at once across all phones
+    WHATSAPP_DRAIN_SECONDS: float = 25.0  # Shutdown grace period for queued / in-flight turns
+    WHATSAPP_DEDUP_BACKEND: str = "memory"  # "memory" (per process) or "firestore" (shared across workers)
+    WHATSAPP_DEDUP_TTL_SECONDS: float = 86400.0  # How long a message id counts as seen
+    WHATSAPP_DEDUP_MAX_ENTRIES: int = 50000  # In-memory bound on remembered message ids
+    WHATSAPP_API_BASE_URL: str = "https://graph.facebook.com/v22.0"  # Point at scripts/fake_graph_api.py for local runs
+    WHATSAPP_HTTP_TIMEOUT_SECONDS: float = 10.0
+    WHATSAPP_HTTP_MAX_RETRIES: int = 3  # Retries on 429 / 5xx / failed connects
+    WHATSAPP_HTTP_MAX_CONNECTIONS: int = 20  # Pooled keep-alive connections to the Graph API
+    WHATSAPP_HTTP2: bool = False  # Needs the h2 package; falls back to HTTP/1.1 without it
+    WHATSAPP_SEND_RATE_PER_SECOND: float = 20.0  # Token bucket refill per business number (Meta's cap is higher; stay under it)
+    WHATSAPP_SEND_BURST: float = 20.0  # Sends a number may make back-to-back after being idle
+    WHATSAPP_SEND_CONCURRENCY: int = 8  # Sends in flight at once
+    WHATSAPP_SEND_BULK_SHARE: float = 0.5  # Share of those bulk notifications may occupy
     
     # Firestore (instead of PostgreSQL)
     FIRESTORE_PROJECT_ID: str
     FIRESTORE_CREDENTIALS_FILE: str = "./backend/credentials/firestore-service-account.json"
     GOOGLE_APPLICATION_CREDENTIALS: Optional[str] = None
     
+    # Slot availability: "materialized" stores every slot document,
+    # "virtual" derives free slots from operating hours + sparse exception docs
+    SLOT_AVAILABILITY_MODE: str = "materialized"
+    
     # Authentication
     JWT_SECRET_KEY: str = ""  # Must be set via environment variable
     
@@ -4,9 +4,15 @@ Simplified database layer using Firestore instead of PostgreSQL
 """
 
 import logging
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 from google.cloud import firestore
 from app.config import settings
+from database.schema import AvailabilityMode
+from database.virtual_slots import VirtualSlotService
+from database.daily_stats import DailyStatsCounter
+from database.slot_events import SlotEventOutbox
+from database.slot_service import SlotService
+from database.hold_expiry import AVAILABILITY_QUERY_STATUSES, HoldReleaser, filter_available, is_slot_available
 import json
 import os
 
@@ -61,6 +67,16 @@ class FirestoreDB:
             logger.error(f"Failed to initialize Firestore: {e}")
             # Don't raise - allow app to start without Firestore
             self.db = None
+        
+        # Virtual availability: free slots are derived, only exceptions are stored
+        self.virtual_slots = None
+        if self.db is not None and settings.SLOT_AVAILABILITY_MODE == AvailabilityMode.VIRTUAL.value:
+            self.virtual_slots = VirtualSlotService(self.db)
+            logger.info("Slot availability mode: virtual")
+        
+        self.daily_stats = DailyStatsCounter(self.db) if self.db is not None else None
+        self.slot_events = SlotEventOutbox(self.db) if self.db is not None else None
+        self.hold_releaser = HoldReleaser(SlotService(self.db)) if self.db is not None else None
     
     # ============================================================================
     # VENDOR OPERATIONS
@@ -100,21 +116,32 @@ class FirestoreDB:
         try:
             from google.cloud.firestore_v1.base_query import FieldFilter
             
-            # Query slots
-            query = self.db.collection('slots')\
-                .where(filter=FieldFilter('vendor_id', '==', vendor_id))\
-                .where(filter=FieldFilter('date', '==', date))\
-                .where(filter=FieldFilter('status', '==', 'available'))
+            # Locked slots whose hold has lapsed count as available; write-back happens off the request path
+            expired_holds = []
+            if self.virtual_slots:
+                # Derived grid minus stored exceptions
+                candidates = self.virtual_slots.get_available_slots(vendor_id, date, expired_holds)
+            else:
+                # Query slots
+                query = self.db.collection('slots')\
+                    .where(filter=FieldFilter('vendor_id', '==', vendor_id))\
+                    .where(filter=FieldFilter('date', '==', date))\
+                    .where(filter=FieldFilter('status', 'in', AVAILABILITY_QUERY_STATUSES))
+                
+                found = []
+                for doc in query.stream():
+                    slot_data = doc.to_dict()
+                    slot_data['id'] = doc.id
+                    found.append(slot_data)
+                candidates = filter_available(found, expired_holds)
+            self.hold_releaser.schedule(expired_holds)
             
-            docs = query.stream()
             slots = []
             resource_ids = set()
             service_ids = set()
             
             # First pass: collect all slot data and unique IDs
-            for doc in docs:
-                slot_data = doc.to_dict()
-                slot_data['id'] = doc.id
+            for slot_data in candidates:
                 slots.append(slot_data)
                 
                 if 'resource_id' in slot_data and slot_data['resource_id']:
@@ -193,19 +220,27 @@ class FirestoreDB:
             logger.info(f"🔧 [book_slot] Attempting to book: vendor={vendor_id}, date={date}, time={time}")
             
             # First, find matching slot by querying the slots collection
-            # Query by vendor_id, date, and status
-            query = self.db.collection('slots')\
-                .where(filter=FieldFilter('vendor_id', '==', vendor_id))\
-                .where(filter=FieldFilter('date', '==', date))\
-                .where(filter=FieldFilter('status', '==', 'available'))
-            
-            docs = list(query.stream())
-            logger.info(f"📊 [book_slot] Found {len(docs)} available slots for vendor={vendor_id}, date={date}")
+            # Query by vendor_id, date, and status (virtual mode derives the grid instead)
+            if self.virtual_slots:
+                candidates = self.virtual_slots.get_available_slots(vendor_id, date)
+            else:
+                query = self.db.collection('slots')\
+                    .where(filter=FieldFilter('vendor_id', '==', vendor_id))\
+                    .where(filter=FieldFilter('date', '==', date))\
+                    .where(filter=FieldFilter('status', 'in', AVAILABILITY_QUERY_STATUSES))
+                
+                found = []
+                for doc in query.stream():
+                    slot_data = doc.to_dict()
+                    slot_data['id'] = doc.id
+                    found.append(slot_data)
+                candidates = filter_available(found)
+            logger.info(f"📊 [book_slot] Found {len(candidates)} available slots for vendor={vendor_id}, date={date}")
             
             # Log all available slot times for debugging
             available_times = []
-            for doc in docs:
-                slot_data = doc.to_dict()
+            matching_slot = None
+            for slot_data in candidates:
                 slot_start_time = slot_data.get('start_time')
                 
                 # Extract time from timestamp
@@ -215,65 +250,66 @@ class FirestoreDB:
                     slot_time_str = str(slot_start_time) if slot_start_time else ''
                 
                 available_times.append(slot_time_str)
-                logger.info(f"   Available slot: {slot_time_str} (slot_id: {doc.id}, status: {slot_data.get('status', 'unknown')})")
+                logger.info(f"   Available slot: {slot_time_str} (slot_id: {slot_data['id']}, status: {slot_data.get('status', 'unknown')})")
+                
+                # Find the slot that matches the requested time (exact match)
+                if matching_slot is None and slot_time_str == time:
+                    matching_slot = slot_data
             
             logger.info(f"📋 [book_slot] All available times: {available_times}")
             logger.info(f"🔍 [book_slot] Looking for time: '{time}'")
             
-            # Find the slot that matches the requested time
-            matching_slot = None
-            for doc in docs:
-                slot_data = doc.to_dict()
-                slot_start_time = slot_data.get('start_time')
-                
-                # Extract time from timestamp
-                if slot_start_time and hasattr(slot_start_time, 'strftime'):
-                    slot_time_str = slot_start_time.strftime('%H:%M')
-                else:
-                    slot_time_str = str(slot_start_time) if slot_start_time else ''
-                
-                # Compare times (exact match)
-                if slot_time_str == time:
-                    matching_slot = doc
-                    logger.info(f"   ✅ Found matching slot: {doc.id} at {slot_time_str}")
-                    break
-            
             if not matching_slot:
                 logger.warning(f"❌ [book_slot] No slot found for time: {time}")
                 logger.warning(f"   Available times were: {available_times}")
                 logger.warning(f"   Requested time format: '{time}' (type: {type(time).__name__})")
                 return {'success': False, 'error': f'No slot available at {time}. Available times: {", ".join(available_times) if available_times else "none"}'}
             
+            slot_id = matching_slot['id']
+            logger.info(f"   ✅ Found matching slot: {slot_id} at {time}")
+            
             # Use transaction to prevent double-booking
             @firestore.transactional
             def book_transaction(transaction):
-                slot_ref = matching_slot.reference
+                slot_ref = self.db.collection('slots').document(slot_id)
                 slot_doc = slot_ref.get(transaction=transaction)
                 
-                if not slot_doc.exists:
+                if slot_doc.exists:
+                    slot_data = slot_doc.to_dict()
+                elif self.virtual_slots:
+                    # Derived slot with no exception document yet
+                    slot_data = matching_slot
+                else:
                     return {'success': False, 'error': 'Slot not found'}
                 
-                slot_data = slot_doc.to_dict()
                 current_status = slot_data.get('status')
                 
-                # Only book if slot is still available
-                if current_status != 'available':
-                    logger.warning(f"❌ Slot {matching_slot.id} is not available (status: {current_status})")
+                # Only book if slot is still available (or its hold has lapsed)
+                if not is_slot_available(slot_data):
+                    logger.warning(f"❌ Slot {slot_id} is not available (status: {current_status})")
                     return {'success': False, 'error': f'Slot is no longer available (current status: {current_status})'}
                 
                 # Update slot to confirmed status with customer info
                 # No separate bookings collection - the slot IS the booking
-                transaction.update(slot_ref, {
+                updates = {
                     'status': 'confirmed',  # Direct to confirmed (skipping payment)
                     'user_id': customer_info.get('phone', ''),
                     'customer_name': customer_info.get('name', 'Unknown'),
                     'customer_phone': customer_info.get('phone', ''),
                     'booking_source': customer_info.get('booking_source', 'whatsapp'),
+                    'hold_expires_at': None,
                     'updated_at': firestore.SERVER_TIMESTAMP
-                })
+                }
+                self.daily_stats.record(transaction, slot_data, current_status, 'confirmed')
+                self.slot_events.append(transaction, slot_id, slot_data, current_status, 'confirmed',
+                                        customer_info.get('phone', ''))
+                if slot_doc.exists:
+                    transaction.update(slot_ref, updates)
+                else:
+                    transaction.set(slot_ref, VirtualSlotService.to_exception_doc(slot_data, updates))
                 
-                logger.info(f"✅ [book_slot] Slot {matching_slot.id} confirmed for {customer_info.get('phone', '')}")
-                return {'success': True, 'booking_id': matching_slot.id, 'slot_id': matching_slot.id}
+                logger.info(f"✅ [book_slot] Slot {slot_id} confirmed for {customer_info.get('phone', '')}")
+                return {'success': True, 'booking_id': slot_id, 'slot_id': slot_id}
             
             # Execute transaction
             transaction = self.db.transaction()
@@ -362,7 +398,43 @@ class FirestoreDB:
         except Exception as e:
             logger.error(f"Error updating conversation state: {e}")
             return False
-    
+
+    async def get_conversation_state_versioned(self, phone_number: str) -> Tuple[Optional[Dict[str, Any]], Any]:
+        """
+        Get conversation state with its update_time (the session cache's version)
+
+        Returns:
+            (state dict, update_time), or (None, None) when no session exists yet.
+            Errors propagate so callers can fall back.
+        """
+        doc = self.db.collection('conversation_states').document(phone_number).get()
+        if not doc.exists:
+            return None, None
+        return doc.to_dict(), doc.update_time
+
+    async def write_conversation_state(
+        self,
+        phone_number: str,
+        state_data: Dict[str, Any],
+        last_update_time: Any = None
+    ) -> Any:
+        """
+        Write conversation state and return the new update_time
+
+        Args:
+            phone_number: Customer's phone number
+            state_data: Top-level fields to write
+            last_update_time: When given, the write only succeeds if the document
+                is unchanged since then (raises FailedPrecondition otherwise);
+                when omitted the fields are merge-written unconditionally
+        """
+        doc_ref = self.db.collection('conversation_states').document(phone_number)
+        if last_update_time is not None:
+            result = doc_ref.update(state_data, option=self.db.write_option(last_update_time=last_update_time))
+        else:
+            result = doc_ref.set(state_data, merge=True)
+        return result.update_time
+
     # ============================================================================
     # SLOT MANAGEMENT (for vendors)
     # ============================================================================
@@ -10,11 +10,20 @@ from fastapi.responses import JSONResponse
 import logging
 
 from app.config import settings
+from app.metrics import metrics
 
 # Import from modular structure
 from whatsapp.webhook import WhatsAppWebhookHandler
 from database.rest_api import router as rest_api_router
 from database.auth_api import router as auth_router
+from nlu.gemini_client import gemini_client
+from nlu.rules import rule_classifier
+from nlu.intent_cache import intent_cache
+from nlu.local_classifier import local_classifier
+from database.vendor_index import vendor_index
+from nlu.session_cache import session_cache
+from whatsapp.http_client import graph_client
+from whatsapp.outbound import outbound_scheduler
 
 # Configure logging
 logging.basicConfig(
@@ -58,6 +67,9 @@ async def startup_event():
     # Initialize WhatsApp webhook handler
     global whatsapp_handler
     whatsapp_handler = WhatsAppWebhookHandler()
+    await graph_client.start()
+    outbound_scheduler.start()
+    whatsapp_handler.start()
     
     # TODO: Initialize Firestore connection
     # from app.firestore import firestore_db
@@ -70,6 +82,11 @@ async def startup_event():
 async def shutdown_event():
     """Cleanup on server shutdown"""
     logger.info("Shutting down server...")
+    # Finish the turns already acknowledged to Meta before stopping Gemini
+    await whatsapp_handler.drain(settings.WHATSAPP_DRAIN_SECONDS)
+    await outbound_scheduler.drain(settings.WHATSAPP_DRAIN_SECONDS)
+    await graph_client.close()
+    gemini_client.shutdown()
     logger.info("Server shut down successfully")
 
 
@@ -88,6 +105,7 @@ async def root():
         "endpoints": {
             "whatsapp_webhook": "/webhook/whatsapp",
             "health": "/health",
+            "metrics": "/metrics",
             "api_docs": "/docs"
         }
     }
@@ -104,6 +122,25 @@ async def health_check():
     }
 
 
+@app.get("/metrics")
+async def get_metrics():
+    """In-process metrics (Gemini concurrency, queue wait, latencies, circuit state, rule coverage, local model, cache hit rates)"""
+    return {
+        **metrics.snapshot(),
+        "gemini_breaker": gemini_client.breaker.snapshot(),
+        "nlu_rules": rule_classifier.coverage(),
+        "nlu_intent_cache": intent_cache.stats(),
+        "nlu_local_model": local_classifier.stats(),
+        "vendor_index": vendor_index.stats(),
+        "session_cache": session_cache.stats(),
+        "whatsapp_actors": whatsapp_handler.actors.stats(),
+        "whatsapp_queue": whatsapp_handler.queue.stats(),
+        "whatsapp_dedup": whatsapp_handler.seen.stats(),
+        "graph_api": graph_client.stats(),
+        "outbound": outbound_scheduler.stats()
+    }
+
+
 @app.post("/test-webhook")
 async def test_webhook(request: Request):
     """Test endpoint to debug webhook processing"""
@@ -171,8 +208,9 @@ async def whatsapp_webhook(request: Request):
         # Use WhatsApp webhook handler
         result = await whatsapp_handler.handle_webhook(request)
         
+        # Queue full: a non-200 makes Meta redeliver later instead of dropping the message
         return JSONResponse(
-            status_code=200,
+            status_code=503 if result.get("status") == "busy" else 200,
             content=result
         )
         
@@ -0,0 +1,74 @@
+"""
+In-process metrics registry
+Lightweight counters, gauges and timing summaries exposed on /metrics.
+Single-process only - good enough for one uvicorn worker on Railway.
+"""
+
+import threading
+from typing import Dict, Any, Tuple
+
+
+def _key(name: str, labels: Dict[str, Any]) -> Tuple:
+    return (name,) + tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class MetricsRegistry:
+    """Thread-safe metric store (updated from the event loop and executor threads)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple, float] = {}
+        self._gauges: Dict[Tuple, float] = {}
+        self._timings: Dict[Tuple, Dict[str, float]] = {}
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels):
+        with self._lock:
+            self._gauges[_key(name, labels)] = value
+
+    def add_gauge(self, name: str, delta: float, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self._gauges[key] = self._gauges.get(key, 0) + delta
+
+    def observe(self, name: str, value: float, **labels):
+        """Record one sample (seconds, tokens, ...) - keeps count/sum/max"""
+        key = _key(name, labels)
+        with self._lock:
+            timing = self._timings.setdefault(key, {'count': 0, 'sum': 0.0, 'max': 0.0})
+            timing['count'] += 1
+            timing['sum'] += value
+            timing['max'] = max(timing['max'], value)
+
+    def get_counter(self, name: str, **labels) -> float:
+        with self._lock:
+            return self._counters.get(_key(name, labels), 0)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """JSON-friendly dump of every metric"""
+        def fmt(key: Tuple) -> str:
+            name, *labels = key
+            if not labels:
+                return name
+            return name + "{" + ",".join(f"{k}={v}" for k, v in labels) + "}"
+
+        with self._lock:
+            return {
+                'counters': {fmt(k): v for k, v in self._counters.items()},
+                'gauges': {fmt(k): v for k, v in self._gauges.items()},
+                'timings': {
+                    fmt(k): {
+                        **t,
+                        'avg': t['sum'] / t['count'] if t['count'] else 0.0
+                    }
+                    for k, t in self._timings.items()
+                }
+            }
+
+
+# Global metrics instance
+metrics = MetricsRegistry()
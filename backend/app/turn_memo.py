@@ -0,0 +1,54 @@
+"""
+Turn Memo - Per-turn memoization of read-only lookups
+A turn (one BookingAgent.process call) opens a memo in a context variable;
+graph nodes run as tasks that inherit it, so a lookup made in query_node is
+reused by generate_response instead of hitting Firestore again. Outside a
+turn the memo is inactive and every call goes through.
+
+Only memoize reads - never transactional writes or re-reads inside them.
+"""
+
+import copy
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+from app.metrics import metrics
+
+
+_turn_memo: ContextVar[Optional[Dict[Hashable, Any]]] = ContextVar("turn_memo", default=None)
+
+
+@contextmanager
+def turn_scope():
+    """Open a fresh memo for the duration of one agent turn"""
+    token = _turn_memo.set({})
+    try:
+        yield
+    finally:
+        _turn_memo.reset(token)
+
+
+async def memoized(key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Any:
+    """
+    Return the turn's cached value for key, or await fetch() and cache it
+
+    Args:
+        key: Hashable lookup key, e.g. ("slots", vendor_id, date)
+        fetch: Zero-argument coroutine function doing the real lookup
+
+    Returns:
+        A copy of the cached value (callers mutate lookup results freely)
+    """
+    memo = _turn_memo.get()
+    if memo is None:
+        return await fetch()
+
+    if key in memo:
+        metrics.inc('turn_memo_total', kind=str(key[0]) if isinstance(key, tuple) else 'value', result='hit')
+        return copy.deepcopy(memo[key])
+
+    metrics.inc('turn_memo_total', kind=str(key[0]) if isinstance(key, tuple) else 'value', result='miss')
+    value = await fetch()
+    memo[key] = copy.deepcopy(value)
+    return value
@@ -22,5 +22,6 @@ from database.schema import (
     SportType,
     PriceTier,
     BookingSource,
+    AvailabilityMode,
     Areas
 )
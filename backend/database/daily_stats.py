@@ -0,0 +1,200 @@
+"""
+Daily Stats - Incremental per-vendor per-day booking aggregates
+Slot transitions add deltas inside their own transaction; dashboards read the
+pre-aggregated shard documents instead of re-querying and summing slots.
+
+Document ID: {vendor_id}_{date}_{shard}  (date is the slot date, YYYY-MM-DD)
+"""
+
+import logging
+import random
+from typing import Dict, Any, Optional
+from google.cloud import firestore
+
+from database.schema import Collections, SlotStatus, STATS_SHARD_COUNT
+
+logger = logging.getLogger(__name__)
+
+
+# Statuses that count as a live booking (bookings/revenue)
+BOOKED_STATUSES = {SlotStatus.CONFIRMED.value, SlotStatus.COMPLETED.value}
+
+# Statuses tracked in the by_status breakdown
+TRACKED_STATUSES = {SlotStatus.CONFIRMED.value, SlotStatus.COMPLETED.value, SlotStatus.CANCELLED.value}
+
+
+def empty_stats(vendor_id: str, date: str) -> Dict[str, Any]:
+    return {
+        'vendor_id': vendor_id,
+        'date': date,
+        'bookings': 0,
+        'revenue': 0,
+        'cancellations': 0,
+        'by_status': {},
+        'by_resource': {}
+    }
+
+
+def merge_stats(total: Dict[str, Any], shard: Dict[str, Any]):
+    """Add one shard (or one day) into a running total"""
+    total['bookings'] += shard.get('bookings', 0)
+    total['revenue'] += shard.get('revenue', 0)
+    total['cancellations'] += shard.get('cancellations', 0)
+
+    for status, count in (shard.get('by_status') or {}).items():
+        total['by_status'][status] = total['by_status'].get(status, 0) + count
+
+    for resource_id, counts in (shard.get('by_resource') or {}).items():
+        resource_total = total['by_resource'].setdefault(resource_id, {'bookings': 0, 'revenue': 0})
+        resource_total['bookings'] += counts.get('bookings', 0)
+        resource_total['revenue'] += counts.get('revenue', 0)
+
+
+class DailyStatsCounter:
+    def __init__(self, db_client: firestore.Client, shard_count: int = STATS_SHARD_COUNT):
+        self.db = db_client
+        self.shard_count = shard_count
+
+    def _shard_ref(self, vendor_id: str, date: str, shard: int):
+        return self.db.collection(Collections.VENDOR_DAILY_STATS).document(f"{vendor_id}_{date}_{shard}")
+
+    def record(self, transaction, slot_data: Dict[str, Any], from_status: Optional[str], to_status: str):
+        """
+        Apply the counter deltas of a slot transition inside the caller's transaction
+
+        Writes to a random shard so busy vendor days don't contend on one document.
+
+        Args:
+            transaction: Active Firestore transaction (all reads must already be done)
+            slot_data: Slot as read in the transaction (vendor_id, date, resource_id, price)
+            from_status: Status before the transition
+            to_status: Status after the transition (cancelled for cancel/reject)
+        """
+        vendor_id = slot_data.get('vendor_id')
+        date = slot_data.get('date')
+        if not vendor_id or not date:
+            return
+
+        booked_delta = int(to_status in BOOKED_STATUSES) - int(from_status in BOOKED_STATUSES)
+        price = slot_data.get('price', 0) or 0
+
+        by_status = {}
+        if from_status in TRACKED_STATUSES:
+            by_status[from_status] = -1
+        if to_status in TRACKED_STATUSES:
+            by_status[to_status] = by_status.get(to_status, 0) + 1
+        by_status = {status: firestore.Increment(delta) for status, delta in by_status.items() if delta}
+
+        if not booked_delta and not by_status:
+            return
+
+        updates = {
+            'vendor_id': vendor_id,
+            'date': date,
+            'updated_at': firestore.SERVER_TIMESTAMP
+        }
+        if booked_delta:
+            updates['bookings'] = firestore.Increment(booked_delta)
+            updates['revenue'] = firestore.Increment(booked_delta * price)
+            resource_id = slot_data.get('resource_id')
+            if resource_id:
+                updates['by_resource'] = {
+                    resource_id: {
+                        'bookings': firestore.Increment(booked_delta),
+                        'revenue': firestore.Increment(booked_delta * price)
+                    }
+                }
+        if to_status == SlotStatus.CANCELLED.value:
+            updates['cancellations'] = firestore.Increment(1)
+        if by_status:
+            updates['by_status'] = by_status
+
+        shard = random.randrange(self.shard_count)
+        updates['shard'] = shard
+        transaction.set(self._shard_ref(vendor_id, date, shard), updates, merge=True)
+
+    def get(self, vendor_id: str, date: str) -> Dict[str, Any]:
+        """Aggregated stats for one vendor/day (one query over the day's shards)"""
+        stats = empty_stats(vendor_id, date)
+        docs = self.db.collection(Collections.VENDOR_DAILY_STATS)\
+            .where('vendor_id', '==', vendor_id)\
+            .where('date', '==', date)\
+            .stream()
+        for doc in docs:
+            merge_stats(stats, doc.to_dict())
+        return stats
+
+    def get_range(self, vendor_id: str, start_date: str, end_date: str) -> Dict[str, Any]:
+        """
+        Week/month rollup - per-day stats plus totals for an inclusive date range
+
+        Returns:
+            {'start_date', 'end_date', 'days': [per-day stats], 'totals': stats}
+        """
+        days = {}
+        docs = self.db.collection(Collections.VENDOR_DAILY_STATS)\
+            .where('vendor_id', '==', vendor_id)\
+            .where('date', '>=', start_date)\
+            .where('date', '<=', end_date)\
+            .stream()
+        for doc in docs:
+            data = doc.to_dict()
+            day = days.setdefault(data['date'], empty_stats(vendor_id, data['date']))
+            merge_stats(day, data)
+
+        totals = empty_stats(vendor_id, None)
+        for day in days.values():
+            merge_stats(totals, day)
+
+        return {
+            'start_date': start_date,
+            'end_date': end_date,
+            'days': [days[date] for date in sorted(days)],
+            'totals': totals
+        }
+
+    def rebuild(self, vendor_id: str, date: str) -> Dict[str, Any]:
+        """
+        Recompute a vendor/day from slots and slot_history (backfill or repair)
+        Writes the totals to shard 0 and clears the other shards.
+        """
+        stats = empty_stats(vendor_id, date)
+
+        slots = self.db.collection(Collections.SLOTS)\
+            .where('vendor_id', '==', vendor_id)\
+            .where('date', '==', date)\
+            .where('status', 'in', list(BOOKED_STATUSES))\
+            .stream()
+        for doc in slots:
+            slot = doc.to_dict()
+            price = slot.get('price', 0) or 0
+            stats['bookings'] += 1
+            stats['revenue'] += price
+            stats['by_status'][slot['status']] = stats['by_status'].get(slot['status'], 0) + 1
+            if slot.get('resource_id'):
+                resource = stats['by_resource'].setdefault(slot['resource_id'], {'bookings': 0, 'revenue': 0})
+                resource['bookings'] += 1
+                resource['revenue'] += price
+
+        history = self.db.collection(Collections.SLOT_HISTORY)\
+            .where('vendor_id', '==', vendor_id)\
+            .where('date', '==', date)\
+            .stream()
+        for _ in history:
+            stats['cancellations'] += 1
+        if stats['cancellations']:
+            stats['by_status'][SlotStatus.CANCELLED.value] = stats['cancellations']
+
+        batch = self.db.batch()
+        batch.set(self._shard_ref(vendor_id, date, 0), {
+            **stats,
+            'shard': 0,
+            'updated_at': firestore.SERVER_TIMESTAMP
+        })
+        for shard in range(1, self.shard_count):
+            batch.delete(self._shard_ref(vendor_id, date, shard))
+        batch.commit()
+
+        logger.info(f"Rebuilt daily stats for {vendor_id} on {date}: {stats['bookings']} bookings")
+        return stats
+
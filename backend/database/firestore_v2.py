@@ -8,17 +8,26 @@ from typing import Dict, List, Any, Optional
 from datetime import datetime, timedelta
 from google.cloud import firestore
 
+from app.config import settings
 from database.schema import (
     Collections, SlotStatus, PaymentStatus, UserRole,
-    SportType, PriceTier, HOLD_EXPIRY_MINUTES
+    SportType, PriceTier, AvailabilityMode, HOLD_EXPIRY_MINUTES
 )
+from database.virtual_slots import VirtualSlotService
+from database.daily_stats import DailyStatsCounter
+from database.hold_expiry import AVAILABILITY_QUERY_STATUSES, HoldReleaser, filter_available
+from database.slot_service import SlotService
 
 logger = logging.getLogger(__name__)
 
 
 class FirestoreV2:
-    def __init__(self, db_client: firestore.Client):
+    def __init__(self, db_client: firestore.Client, availability_mode: str = None):
         self.db = db_client
+        mode = availability_mode or settings.SLOT_AVAILABILITY_MODE
+        self.virtual_slots = VirtualSlotService(db_client) if mode == AvailabilityMode.VIRTUAL.value else None
+        self.daily_stats = DailyStatsCounter(db_client)
+        self.hold_releaser = HoldReleaser(SlotService(db_client, mode))
         logger.info("FirestoreV2 initialized")
     
     
@@ -211,17 +220,27 @@ class FirestoreV2:
     async def get_available_slots(self, vendor_id: str, date: str) -> List[Dict[str, Any]]:
         try:
             from google.cloud.firestore_v1.base_query import FieldFilter
-            slots = []
-            docs = self.db.collection(Collections.SLOTS)\
-                .where(filter=FieldFilter('vendor_id', '==', vendor_id))\
-                .where(filter=FieldFilter('date', '==', date))\
-                .where(filter=FieldFilter('status', '==', SlotStatus.AVAILABLE.value))\
-                .stream()
             
-            for doc in docs:
-                data = doc.to_dict()
-                data['id'] = doc.id
-                
+            # Expired holds are available at read time and released lazily
+            expired_holds = []
+            if self.virtual_slots:
+                candidates = self.virtual_slots.get_available_slots(vendor_id, date, expired_holds)
+            else:
+                docs = self.db.collection(Collections.SLOTS)\
+                    .where(filter=FieldFilter('vendor_id', '==', vendor_id))\
+                    .where(filter=FieldFilter('date', '==', date))\
+                    .where(filter=FieldFilter('status', 'in', AVAILABILITY_QUERY_STATUSES))\
+                    .stream()
+                found = []
+                for doc in docs:
+                    data = doc.to_dict()
+                    data['id'] = doc.id
+                    found.append(data)
+                candidates = filter_available(found, expired_holds)
+            self.hold_releaser.schedule(expired_holds)
+            
+            slots = []
+            for data in candidates:
                 # Normalize: extract time string from start_time timestamp
                 if 'start_time' in data and data['start_time']:
                     try:
@@ -245,6 +264,8 @@ class FirestoreV2:
                 data = doc.to_dict()
                 data['id'] = doc.id
                 return data
+            if self.virtual_slots:
+                return self.virtual_slots.resolve_slot(slot_id)
             return None
         except Exception as e:
             logger.error(f"Error getting slot {slot_id}: {e}")
@@ -314,11 +335,33 @@ class FirestoreV2:
                 data['id'] = doc.id
                 slots.append(data)
             
+            # Cancelled/rejected bookings are archived out of the slots collection
+            slots.extend(await self.get_user_slot_history(user_id))
+            
             return sorted(slots, key=lambda x: x.get('start_time', datetime.min), reverse=True)
         except Exception as e:
             logger.error(f"Error getting user bookings: {e}")
             return []
     
+    async def get_user_slot_history(self, user_id: str) -> List[Dict[str, Any]]:
+        """Archived (cancelled/rejected) bookings for a user from slot_history"""
+        try:
+            records = []
+            docs = self.db.collection(Collections.SLOT_HISTORY)\
+                .where('user_id', '==', user_id)\
+                .stream()
+            
+            for doc in docs:
+                data = doc.to_dict()
+                data['history_id'] = doc.id
+                data['id'] = data.get('slot_id', doc.id)
+                records.append(data)
+            
+            return records
+        except Exception as e:
+            logger.error(f"Error getting slot history: {e}")
+            return []
+    
     
     async def create_payment(self, payment_data: Dict[str, Any]) -> Optional[str]:
         try:
@@ -434,12 +477,22 @@ class FirestoreV2:
     async def get_vendor_stats_today(self, vendor_id: str) -> Dict[str, Any]:
         today = datetime.now().strftime("%Y-%m-%d")
         
-        bookings = await self.get_vendor_bookings(vendor_id, date=today, status=SlotStatus.CONFIRMED.value)
-        
-        total_revenue = sum(slot.get('price', 0) for slot in bookings)
+        # Pre-aggregated by SlotService transitions (database/daily_stats.py)
+        stats = self.daily_stats.get(vendor_id, today)
         
         return {
             'date': today,
-            'bookings_count': len(bookings),
-            'revenue': total_revenue
+            'bookings_count': stats['bookings'],
+            'revenue': stats['revenue'],
+            'cancellations': stats['cancellations'],
+            'by_status': stats['by_status'],
+            'by_resource': stats['by_resource']
         }
+    
+    async def get_vendor_stats_range(self, vendor_id: str, start_date: str, end_date: str) -> Dict[str, Any]:
+        """Week/month rollup of daily stats (inclusive YYYY-MM-DD range)"""
+        try:
+            return self.daily_stats.get_range(vendor_id, start_date, end_date)
+        except Exception as e:
+            logger.error(f"Error getting vendor stats range: {e}")
+            return {'start_date': start_date, 'end_date': end_date, 'days': [], 'totals': None}
@@ -0,0 +1,121 @@
+"""
+Hold Expiry - Read-time enforcement of slot lock expiry
+A locked slot whose hold_expires_at has passed is available the instant the
+hold lapses; readers treat it as free and queue a lazy write-back that runs
+off the request path instead of waiting for the cleanup job.
+"""
+
+import asyncio
+import logging
+from typing import Dict, List, Any, Optional, Iterable
+from datetime import datetime, timezone
+
+from database.schema import SlotStatus
+
+logger = logging.getLogger(__name__)
+
+
+# Statuses an availability query has to fetch (locked ones may have expired)
+AVAILABILITY_QUERY_STATUSES = [SlotStatus.AVAILABLE.value, SlotStatus.LOCKED.value]
+
+# Expired holds seen during this window are released in one transaction
+WRITE_BACK_DELAY_SECONDS = 2.0
+WRITE_BACK_BATCH_SIZE = 200
+
+
+def _as_utc(value) -> Optional[datetime]:
+    if value is None:
+        return None
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    if value.tzinfo is None:
+        # Legacy naive timestamps were written in UTC
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def hold_expired(slot_data: Dict[str, Any], now: datetime = None) -> bool:
+    """True for a locked slot whose hold has lapsed"""
+    if slot_data.get('status') != SlotStatus.LOCKED.value:
+        return False
+    expires = _as_utc(slot_data.get('hold_expires_at'))
+    if expires is None:
+        return False
+    return (now or datetime.now(timezone.utc)) >= expires
+
+
+def is_slot_available(slot_data: Dict[str, Any], now: datetime = None) -> bool:
+    """Available, or locked with an expired hold"""
+    return slot_data.get('status') == SlotStatus.AVAILABLE.value or hold_expired(slot_data, now)
+
+
+def filter_available(slots: Iterable[Dict[str, Any]], expired_holds: List[str] = None) -> List[Dict[str, Any]]:
+    """
+    Keep the slots that are bookable right now
+
+    Expired holds are reported as available and their IDs appended to
+    expired_holds (if given) for write-back.
+    """
+    now = datetime.now(timezone.utc)
+    available = []
+    for slot in slots:
+        if slot.get('status') == SlotStatus.AVAILABLE.value:
+            available.append(slot)
+        elif hold_expired(slot, now):
+            if expired_holds is not None:
+                expired_holds.append(slot['id'])
+            available.append({
+                **slot,
+                'status': SlotStatus.AVAILABLE.value,
+                'user_id': None,
+                'hold_expires_at': None
+            })
+    return available
+
+
+class HoldReleaser:
+    """
+    Collects expired holds seen by readers and releases them in the background
+
+    Releases go through SlotService.release_expired_holds, which re-checks each
+    slot in a transaction, so a slot re-locked in the meantime is left alone.
+    """
+
+    def __init__(self, slot_service, delay_seconds: float = WRITE_BACK_DELAY_SECONDS):
+        self.slot_service = slot_service
+        self.delay_seconds = delay_seconds
+        self._pending = set()
+        self._scheduled = False
+
+    def schedule(self, slot_ids: Iterable[str]):
+        self._pending.update(slot_ids)
+        if not self._pending or self._scheduled:
+            return
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No event loop (scripts) - the next reader or the cleanup job picks them up
+            return
+
+        self._scheduled = True
+        loop.call_later(self.delay_seconds, self._start_flush, loop)
+
+    def _start_flush(self, loop):
+        self._scheduled = False
+        slot_ids = list(self._pending)
+        self._pending.clear()
+        loop.run_in_executor(None, self._flush, slot_ids)
+
+    def _flush(self, slot_ids: List[str]):
+        for i in range(0, len(slot_ids), WRITE_BACK_BATCH_SIZE):
+            chunk = slot_ids[i:i + WRITE_BACK_BATCH_SIZE]
+            try:
+                result = self.slot_service.release_expired_holds(chunk)
+                if result['success'] and result['released']:
+                    logger.info(f"Released {len(result['released'])} expired holds (lazy write-back)")
+            except Exception as e:
+                logger.error(f"Error releasing expired holds: {e}")
@@ -12,6 +12,7 @@ from database.availability_service import AvailabilityService
 from database.slot_service import SlotService
 from database.firestore_v2 import FirestoreV2
 from database.auth_service import AuthService
+from database.vendor_index import vendor_index
 from app.firestore import firestore_db
 import os
 import uuid
@@ -365,6 +366,7 @@ async def create_vendor(vendor_data: dict):
         
         # Create vendor document
         firestore_db.db.collection('vendors').document(vendor_id).set(vendor_doc)
+        vendor_index.invalidate()
         
         logger.info(f"Vendor created: {vendor_id}")
         
@@ -636,11 +638,17 @@ async def get_user_bookings(user_id: str = Depends(get_current_user_id)):
         slots_query = firestore_db.db.collection('slots').where('user_id', '==', user_id)
         slots_docs = slots_query.stream()
         
-        bookings = []
+        records = []
         for doc in slots_docs:
             slot_data = doc.to_dict()
             slot_data['id'] = doc.id
-            
+            records.append(slot_data)
+        
+        # Cancelled/rejected bookings live in the slot history archive
+        records.extend(await firestore_v2.get_user_slot_history(user_id))
+        
+        bookings = []
+        for slot_data in records:
             booking_statuses = ['locked', 'pending', 'confirmed', 'completed', 'cancelled']
             if slot_data.get('status') in booking_statuses:
                 vendor = None
@@ -657,7 +665,7 @@ async def get_user_bookings(user_id: str = Depends(get_current_user_id)):
                 start_time = slot_data.get('start_time')
                 end_time = slot_data.get('end_time')
                 
-                logger.info(f"Slot {doc.id}: start_time type={type(start_time)}, value={start_time}")
+                logger.info(f"Slot {slot_data['id']}: start_time type={type(start_time)}, value={start_time}")
                 
                 # Convert Firestore timestamps to time strings (HH:MM format)
                 time_str = None
@@ -684,8 +692,8 @@ async def get_user_bookings(user_id: str = Depends(get_current_user_id)):
                 logger.info(f"Formatted time_str={time_str}, start_time_str={start_time_str}")
                 
                 booking = {
-                    'id': doc.id,
-                    'slot_id': doc.id,
+                    'id': slot_data.get('history_id', slot_data['id']),
+                    'slot_id': slot_data['id'],
                     'vendor_id': slot_data.get('vendor_id'),
                     'date': slot_data.get('date'),
                     'time': time_str,
@@ -14,9 +14,14 @@ class Collections:
     RESOURCES = "resources"
     SERVICES = "services"
     SLOTS = "slots"
+    SLOT_HISTORY = "slot_history"
+    VENDOR_DAILY_STATS = "vendor_daily_stats"
+    SLOT_EVENTS = "slot_events"
+    OUTBOX_CHECKPOINTS = "outbox_checkpoints"
     PAYMENTS = "payments"
     VENDOR_PAYMENT_ACCOUNTS = "vendor_payment_accounts"
     CONVERSATION_STATES = "conversation_states"
+    PROCESSED_MESSAGES = "processed_messages"  # WhatsApp message ids already handled (TTL on expires_at)
 
 
 class SlotStatus(str, Enum):
@@ -59,6 +64,11 @@ class PriceTier(str, Enum):
     DISCOUNT = "discount"
 
 
+class AvailabilityMode(str, Enum):
+    MATERIALIZED = "materialized"
+    VIRTUAL = "virtual"
+
+
 class BookingSource(str, Enum):
     APP = "app"
     WHATSAPP = "whatsapp"
@@ -76,6 +86,7 @@ class Areas:
 SLOT_DURATION_MINUTES = 60
 HOLD_EXPIRY_MINUTES = 10
 SLOT_GENERATION_DAYS = 14
+STATS_SHARD_COUNT = 4
 
 
 DEFAULT_OPERATING_HOURS = {
@@ -0,0 +1,37 @@
+"""
+Compact legacy replacement slots
+Folds `{slot_id}_replacement` chains back into their root slot and moves the
+cancelled booking records into slot_history
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from database.seed.seed_all import get_firestore_client
+from database.slot_service import SlotService
+import logging
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def compact_replacement_slots():
+    db = get_firestore_client()
+    
+    logger.info("Compacting replacement slot chains...")
+    
+    result = SlotService(db).compact_replacement_slots()
+    
+    if not result['success']:
+        logger.error(f"❌ Compaction failed: {result['error']}")
+        return False
+    
+    logger.info(f"✅ Compacted {result['compacted']}/{result['chains']} chains, archived {result['archived']} bookings")
+    if result['skipped']:
+        logger.warning(f"Skipped chains: {', '.join(result['skipped'])}")
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if compact_replacement_slots() else 1)
@@ -0,0 +1,51 @@
+"""
+Rebuild vendor daily stats
+Recomputes vendor_daily_stats from slots and slot_history (backfill after
+enabling the counters, or repair after manual data edits)
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from datetime import datetime, timedelta
+from database.seed.seed_all import get_firestore_client
+from database.daily_stats import DailyStatsCounter
+from database.schema import Collections
+import logging
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def rebuild_daily_stats(start_date: str, days: int, vendor_id: str = None):
+    db = get_firestore_client()
+    counter = DailyStatsCounter(db)
+    
+    if vendor_id:
+        vendor_ids = [vendor_id]
+    else:
+        vendor_ids = [doc.id for doc in db.collection(Collections.VENDORS).stream()]
+    
+    start = datetime.strptime(start_date, "%Y-%m-%d")
+    dates = [(start + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(days)]
+    
+    logger.info(f"Rebuilding daily stats for {len(vendor_ids)} vendors over {days} days...")
+    
+    for vid in vendor_ids:
+        for date in dates:
+            counter.rebuild(vid, date)
+    
+    logger.info(f"✅ Rebuilt {len(vendor_ids) * len(dates)} vendor-days")
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Rebuild vendor daily stats from slots")
+    parser.add_argument("--start", default=datetime.now().strftime("%Y-%m-%d"), help="First date (YYYY-MM-DD)")
+    parser.add_argument("--days", type=int, default=14, help="Number of days to rebuild")
+    parser.add_argument("--vendor", default=None, help="Only rebuild this vendor")
+    
+    args = parser.parse_args()
+    rebuild_daily_stats(args.start, args.days, args.vendor)
@@ -147,10 +147,10 @@ def seed_payment_accounts(db):
     logger.info(f"Seeded {len(PAYMENT_ACCOUNTS_DATA)} payment accounts")
 
 
-def seed_slots(db, days=14):
+def seed_slots(db, days=14, virtual=False):
     from database.seed.slot_generator import generate_all_slots, apply_test_states, get_slot_statistics
     from database.seed.users_data import USERS_DATA
-    from database.schema import Collections
+    from database.schema import Collections, SlotStatus
     
     logger.info(f"Generating slots for {days} days...")
     
@@ -163,6 +163,12 @@ def seed_slots(db, days=14):
     stats = get_slot_statistics(slots)
     logger.info(f"Slot statistics: {stats['by_status']}")
     
+    if virtual:
+        # Virtual availability mode derives free slots from operating hours,
+        # so only the exception documents need to be stored
+        slots = [s for s in slots if s["status"] != SlotStatus.AVAILABLE.value]
+        logger.info(f"Virtual mode: keeping {len(slots)} non-available slots")
+    
     logger.info("Seeding slots collection (this may take a while)...")
     
     batch_size = 500
@@ -226,7 +232,7 @@ def seed_payments(db):
     logger.info(f"Seeded {len(TEST_PAYMENTS_DATA)} payments")
 
 
-def seed_all(days=14):
+def seed_all(days=14, virtual=False):
     logger.info("=" * 60)
     logger.info("Starting Firestore seed process")
     logger.info("=" * 60)
@@ -240,7 +246,7 @@ def seed_all(days=14):
         seed_resources(db)
         seed_services(db)
         seed_payment_accounts(db)
-        seed_slots(db, days=days)
+        seed_slots(db, days=days, virtual=virtual)
         seed_payments(db)
         
         logger.info("=" * 60)
@@ -288,6 +294,7 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Seed Firestore database")
     parser.add_argument("--days", type=int, default=14, help="Number of days to generate slots for")
     parser.add_argument("--clear", action="store_true", help="Clear existing data before seeding")
+    parser.add_argument("--virtual", action="store_true", help="Only store non-available slots (SLOT_AVAILABILITY_MODE=virtual)")
     
     args = parser.parse_args()
     
@@ -295,4 +302,4 @@ if __name__ == "__main__":
         db = get_firestore_client()
         clear_collections(db)
     
-    seed_all(days=args.days)
+    seed_all(days=args.days, virtual=args.virtual)
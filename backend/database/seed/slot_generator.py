@@ -15,6 +15,10 @@ import pytz
 from database.schema import (
     SlotStatus, PriceTier, SLOT_DURATION_MINUTES, SLOT_GENERATION_DAYS
 )
+from database.slot_grid import (
+    WEEKDAY_MAP, parse_time, generate_slot_id, get_hours_for_day,
+    generate_slots_for_resource
+)
 from database.seed.vendors_data import (
     VENDORS_DATA, RESOURCES_DATA, SERVICES_DATA,
     get_vendor_resources, get_vendor_service
@@ -23,101 +27,6 @@ from database.seed.vendors_data import (
 
 PKT = pytz.timezone('Asia/Karachi')
 
-WEEKDAY_MAP = {
-    0: "mon",
-    1: "tue",
-    2: "wed",
-    3: "thu",
-    4: "fri",
-    5: "sat",
-    6: "sun"
-}
-
-
-def parse_time(time_str: str) -> tuple:
-    parts = time_str.split(":")
-    return int(parts[0]), int(parts[1])
-
-
-def generate_slot_id(vendor_id: str, resource_id: str, date: str, time: str) -> str:
-    date_clean = date.replace("-", "")
-    time_clean = time.replace(":", "")
-    vendor_short = vendor_id.split("_")[0][:3]
-    resource_short = resource_id.split("_")[-1][:2]
-    return f"{date_clean}_{time_clean}_{vendor_short}_{resource_short}"
-
-
-def get_hours_for_day(operating_hours: dict, date: datetime) -> tuple:
-    weekday = WEEKDAY_MAP[date.weekday()]
-    day_hours = operating_hours.get(weekday, {"open": "08:00", "close": "22:00"})
-    
-    open_h, open_m = parse_time(day_hours["open"])
-    close_h, close_m = parse_time(day_hours["close"])
-    
-    if close_h == 0 and close_m == 0:
-        close_h = 24
-    
-    return (open_h, open_m), (close_h, close_m)
-
-
-def generate_slots_for_resource(
-    vendor_id: str,
-    resource_id: str,
-    service: dict,
-    date: datetime,
-    operating_hours: dict
-) -> List[Dict[str, Any]]:
-    slots = []
-    date_str = date.strftime("%Y-%m-%d")
-    
-    (open_h, open_m), (close_h, close_m) = get_hours_for_day(operating_hours, date)
-    
-    current_hour = open_h
-    current_min = open_m
-    
-    duration = service.get("duration_min", SLOT_DURATION_MINUTES)
-    base_price = service.get("pricing", {}).get("base", 1500)
-    
-    while current_hour < close_h or (current_hour == close_h and current_min < close_m):
-        time_str = f"{current_hour:02d}:{current_min:02d}"
-        
-        end_min = current_min + duration
-        end_hour = current_hour
-        while end_min >= 60:
-            end_min -= 60
-            end_hour += 1
-        
-        if end_hour > close_h or (end_hour == close_h and end_min > close_m):
-            if close_h < 24:
-                break
-        
-        end_time_str = f"{end_hour:02d}:{end_min:02d}"
-        slot_id = generate_slot_id(vendor_id, resource_id, date_str, time_str)
-        
-        slot = {
-            "id": slot_id,
-            "vendor_id": vendor_id,
-            "service_id": service["id"],
-            "resource_id": resource_id,
-            "start_time": time_str,
-            "end_time": end_time_str,
-            "date": date_str,
-            "price": base_price,
-            "status": SlotStatus.AVAILABLE.value,
-            "user_id": None,
-            "payment_id": None,
-            "hold_expires_at": None
-        }
-        
-        slots.append(slot)
-        
-        current_min += duration
-        while current_min >= 60:
-            current_min -= 60
-            current_hour += 1
-    
-    return slots
-
 
 def generate_slots_for_vendor(
     vendor_id: str,
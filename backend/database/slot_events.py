@@ -0,0 +1,184 @@
+"""
+Slot Events - Transactional outbox of slot state changes
+Every slot transition appends a compact event inside the same transaction, so
+the outbox never disagrees with the slots collection. Consumers tail it in
+commit order and checkpoint their position instead of re-querying slots.
+
+The API server does not start a consumer. Consumers run as their own process,
+one per downstream component (cache invalidation, dashboards, notifications):
+
+    consumer = SlotEventConsumer(firestore_db.db, "dashboard", handle_event)
+    asyncio.run(consumer.run())
+"""
+
+import asyncio
+import logging
+from typing import Dict, List, Any, Optional, Callable
+from google.cloud import firestore
+
+from database.schema import Collections
+
+logger = logging.getLogger(__name__)
+
+
+class SlotEventOutbox:
+    def __init__(self, db_client: firestore.Client):
+        self.db = db_client
+
+    def append(
+        self,
+        transaction,
+        slot_id: str,
+        slot_data: Dict[str, Any],
+        from_status: Optional[str],
+        to_status: str,
+        user_id: str = None
+    ) -> str:
+        """
+        Append a state-change event inside the caller's transaction
+
+        Args:
+            transaction: Active Firestore transaction (all reads must already be done)
+            slot_id: Slot that changed
+            slot_data: Slot as read in the transaction
+            from_status: Status before the transition (None for a new slot)
+            to_status: Status after the transition
+            user_id: Customer the transition belongs to (defaults to the slot's user)
+
+        Returns:
+            Event ID
+        """
+        event_ref = self.db.collection(Collections.SLOT_EVENTS).document()
+        transaction.set(event_ref, {
+            'slot_id': slot_id,
+            'vendor_id': slot_data.get('vendor_id'),
+            'resource_id': slot_data.get('resource_id'),
+            'date': slot_data.get('date'),
+            'start_time': slot_data.get('start_time'),
+            'from_status': from_status,
+            'to_status': to_status,
+            'user_id': user_id if user_id is not None else slot_data.get('user_id'),
+            'created_at': firestore.SERVER_TIMESTAMP
+        })
+        return event_ref.id
+
+    def read_after(self, checkpoint: Optional[Dict[str, Any]], limit: int = 100) -> List[Dict[str, Any]]:
+        """
+        Events in commit order after a checkpoint ({'created_at', 'event_id'})
+        Document ID breaks ties between events committed at the same timestamp.
+        """
+        query = self.db.collection(Collections.SLOT_EVENTS)\
+            .order_by('created_at')\
+            .order_by('__name__')
+
+        if checkpoint and checkpoint.get('event_id'):
+            query = query.start_after({
+                'created_at': checkpoint['created_at'],
+                '__name__': self.db.collection(Collections.SLOT_EVENTS).document(checkpoint['event_id'])
+            })
+
+        events = []
+        for doc in query.limit(limit).stream():
+            data = doc.to_dict()
+            data['id'] = doc.id
+            events.append(data)
+        return events
+
+    def prune(self, before) -> int:
+        """Delete events created before a datetime (run after all consumers have passed it)"""
+        deleted = 0
+        while True:
+            docs = list(self.db.collection(Collections.SLOT_EVENTS)
+                        .where('created_at', '<', before)
+                        .limit(500)
+                        .stream())
+            if not docs:
+                break
+
+            batch = self.db.batch()
+            for doc in docs:
+                batch.delete(doc.reference)
+            batch.commit()
+            deleted += len(docs)
+
+        if deleted:
+            logger.info(f"Pruned {deleted} slot events")
+        return deleted
+
+
+class SlotEventConsumer:
+    """
+    Tails the outbox in order for one named consumer (at-least-once delivery)
+
+    The checkpoint lives in outbox_checkpoints/{name} and only advances after
+    the handler has processed a whole batch, so handlers must be idempotent.
+    """
+
+    def __init__(
+        self,
+        db_client: firestore.Client,
+        name: str,
+        handler: Callable[[Dict[str, Any]], Any],
+        batch_size: int = 100
+    ):
+        self.db = db_client
+        self.name = name
+        self.handler = handler
+        self.batch_size = batch_size
+        self.outbox = SlotEventOutbox(db_client)
+        self._checkpoint_ref = self.db.collection(Collections.OUTBOX_CHECKPOINTS).document(name)
+        self._running = False
+
+    def get_checkpoint(self) -> Optional[Dict[str, Any]]:
+        doc = self._checkpoint_ref.get()
+        return doc.to_dict() if doc.exists else None
+
+    def _save_checkpoint(self, event: Dict[str, Any]):
+        self._checkpoint_ref.set({
+            'created_at': event['created_at'],
+            'event_id': event['id'],
+            'updated_at': firestore.SERVER_TIMESTAMP
+        })
+
+    async def poll_once(self) -> int:
+        """
+        Deliver the next batch of events to the handler
+
+        Returns:
+            Number of events processed
+        """
+        # The Firestore client is synchronous - keep its round trips off the event loop
+        loop = asyncio.get_running_loop()
+        checkpoint = await loop.run_in_executor(None, self.get_checkpoint)
+        events = await loop.run_in_executor(None, self.outbox.read_after, checkpoint, self.batch_size)
+
+        for event in events:
+            result = self.handler(event)
+            if asyncio.iscoroutine(result):
+                await result
+
+        if events:
+            await loop.run_in_executor(None, self._save_checkpoint, events[-1])
+            logger.debug(f"Consumer {self.name} processed {len(events)} slot events")
+
+        return len(events)
+
+    async def run(self, poll_interval: float = 2.0):
+        """Poll until stop() - drains full batches back to back, sleeps when caught up"""
+        self._running = True
+        logger.info(f"Slot event consumer '{self.name}' started")
+
+        while self._running:
+            try:
+                processed = await self.poll_once()
+            except Exception as e:
+                logger.error(f"Slot event consumer '{self.name}' failed: {e}")
+                processed = 0
+
+            if processed < self.batch_size:
+                await asyncio.sleep(poll_interval)
+
+        logger.info(f"Slot event consumer '{self.name}' stopped")
+
+    def stop(self):
+        self._running = False
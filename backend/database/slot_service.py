@@ -4,22 +4,109 @@ Handles slot locking, payment, and confirmation using Firestore transactions
 """
 
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, List, Any, Optional
 from datetime import datetime, timedelta, timezone
 from google.cloud import firestore
 
+from app.config import settings
 from database.schema import (
-    Collections, SlotStatus, PaymentStatus, PriceTier,
+    Collections, SlotStatus, PaymentStatus, PriceTier, AvailabilityMode,
     HOLD_EXPIRY_MINUTES
 )
+from database.virtual_slots import VirtualSlotService
+from database.daily_stats import DailyStatsCounter
+from database.slot_events import SlotEventOutbox
+from database.hold_expiry import hold_expired, is_slot_available, WRITE_BACK_BATCH_SIZE
 
 logger = logging.getLogger(__name__)
 
 
+# Booking fields cleared when a slot goes back to available in place
+BOOKING_FIELDS = [
+    'user_id', 'payment_id', 'hold_expires_at', 'booking_source',
+    'customer_name', 'customer_phone', 'cancelled_by', 'cancellation_reason', 'block_reason'
+]
+
+# Suffix used by the old cancel/reject flow (see compact_replacement_slots)
+REPLACEMENT_SUFFIX = "_replacement"
+
+
 class SlotService:
-    def __init__(self, db_client: firestore.Client):
+    def __init__(self, db_client: firestore.Client, availability_mode: str = None):
         self.db = db_client
-        logger.info("SlotService initialized")
+        mode = availability_mode or settings.SLOT_AVAILABILITY_MODE
+        self.virtual_slots = VirtualSlotService(db_client) if mode == AvailabilityMode.VIRTUAL.value else None
+        self.daily_stats = DailyStatsCounter(db_client)
+        self.events = SlotEventOutbox(db_client)
+        logger.info(f"SlotService initialized (availability mode: {mode})")
+    
+    def _get_slot(self, transaction, slot_ref) -> tuple:
+        """
+        Read a slot inside a transaction
+        In virtual mode a slot with no document is resolved from the derived grid
+        
+        Returns:
+            (slot_data, exists) - slot_data is None if the slot is unknown
+        """
+        slot_doc = slot_ref.get(transaction=transaction)
+        if slot_doc.exists:
+            return slot_doc.to_dict(), True
+        
+        if self.virtual_slots:
+            template = self.virtual_slots.resolve_slot(slot_ref.id)
+            if template:
+                return template, False
+        
+        return None, False
+    
+    def _write_slot(self, transaction, slot_ref, slot_data: Dict[str, Any], exists: bool, updates: Dict[str, Any]):
+        """Apply a transition, creating the exception document for virtual slots"""
+        if exists:
+            transaction.update(slot_ref, updates)
+        else:
+            transaction.set(slot_ref, VirtualSlotService.to_exception_doc(slot_data, updates))
+    
+    def _record_transition(self, transaction, slot_id: str, slot_data: Dict[str, Any],
+                           from_status: str, to_status: str, user_id: str = None):
+        """Side effects of every transition: daily stats deltas and the outbox event"""
+        self.daily_stats.record(transaction, slot_data, from_status, to_status)
+        self.events.append(transaction, slot_id, slot_data, from_status, to_status, user_id)
+    
+    def _return_to_available(self, transaction, slot_ref):
+        """
+        Put a slot back into inventory under its own ID
+        In virtual mode the exception document is dropped (the derived grid covers it)
+        """
+        if self.virtual_slots:
+            transaction.delete(slot_ref)
+            return
+        
+        updates = {field: None for field in BOOKING_FIELDS}
+        updates['status'] = SlotStatus.AVAILABLE.value
+        updates['updated_at'] = firestore.SERVER_TIMESTAMP
+        transaction.update(slot_ref, updates)
+    
+    def _archive_booking(self, transaction, slot_id: str, slot_data: Dict[str, Any], details: Dict[str, Any]) -> str:
+        """
+        Move a booking record into slot_history inside the current transaction
+        
+        Returns:
+            ID of the history record
+        """
+        history_ref = self.db.collection(Collections.SLOT_HISTORY).document()
+        
+        record = {k: v for k, v in slot_data.items() if k not in ('id', 'created_at', 'updated_at')}
+        record.update({
+            'slot_id': slot_id,
+            'status': SlotStatus.CANCELLED.value,
+            'previous_status': slot_data.get('status'),
+            'booked_at': slot_data.get('updated_at'),
+            'archived_at': firestore.SERVER_TIMESTAMP
+        })
+        record.update(details)
+        
+        transaction.set(history_ref, record)
+        return history_ref.id
     
     def lock_slot(self, slot_id: str, user_id: str, booking_source: str = "app") -> Dict[str, Any]:
         """
@@ -37,20 +124,20 @@ class SlotService:
             @firestore.transactional
             def lock_transaction(transaction):
                 slot_ref = self.db.collection(Collections.SLOTS).document(slot_id)
-                slot_doc = slot_ref.get(transaction=transaction)
+                slot_data, exists = self._get_slot(transaction, slot_ref)
                 
-                if not slot_doc.exists:
+                if slot_data is None:
                     return {'success': False, 'error': 'Slot not found'}
                 
-                slot_data = slot_doc.to_dict()
-                
-                if slot_data.get('status') != SlotStatus.AVAILABLE.value:
+                # A lapsed hold is free the instant it expires, no cleanup needed first
+                if not is_slot_available(slot_data):
                     current_status = slot_data.get('status')
                     return {'success': False, 'error': f'Slot is not available (current: {current_status})'}
                 
                 hold_expires = datetime.now(timezone.utc) + timedelta(minutes=HOLD_EXPIRY_MINUTES)
                 
-                transaction.update(slot_ref, {
+                self._record_transition(transaction, slot_id, slot_data, slot_data.get('status'), SlotStatus.LOCKED.value, user_id)
+                self._write_slot(transaction, slot_ref, slot_data, exists, {
                     'status': SlotStatus.LOCKED.value,
                     'user_id': user_id,
                     'booking_source': booking_source,
@@ -104,12 +191,8 @@ class SlotService:
                 if slot_data.get('user_id') != user_id:
                     return {'success': False, 'error': 'Slot is locked by another user'}
                 
-                transaction.update(slot_ref, {
-                    'status': SlotStatus.AVAILABLE.value,
-                    'user_id': None,
-                    'hold_expires_at': None,
-                    'updated_at': firestore.SERVER_TIMESTAMP
-                })
+                self._record_transition(transaction, slot_id, slot_data, SlotStatus.LOCKED.value, SlotStatus.AVAILABLE.value, user_id)
+                self._return_to_available(transaction, slot_ref)
                 
                 return {'success': True, 'slot_id': slot_id}
             
@@ -148,16 +231,12 @@ class SlotService:
                 if slot_data.get('user_id') != user_id:
                     return {'success': False, 'error': 'Slot is locked by another user'}
                 
-                hold_expires = slot_data.get('hold_expires_at')
-                if hold_expires and datetime.now(timezone.utc) > hold_expires:
-                    transaction.update(slot_ref, {
-                        'status': SlotStatus.AVAILABLE.value,
-                        'user_id': None,
-                        'hold_expires_at': None,
-                        'updated_at': firestore.SERVER_TIMESTAMP
-                    })
+                if hold_expired(slot_data):
+                    self._record_transition(transaction, slot_id, slot_data, SlotStatus.LOCKED.value, SlotStatus.AVAILABLE.value, user_id)
+                    self._return_to_available(transaction, slot_ref)
                     return {'success': False, 'error': 'Hold has expired, slot released'}
                 
+                self._record_transition(transaction, slot_id, slot_data, SlotStatus.LOCKED.value, SlotStatus.PENDING.value, user_id)
                 transaction.update(slot_ref, {
                     'status': SlotStatus.PENDING.value,
                     'payment_id': payment_id,
@@ -207,6 +286,7 @@ class SlotService:
                 if slot_data.get('status') != SlotStatus.PENDING.value:
                     return {'success': False, 'error': 'Slot is not in pending state'}
                 
+                self._record_transition(transaction, slot_id, slot_data, SlotStatus.PENDING.value, SlotStatus.CONFIRMED.value)
                 transaction.update(slot_ref, {
                     'status': SlotStatus.CONFIRMED.value,
                     'updated_at': firestore.SERVER_TIMESTAMP
@@ -234,9 +314,9 @@ class SlotService:
     def reject_booking(self, slot_id: str, vendor_id: str, reason: str = '') -> Dict[str, Any]:
         """
         Vendor rejects the booking (payment issue)
-        Creates a new available slot and marks this one as cancelled
+        The booking record moves to slot_history and the slot is released in place
         
-        State transition: pending -> cancelled
+        State transition: pending -> available
         """
         try:
             @firestore.transactional
@@ -255,38 +335,18 @@ class SlotService:
                 if slot_data.get('status') != SlotStatus.PENDING.value:
                     return {'success': False, 'error': 'Slot is not in pending state'}
                 
-                transaction.update(slot_ref, {
-                    'status': SlotStatus.CANCELLED.value,
+                self._record_transition(transaction, slot_id, slot_data, SlotStatus.PENDING.value, SlotStatus.CANCELLED.value)
+                history_id = self._archive_booking(transaction, slot_id, slot_data, {
                     'cancellation_reason': reason,
-                    'updated_at': firestore.SERVER_TIMESTAMP
+                    'cancelled_by': 'vendor'
                 })
-                
-                new_slot_id = f"{slot_id}_replacement"
-                new_slot_ref = self.db.collection(Collections.SLOTS).document(new_slot_id)
-                
-                new_slot_data = {
-                    'vendor_id': slot_data.get('vendor_id'),
-                    'service_id': slot_data.get('service_id'),
-                    'resource_id': slot_data.get('resource_id'),
-                    'start_time': slot_data.get('start_time'),
-                    'end_time': slot_data.get('end_time'),
-                    'date': slot_data.get('date'),
-                    'price': slot_data.get('price'),
-                    'price_tier_used': slot_data.get('price_tier_used', PriceTier.BASE.value),
-                    'status': SlotStatus.AVAILABLE.value,
-                    'user_id': None,
-                    'payment_id': None,
-                    'hold_expires_at': None,
-                    'created_at': firestore.SERVER_TIMESTAMP,
-                    'updated_at': firestore.SERVER_TIMESTAMP
-                }
-                
-                transaction.set(new_slot_ref, new_slot_data)
+                self._return_to_available(transaction, slot_ref)
                 
                 return {
                     'success': True,
                     'cancelled_slot_id': slot_id,
-                    'new_slot_id': new_slot_id,
+                    'slot_id': slot_id,
+                    'history_id': history_id,
                     'user_id': slot_data.get('user_id')
                 }
             
@@ -294,7 +354,7 @@ class SlotService:
             result = reject_transaction(transaction)
             
             if result['success']:
-                logger.info(f"Booking rejected for slot {slot_id}, new slot created: {result['new_slot_id']}")
+                logger.info(f"Booking rejected for slot {slot_id}, archived as {result['history_id']}")
             
             return result
             
@@ -305,9 +365,9 @@ class SlotService:
     def cancel_booking(self, slot_id: str, user_id: str = None, vendor_id: str = None) -> Dict[str, Any]:
         """
         Cancel a confirmed booking (by user or vendor)
-        Creates a new available slot
+        The booking record moves to slot_history and the slot is released in place
         
-        State transition: confirmed -> cancelled
+        State transition: confirmed -> available
         """
         try:
             @firestore.transactional
@@ -331,38 +391,17 @@ class SlotService:
                 
                 cancelled_by = 'user' if user_id else 'vendor'
                 
-                transaction.update(slot_ref, {
-                    'status': SlotStatus.CANCELLED.value,
-                    'cancelled_by': cancelled_by,
-                    'updated_at': firestore.SERVER_TIMESTAMP
+                self._record_transition(transaction, slot_id, slot_data, slot_data.get('status'), SlotStatus.CANCELLED.value)
+                history_id = self._archive_booking(transaction, slot_id, slot_data, {
+                    'cancelled_by': cancelled_by
                 })
-                
-                new_slot_id = f"{slot_id}_replacement"
-                new_slot_ref = self.db.collection(Collections.SLOTS).document(new_slot_id)
-                
-                new_slot_data = {
-                    'vendor_id': slot_data.get('vendor_id'),
-                    'service_id': slot_data.get('service_id'),
-                    'resource_id': slot_data.get('resource_id'),
-                    'start_time': slot_data.get('start_time'),
-                    'end_time': slot_data.get('end_time'),
-                    'date': slot_data.get('date'),
-                    'price': slot_data.get('price'),
-                    'price_tier_used': slot_data.get('price_tier_used', PriceTier.BASE.value),
-                    'status': SlotStatus.AVAILABLE.value,
-                    'user_id': None,
-                    'payment_id': None,
-                    'hold_expires_at': None,
-                    'created_at': firestore.SERVER_TIMESTAMP,
-                    'updated_at': firestore.SERVER_TIMESTAMP
-                }
-                
-                transaction.set(new_slot_ref, new_slot_data)
+                self._return_to_available(transaction, slot_ref)
                 
                 return {
                     'success': True,
                     'cancelled_slot_id': slot_id,
-                    'new_slot_id': new_slot_id,
+                    'slot_id': slot_id,
+                    'history_id': history_id,
                     'cancelled_by': cancelled_by
                 }
             
@@ -391,23 +430,14 @@ class SlotService:
                 .where('status', '==', SlotStatus.LOCKED.value)\
                 .stream()
             
-            batch = self.db.batch()
+            expired_ids = [doc.id for doc in docs if hold_expired(doc.to_dict(), now)]
             
-            for doc in docs:
-                slot_data = doc.to_dict()
-                hold_expires = slot_data.get('hold_expires_at')
-                
-                if hold_expires and now > hold_expires:
-                    batch.update(doc.reference, {
-                        'status': SlotStatus.AVAILABLE.value,
-                        'user_id': None,
-                        'hold_expires_at': None,
-                        'updated_at': firestore.SERVER_TIMESTAMP
-                    })
-                    expired_count += 1
+            for i in range(0, len(expired_ids), WRITE_BACK_BATCH_SIZE):
+                result = self.release_expired_holds(expired_ids[i:i + WRITE_BACK_BATCH_SIZE])
+                if result['success']:
+                    expired_count += len(result['released'])
             
             if expired_count > 0:
-                batch.commit()
                 logger.info(f"Released {expired_count} expired slot locks")
             
             return {
@@ -419,6 +449,137 @@ class SlotService:
             logger.error(f"Error cleaning up expired locks: {e}")
             return {'success': False, 'error': str(e)}
     
+    def release_expired_holds(self, slot_ids: List[str]) -> Dict[str, Any]:
+        """
+        Release a batch of expired holds in one transaction
+        Each slot is re-checked, so holds renewed or converted since they were seen are kept.
+        
+        State transition: locked (expired) -> available
+        """
+        try:
+            @firestore.transactional
+            def release_transaction(transaction):
+                refs = [self.db.collection(Collections.SLOTS).document(slot_id) for slot_id in slot_ids]
+                docs = list(self.db.get_all(refs, transaction=transaction))
+                
+                now = datetime.now(timezone.utc)
+                released = []
+                for doc in docs:
+                    if not doc.exists:
+                        continue
+                    slot_data = doc.to_dict()
+                    if not hold_expired(slot_data, now):
+                        continue
+                    self._record_transition(transaction, doc.id, slot_data, SlotStatus.LOCKED.value, SlotStatus.AVAILABLE.value)
+                    self._return_to_available(transaction, doc.reference)
+                    released.append(doc.id)
+                
+                return {'success': True, 'released': released}
+            
+            if not slot_ids:
+                return {'success': True, 'released': []}
+            
+            transaction = self.db.transaction()
+            return release_transaction(transaction)
+            
+        except Exception as e:
+            logger.error(f"Error releasing expired holds: {e}")
+            return {'success': False, 'error': str(e), 'released': []}
+    
+    def compact_replacement_slots(self) -> Dict[str, Any]:
+        """
+        Fold legacy `{slot_id}_replacement` chains back into their root slot
+        (one-off maintenance job, see database/seed/compact_replacement_slots.py)
+        
+        Cancelled records in a chain move to slot_history, the live state at the
+        tail of the chain is written back under the root slot ID and the
+        replacement documents are deleted.
+        """
+        try:
+            chains = {}
+            for doc in self.db.collection(Collections.SLOTS).stream():
+                if REPLACEMENT_SUFFIX not in doc.id:
+                    continue
+                root_id = doc.id.split(REPLACEMENT_SUFFIX)[0]
+                depth = doc.id.count(REPLACEMENT_SUFFIX)
+                chains[root_id] = max(chains.get(root_id, 0), depth)
+            
+            compacted = 0
+            archived = 0
+            skipped = []
+            
+            for root_id, depth in chains.items():
+                result = self._compact_chain(root_id, depth)
+                if result['success']:
+                    compacted += 1
+                    archived += result['archived']
+                else:
+                    skipped.append(root_id)
+                    logger.warning(f"Skipped replacement chain {root_id}: {result['error']}")
+            
+            logger.info(f"Compacted {compacted} replacement chains, archived {archived} bookings")
+            
+            return {
+                'success': True,
+                'chains': len(chains),
+                'compacted': compacted,
+                'archived': archived,
+                'skipped': skipped
+            }
+            
+        except Exception as e:
+            logger.error(f"Error compacting replacement slots: {e}")
+            return {'success': False, 'error': str(e)}
+    
+    def _compact_chain(self, root_id: str, depth: int) -> Dict[str, Any]:
+        @firestore.transactional
+        def compact_transaction(transaction):
+            chain = []
+            for i in range(depth + 1):
+                ref = self.db.collection(Collections.SLOTS).document(root_id + REPLACEMENT_SUFFIX * i)
+                doc = ref.get(transaction=transaction)
+                if doc.exists:
+                    chain.append((ref, doc.to_dict()))
+            
+            if not chain:
+                return {'success': False, 'error': 'Chain no longer exists'}
+            
+            *history, (_, live_data) = chain
+            for _, data in history:
+                if data.get('status') != SlotStatus.CANCELLED.value:
+                    return {'success': False, 'error': f"Unexpected {data.get('status')} slot inside chain"}
+            
+            archived = 0
+            for _, data in history:
+                self._archive_booking(transaction, root_id, data, {'previous_status': None})
+                archived += 1
+            
+            # A cancelled tail has no live booking left - archive it and free the slot
+            if live_data.get('status') == SlotStatus.CANCELLED.value:
+                self._archive_booking(transaction, root_id, live_data, {'previous_status': None})
+                archived += 1
+                live_data = {**live_data, **{field: None for field in BOOKING_FIELDS}}
+                live_data['status'] = SlotStatus.AVAILABLE.value
+            
+            root_ref = self.db.collection(Collections.SLOTS).document(root_id)
+            for ref, _ in chain:
+                if ref.id != root_id:
+                    transaction.delete(ref)
+            
+            if self.virtual_slots and live_data.get('status') == SlotStatus.AVAILABLE.value:
+                transaction.delete(root_ref)
+            else:
+                live_data['updated_at'] = firestore.SERVER_TIMESTAMP
+                transaction.set(root_ref, live_data)
+            
+            return {'success': True, 'archived': archived}
+        
+        try:
+            transaction = self.db.transaction()
+            return compact_transaction(transaction)
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+    
     def check_slot_availability(self, slot_id: str) -> Dict[str, Any]:
         """
         Check if a slot is available for booking
@@ -429,6 +590,10 @@ class SlotService:
             slot_doc = slot_ref.get()
             
             if not slot_doc.exists:
+                if self.virtual_slots:
+                    template = self.virtual_slots.resolve_slot(slot_id)
+                    if template:
+                        return {'available': True, 'slot': template}
                 return {'available': False, 'error': 'Slot not found'}
             
             slot_data = slot_doc.to_dict()
@@ -437,17 +602,10 @@ class SlotService:
             if status == SlotStatus.AVAILABLE.value:
                 return {'available': True, 'slot': slot_data}
             
-            if status == SlotStatus.LOCKED.value:
-                hold_expires = slot_data.get('hold_expires_at')
-                if hold_expires and datetime.now(timezone.utc) > hold_expires:
-                    slot_ref.update({
-                        'status': SlotStatus.AVAILABLE.value,
-                        'user_id': None,
-                        'hold_expires_at': None,
-                        'updated_at': firestore.SERVER_TIMESTAMP
-                    })
-                    slot_data['status'] = SlotStatus.AVAILABLE.value
-                    return {'available': True, 'slot': slot_data, 'was_expired': True}
+            if hold_expired(slot_data):
+                self.release_expired_holds([slot_id])
+                slot_data['status'] = SlotStatus.AVAILABLE.value
+                return {'available': True, 'slot': slot_data, 'was_expired': True}
             
             return {
                 'available': False,
@@ -469,22 +627,23 @@ class SlotService:
             @firestore.transactional
             def block_transaction(transaction):
                 slot_ref = self.db.collection(Collections.SLOTS).document(slot_id)
-                slot_doc = slot_ref.get(transaction=transaction)
+                slot_data, exists = self._get_slot(transaction, slot_ref)
                 
-                if not slot_doc.exists:
+                if slot_data is None:
                     return {'success': False, 'error': 'Slot not found'}
                 
-                slot_data = slot_doc.to_dict()
-                
                 if slot_data.get('vendor_id') != vendor_id:
                     return {'success': False, 'error': 'Unauthorized: slot belongs to different vendor'}
                 
-                if slot_data.get('status') != SlotStatus.AVAILABLE.value:
+                if not is_slot_available(slot_data):
                     return {'success': False, 'error': 'Slot is not available to block'}
                 
-                transaction.update(slot_ref, {
+                self._record_transition(transaction, slot_id, slot_data, slot_data.get('status'), SlotStatus.BLOCKED.value)
+                self._write_slot(transaction, slot_ref, slot_data, exists, {
                     'status': SlotStatus.BLOCKED.value,
                     'block_reason': reason,
+                    'user_id': None,
+                    'hold_expires_at': None,
                     'updated_at': firestore.SERVER_TIMESTAMP
                 })
                 
@@ -525,11 +684,8 @@ class SlotService:
                 if slot_data.get('status') != SlotStatus.BLOCKED.value:
                     return {'success': False, 'error': 'Slot is not blocked'}
                 
-                transaction.update(slot_ref, {
-                    'status': SlotStatus.AVAILABLE.value,
-                    'block_reason': None,
-                    'updated_at': firestore.SERVER_TIMESTAMP
-                })
+                self._record_transition(transaction, slot_id, slot_data, SlotStatus.BLOCKED.value, SlotStatus.AVAILABLE.value)
+                self._return_to_available(transaction, slot_ref)
                 
                 return {'success': True, 'slot_id': slot_id}
             
@@ -557,25 +713,25 @@ class SlotService:
             @firestore.transactional
             def manual_transaction(transaction):
                 slot_ref = self.db.collection(Collections.SLOTS).document(slot_id)
-                slot_doc = slot_ref.get(transaction=transaction)
+                slot_data, exists = self._get_slot(transaction, slot_ref)
                 
-                if not slot_doc.exists:
+                if slot_data is None:
                     return {'success': False, 'error': 'Slot not found'}
                 
-                slot_data = slot_doc.to_dict()
-                
                 if slot_data.get('vendor_id') != vendor_id:
                     return {'success': False, 'error': 'Unauthorized: slot belongs to different vendor'}
                 
-                if slot_data.get('status') != SlotStatus.AVAILABLE.value:
+                if not is_slot_available(slot_data):
                     return {'success': False, 'error': 'Slot is not available'}
                 
-                transaction.update(slot_ref, {
+                self._record_transition(transaction, slot_id, slot_data, slot_data.get('status'), SlotStatus.CONFIRMED.value)
+                self._write_slot(transaction, slot_ref, slot_data, exists, {
                     'status': SlotStatus.CONFIRMED.value,
                     'booking_source': BookingSource.MANUAL.value,
                     'customer_name': customer_name,
                     'customer_phone': customer_phone,
                     'user_id': None,
+                    'hold_expires_at': None,
                     'updated_at': firestore.SERVER_TIMESTAMP
                 })
                 
@@ -620,6 +776,7 @@ class SlotService:
                 if slot_data.get('status') != SlotStatus.CONFIRMED.value:
                     return {'success': False, 'error': 'Slot is not in confirmed state'}
                 
+                self._record_transition(transaction, slot_id, slot_data, SlotStatus.CONFIRMED.value, SlotStatus.COMPLETED.value)
                 transaction.update(slot_ref, {
                     'status': SlotStatus.COMPLETED.value,
                     'completed_at': firestore.SERVER_TIMESTAMP,
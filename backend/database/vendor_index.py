@@ -0,0 +1,218 @@
+"""
+Vendor Name Index - In-memory fuzzy lookup of vendor names
+Vendor names are normalized into tokens, with an inverted trigram index for
+candidate generation and idf-weighted edit-distance scoring, so "ace padle"
+or "golden courts" resolve without streaming the vendors collection on every
+lookup. The index is rebuilt when it goes stale or after invalidate() is
+called by vendor writes.
+"""
+
+import math
+import re
+import threading
+import time
+import logging
+from collections import defaultdict
+from typing import Dict, List, Any, Optional, Set
+
+from app.metrics import metrics
+from database.schema import Collections
+
+logger = logging.getLogger(__name__)
+
+
+# Vendor names change rarely - rebuild at most this often unless invalidated
+VENDOR_INDEX_SECONDS = 300
+
+# Below this a candidate is not a match at all
+MIN_SCORE = 0.6
+# resolve() refuses to pick between candidates closer than this ("padel" -> any padel venue)
+AMBIGUITY_MARGIN = 0.05
+# Token pairs less similar than this don't count as the same word
+MIN_TOKEN_SIMILARITY = 0.6
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = {"the", "and", "of", "at", "in", "ka", "ki", "ke"}
+# Sport / venue words - on their own they name a service type, not a vendor
+GENERIC_TOKENS = {
+    "padel", "paddle", "futsal", "football", "cricket", "pickleball", "pickle", "salon",
+    "court", "club", "arena", "net", "ground", "pitch", "sport", "academy",
+}
+GENERIC_WEIGHT = 0.25
+
+
+def normalize_tokens(name: str) -> List[str]:
+    """Lowercase word tokens with stopwords and plural "s" removed ("Golden Courts" -> golden, court)"""
+    tokens = []
+    for token in TOKEN_RE.findall((name or "").lower()):
+        if token in STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+def trigrams(token: str) -> Set[str]:
+    padded = f" {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a: str, b: str) -> int:
+    """Levenshtein distance (tokens are short, so the plain DP is fine)"""
+    if a == b:
+        return 0
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+
+def token_similarity(a: str, b: str) -> float:
+    """1.0 for identical tokens, 0 below MIN_TOKEN_SIMILARITY; prefixes ("gold"/"golden") score well"""
+    if a == b:
+        return 1.0
+    if len(a) >= 3 and b.startswith(a):
+        return 0.9
+    similarity = 1.0 - edit_distance(a, b) / max(len(a), len(b))
+    return similarity if similarity >= MIN_TOKEN_SIMILARITY else 0.0
+
+
+class VendorNameIndex:
+    def __init__(self):
+        self._vendors: Dict[str, Dict[str, Any]] = {}  # vendor_id -> {name, tokens}
+        self._trigram_index: Dict[str, Set[str]] = defaultdict(set)
+        self._idf: Dict[str, float] = {}
+        self._built_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        """Force a rebuild on the next lookup (call after vendors are created or renamed)"""
+        self._built_at = None
+
+    def build(self, vendors: List[Dict[str, Any]]):
+        """
+        Build the index from vendor records
+
+        Args:
+            vendors: Dicts with 'id' and 'name' (or 'business_name')
+        """
+        entries = {}
+        trigram_index = defaultdict(set)
+        document_frequency = defaultdict(int)
+
+        for vendor in vendors:
+            name = vendor.get("name") or vendor.get("business_name")
+            if not vendor.get("id") or not name:
+                continue
+            tokens = normalize_tokens(name)
+            entries[vendor["id"]] = {"name": name, "tokens": tokens}
+            for token in set(tokens):
+                document_frequency[token] += 1
+                for gram in trigrams(token):
+                    trigram_index[gram].add(vendor["id"])
+
+        total = len(entries) or 1
+        with self._lock:
+            self._vendors = entries
+            self._trigram_index = trigram_index
+            # Words shared by many vendors ("padel", "court") identify little
+            self._idf = {token: math.log(1 + total / df) for token, df in document_frequency.items()}
+            self._built_at = time.monotonic()
+        logger.info(f"Vendor name index built ({len(entries)} vendors)")
+
+    def ensure_fresh(self, db_client):
+        """Rebuild from the vendors collection when stale or invalidated"""
+        if self._built_at is not None and time.monotonic() - self._built_at < VENDOR_INDEX_SECONDS:
+            return
+
+        vendors = []
+        for doc in db_client.collection(Collections.VENDORS).select(["name", "business_name"]).stream():
+            vendors.append({"id": doc.id, **(doc.to_dict() or {})})
+        metrics.inc('vendor_index_rebuilds_total')
+        self.build(vendors)
+
+    def _weight(self, token: str) -> float:
+        # Unseen query words weigh like a rare vendor word
+        weight = self._idf.get(token, math.log(1 + max(len(self._vendors), 1)))
+        return weight * GENERIC_WEIGHT if token in GENERIC_TOKENS else weight
+
+    def _score(self, query_tokens: List[str], name_tokens: List[str]) -> float:
+        matched = {}
+        query_weight = 0.0
+        query_hit = 0.0
+        for q in query_tokens:
+            best_token, best_sim = None, 0.0
+            for n in name_tokens:
+                sim = token_similarity(q, n)
+                if sim > best_sim:
+                    best_token, best_sim = n, sim
+            weight = self._weight(best_token or q)
+            query_weight += weight
+            query_hit += weight * best_sim
+            if best_token:
+                matched[best_token] = max(matched.get(best_token, 0.0), best_sim)
+
+        name_weight = sum(self._weight(n) for n in name_tokens)
+        name_hit = sum(self._weight(n) * sim for n, sim in matched.items())
+        if not query_weight or not name_weight:
+            return 0.0
+        # Mostly "did every word the user typed match", partly "how much of the name was said"
+        return 0.7 * (query_hit / query_weight) + 0.3 * (name_hit / name_weight)
+
+    def search(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
+        """
+        Ranked vendor candidates for a (possibly misspelled) name
+
+        Returns:
+            List of {vendor_id, name, score} with score >= MIN_SCORE, best first
+        """
+        query_tokens = normalize_tokens(query)
+        if not query_tokens:
+            return []
+
+        with self._lock:
+            vendors = self._vendors
+            candidates = set()
+            for token in query_tokens:
+                for gram in trigrams(token):
+                    candidates |= self._trigram_index.get(gram, set())
+
+        results = []
+        for vendor_id in candidates:
+            entry = vendors[vendor_id]
+            score = self._score(query_tokens, entry["tokens"])
+            if score >= MIN_SCORE:
+                results.append({"vendor_id": vendor_id, "name": entry["name"], "score": round(score, 3)})
+
+        results.sort(key=lambda r: (-r["score"], r["vendor_id"]))
+        return results[:limit]
+
+    def resolve(self, query: str) -> Optional[str]:
+        """Best vendor_id for a name, or None when nothing matches, the top matches tie or the name is only generic words"""
+        if all(token in GENERIC_TOKENS for token in normalize_tokens(query)):
+            metrics.inc('vendor_index_lookups_total', outcome='generic')
+            return None
+        results = self.search(query, limit=2)
+        if not results:
+            metrics.inc('vendor_index_lookups_total', outcome='miss')
+            return None
+        if len(results) > 1 and results[0]["score"] - results[1]["score"] < AMBIGUITY_MARGIN:
+            metrics.inc('vendor_index_lookups_total', outcome='ambiguous')
+            logger.info(f"Vendor name '{query}' is ambiguous: {results}")
+            return None
+        metrics.inc('vendor_index_lookups_total', outcome='hit')
+        return results[0]["vendor_id"]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'vendors': len(self._vendors),
+            'age_seconds': time.monotonic() - self._built_at if self._built_at is not None else None
+        }
+
+
+# Global vendor index instance
+vendor_index = VendorNameIndex()
@@ -0,0 +1,159 @@
+"""
+Virtual Slot Service - Non-materialized availability
+Derives free slots from vendor operating hours and service duration.
+Only exception documents (locked/pending/confirmed/blocked/...) live in `slots`,
+keyed by the same deterministic slot ID the seed generator uses.
+"""
+
+import logging
+import time
+from typing import Dict, List, Any, Optional
+from datetime import datetime
+from google.cloud import firestore
+
+from database.schema import Collections
+from database.slot_grid import generate_slots_for_resource, generate_slot_id, parse_slot_id
+from database.hold_expiry import hold_expired, is_slot_available
+
+logger = logging.getLogger(__name__)
+
+
+# Vendor catalog (hours, courts, service) changes rarely - cache it so that
+# availability reads only hit Firestore for the sparse exception documents
+CATALOG_CACHE_SECONDS = 300
+
+
+class VirtualSlotService:
+    def __init__(self, db_client: firestore.Client):
+        self.db = db_client
+        self._catalog_cache: Dict[str, tuple] = {}
+        self._resources_cache: Optional[tuple] = None
+        logger.info("VirtualSlotService initialized")
+
+    def invalidate_catalog(self, vendor_id: str = None):
+        """Drop cached vendor catalog (call after hours/resources/services change)"""
+        if vendor_id:
+            self._catalog_cache.pop(vendor_id, None)
+        else:
+            self._catalog_cache.clear()
+        self._resources_cache = None
+
+    def _get_catalog(self, vendor_id: str) -> Optional[Dict[str, Any]]:
+        cached = self._catalog_cache.get(vendor_id)
+        if cached and time.monotonic() - cached[0] < CATALOG_CACHE_SECONDS:
+            return cached[1]
+
+        vendor_doc = self.db.collection(Collections.VENDORS).document(vendor_id).get()
+        if not vendor_doc.exists:
+            return None
+
+        resources = []
+        for doc in self.db.collection(Collections.RESOURCES)\
+                .where('vendor_id', '==', vendor_id)\
+                .where('active', '==', True)\
+                .stream():
+            resources.append({'id': doc.id, **doc.to_dict()})
+
+        services = []
+        for doc in self.db.collection(Collections.SERVICES)\
+                .where('vendor_id', '==', vendor_id)\
+                .where('active', '==', True)\
+                .stream():
+            services.append({'id': doc.id, **doc.to_dict()})
+
+        catalog = {
+            'operating_hours': vendor_doc.to_dict().get('operating_hours', {}),
+            'resources': sorted(resources, key=lambda r: r['id']),
+            'service': sorted(services, key=lambda s: s['id'])[0] if services else None
+        }
+        self._catalog_cache[vendor_id] = (time.monotonic(), catalog)
+        return catalog
+
+    def derive_slots(self, vendor_id: str, date: str) -> List[Dict[str, Any]]:
+        """Full slot grid for a vendor/date, every slot in the available state"""
+        catalog = self._get_catalog(vendor_id)
+        if not catalog or not catalog['service']:
+            return []
+
+        day = datetime.strptime(date, "%Y-%m-%d")
+        slots = []
+        for resource in catalog['resources']:
+            slots.extend(generate_slots_for_resource(
+                vendor_id=vendor_id,
+                resource_id=resource['id'],
+                service=catalog['service'],
+                date=day,
+                operating_hours=catalog['operating_hours']
+            ))
+        return slots
+
+    def get_exceptions(self, vendor_id: str, date: str) -> Dict[str, Dict[str, Any]]:
+        """Stored slot documents for a vendor/date, keyed by slot ID"""
+        exceptions = {}
+        for doc in self.db.collection(Collections.SLOTS)\
+                .where('vendor_id', '==', vendor_id)\
+                .where('date', '==', date)\
+                .stream():
+            data = doc.to_dict()
+            data['id'] = doc.id
+            exceptions[doc.id] = data
+        return exceptions
+
+    def get_available_slots(self, vendor_id: str, date: str, expired_holds: List[str] = None) -> List[Dict[str, Any]]:
+        """
+        Derived grid minus every exception that is not itself available
+
+        Exceptions holding an expired lock count as available; their IDs are
+        appended to expired_holds (if given) for write-back.
+        """
+        exceptions = self.get_exceptions(vendor_id, date)
+
+        available = []
+        for slot in self.derive_slots(vendor_id, date):
+            exception = exceptions.get(slot['id'])
+            if exception and not is_slot_available(exception):
+                continue
+            if exception and expired_holds is not None and hold_expired(exception):
+                expired_holds.append(slot['id'])
+            available.append(slot)
+        return available
+
+    def resolve_slot(self, slot_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Rebuild the slot template behind a deterministic slot ID
+        Used when a lock/block/manual booking targets a slot with no document yet
+        """
+        parsed = parse_slot_id(slot_id)
+        if not parsed:
+            return None
+        date, time_str = parsed
+
+        for resource in self._get_all_resources():
+            vendor_id = resource.get('vendor_id')
+            if not vendor_id:
+                continue
+            if generate_slot_id(vendor_id, resource['id'], date, time_str) != slot_id:
+                continue
+
+            for slot in self.derive_slots(vendor_id, date):
+                if slot['id'] == slot_id:
+                    return slot
+        return None
+
+    def _get_all_resources(self) -> List[Dict[str, Any]]:
+        if self._resources_cache and time.monotonic() - self._resources_cache[0] < CATALOG_CACHE_SECONDS:
+            return self._resources_cache[1]
+
+        resources = []
+        for doc in self.db.collection(Collections.RESOURCES).where('active', '==', True).stream():
+            resources.append({'id': doc.id, **doc.to_dict()})
+        self._resources_cache = (time.monotonic(), resources)
+        return resources
+
+    @staticmethod
+    def to_exception_doc(slot: Dict[str, Any], updates: Dict[str, Any]) -> Dict[str, Any]:
+        """Materialize a derived slot as an exception document with the given transition applied"""
+        doc = {k: v for k, v in slot.items() if k != 'id'}
+        doc.update(updates)
+        doc['created_at'] = firestore.SERVER_TIMESTAMP
+        return doc
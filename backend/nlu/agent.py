@@ -3,14 +3,34 @@ NLU Agent - Natural Language Understanding using Gemini API
 Handles intent extraction and entity recognition for Roman Urdu/English mixed language
 """
 
+import json
 import logging
 from typing import Dict, List, Any, Optional
 from datetime import datetime, timedelta
 import google.generativeai as genai
 from app.config import settings
+from nlu.gemini_client import gemini_client, GeminiTimeoutError, GeminiUnavailableError
+from nlu.intent_cache import intent_cache
+from nlu.templates import template_renderer
+from nlu.local_classifier import export_labelled_turn
+from nlu.conversation_memory import format_memory, remembered
+from database.vendor_index import vendor_index
+from app.turn_memo import memoized
+from nlu.datetime_parser import parse_datetime, parse_date, parse_time, find_clock_time, ISO_DATE_RE, HH_MM_RE
+from nlu.prompts import (
+    INTENT_SYSTEM_INSTRUCTION,
+    FUSED_SYSTEM_INSTRUCTION,
+    RESPONSE_SYSTEM_INSTRUCTION,
+    format_history,
+    compact_response_context
+)
+from app.metrics import metrics
 
 logger = logging.getLogger(__name__)
 
+# Entities that determine an availability lookup (its turn-memo key)
+AVAILABILITY_ENTITY_KEYS = ["date", "time", "time_range", "service_type", "vendor_id", "vendor_name", "vendor"]
+
 
 class NLUAgent:
     """Natural Language Understanding agent using Gemini API"""
@@ -21,18 +41,39 @@ class NLUAgent:
             # Configure Gemini API
             genai.configure(api_key=settings.GEMINI_API_KEY)
             self.model = genai.GenerativeModel(settings.GEMINI_MODEL)
+            # Static instructions are set once per model (nlu/prompts.py); calls send only the varying part
+            self.intent_model = genai.GenerativeModel(
+                settings.GEMINI_MODEL,
+                system_instruction=INTENT_SYSTEM_INSTRUCTION
+            )
+            self.response_model = genai.GenerativeModel(
+                settings.GEMINI_MODEL,
+                system_instruction=RESPONSE_SYSTEM_INSTRUCTION
+            )
+            # Structured-output model for the fused single-call mode
+            self.json_model = genai.GenerativeModel(
+                settings.GEMINI_MODEL,
+                generation_config={"response_mime_type": "application/json"},
+                system_instruction=FUSED_SYSTEM_INSTRUCTION
+            )
             logger.info(f"NLU Agent initialized with Gemini model: {settings.GEMINI_MODEL}")
         except Exception as e:
             logger.error(f"Failed to initialize Gemini: {e}")
             raise
     
-    async def extract_intent(self, message: str, conversation_history: List[Dict[str, Any]]) -> Dict[str, Any]:
+    async def extract_intent(
+        self,
+        message: str,
+        conversation_history: List[Dict[str, Any]],
+        memory: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
         """
         Extract intent and entities from user message
         
         Args:
             message: User's message
             conversation_history: Previous conversation context
+            memory: Conversation memory (slots + summary) - sent instead of the transcript when given
             
         Returns:
             Dict with intent, entities, and confidence
@@ -44,11 +85,18 @@ class NLUAgent:
         logger.info("=" * 70)
         
         try:
-            # Build context from conversation history
-            logger.info("📝 [extract_intent] Building context from history...")
-            context = self._build_context(conversation_history)
+            # Build context from conversation memory (or history for callers without one)
+            logger.info("📝 [extract_intent] Building conversation context...")
+            context = self._build_context(conversation_history, memory)
             logger.info(f"   Context built: {len(context)} characters")
             
+            # The same message with the same context skips the LLM
+            cache_key = intent_cache.make_key(message, context)
+            cached = intent_cache.get(cache_key)
+            if cached:
+                logger.info(f"⚡ [extract_intent] Cache hit: {cached.get('intent')}")
+                return cached
+            
             # Create prompt for Gemini
             logger.info("📝 [extract_intent] Creating intent classification prompt...")
             prompt = self._create_intent_prompt(message, context)
@@ -56,7 +104,7 @@ class NLUAgent:
             
             # Get response from Gemini
             logger.info("🤖 [extract_intent] Calling Gemini API...")
-            response = await self._call_gemini(prompt)
+            response = await self._call_gemini(prompt, "intent", model=self.intent_model)
             logger.info(f"   Gemini response received: {len(response)} characters")
             
             # Parse Gemini response
@@ -64,31 +112,15 @@ class NLUAgent:
             result = self._parse_intent_response(response)
             
             # Post-process: Validate customer_name is only from current message
-            if result.get('entities', {}).get('customer_name'):
-                customer_name = result['entities']['customer_name']
-                message_lower = message.lower()
-                # Check if name appears in current message
-                name_parts = customer_name.lower().split()
-                name_in_message = any(part in message_lower for part in name_parts if len(part) > 2)
-                
-                # Check for explicit name patterns
-                explicit_patterns = [
-                    f"my name is {customer_name.lower()}",
-                    f"i am {customer_name.lower()}",
-                    f"i'm {customer_name.lower()}",
-                    f"name is {customer_name.lower()}",
-                ]
-                has_explicit_pattern = any(pattern in message_lower for pattern in explicit_patterns)
-                
-                if not name_in_message and not has_explicit_pattern:
-                    logger.warning(f"⚠️  customer_name '{customer_name}' not found in current message, removing it")
-                    result['entities']['customer_name'] = None
+            self._validate_customer_name(result, message)
             
             logger.info(f"✅ [extract_intent] RESULT:")
             logger.info(f"   Intent: {result.get('intent')} (confidence: {result.get('confidence', 0.0)})")
             logger.info(f"   Entities: {result.get('entities')}")
             logger.info("=" * 70)
             
+            intent_cache.put(cache_key, result)
+            export_labelled_turn(message, conversation_history, result.get('intent'))
             return result
             
         except Exception as e:
@@ -100,6 +132,97 @@ class NLUAgent:
                 'error': str(e)
             }
     
+    async def fused_turn(
+        self,
+        message: str,
+        conversation_history: List[Dict[str, Any]],
+        memory: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Classify, extract and draft the reply in one structured-output call (NLU_FUSED_MODE)
+        
+        Args:
+            message: User's message
+            conversation_history: Previous conversation context
+            memory: Conversation memory - sent instead of the transcript when given
+            
+        Returns:
+            extract_intent result plus 'reply' (None when the caller must run the
+            lookup + generate_response round) and the model's 'needs_lookup' flag
+        """
+        context = self._build_context(conversation_history, memory)
+        cache_key = intent_cache.make_key(message, context)
+        cached = intent_cache.get(cache_key)
+        if cached:
+            # Classification is known - only the reply call is left
+            logger.info(f"⚡ [fused_turn] Cache hit: {cached.get('intent')}")
+            return {**cached, 'reply': None, 'needs_lookup': True}
+        
+        try:
+            prompt = self._create_fused_prompt(message, context)
+            response = await self._call_gemini(prompt, "fused", model=self.json_model)
+            
+            result = self._parse_intent_response(response)
+            self._validate_customer_name(result, message)
+            result['needs_lookup'] = bool(result.get('needs_lookup'))
+            result['reply'] = (result.get('reply') or '').strip() or None
+            
+            logger.info(f"✅ [fused_turn] Intent: {result.get('intent')}, needs_lookup: {result['needs_lookup']}, has reply: {bool(result['reply'])}")
+            
+            intent_cache.put(cache_key, {
+                'intent': result.get('intent', 'unknown'),
+                'entities': result.get('entities', {}),
+                'confidence': result.get('confidence', 0.0)
+            })
+            export_labelled_turn(message, conversation_history, result.get('intent'))
+            return result
+            
+        except Exception as e:
+            logger.error(f"Error in fused NLU call: {e}")
+            return {
+                'intent': 'unknown',
+                'entities': {},
+                'confidence': 0.0,
+                'reply': None,
+                'needs_lookup': True,
+                'error': str(e)
+            }
+    
+    def requires_lookup(self, intent: str, entities: Dict[str, Any], context: Dict[str, Any]) -> bool:
+        """
+        Whether a turn needs real data (availability, pricing, venue info) or a booking write
+        
+        Mirrors what generate_response and query_node would do, so a fused reply
+        is only sent as-is when the two-call path would not have touched the database.
+        """
+        if intent in ["price_inquiry", "information"]:
+            return True
+        if self._should_check_availability(intent, entities):
+            return True
+        return intent in ["confirmation", "booking_request"] and self._has_complete_booking_details(entities, context)
+    
+    def _validate_customer_name(self, result: Dict[str, Any], message: str):
+        """Drop a customer_name that Gemini took from history instead of the current message"""
+        if result.get('entities', {}).get('customer_name'):
+            customer_name = result['entities']['customer_name']
+            message_lower = message.lower()
+            # Check if name appears in current message
+            name_parts = customer_name.lower().split()
+            name_in_message = any(part in message_lower for part in name_parts if len(part) > 2)
+            
+            # Check for explicit name patterns
+            explicit_patterns = [
+                f"my name is {customer_name.lower()}",
+                f"i am {customer_name.lower()}",
+                f"i'm {customer_name.lower()}",
+                f"name is {customer_name.lower()}",
+            ]
+            has_explicit_pattern = any(pattern in message_lower for pattern in explicit_patterns)
+            
+            if not name_in_message and not has_explicit_pattern:
+                logger.warning(f"⚠️  customer_name '{customer_name}' not found in current message, removing it")
+                result['entities']['customer_name'] = None
+    
     async def extract_entities(self, message: str, intent: str) -> Dict[str, Any]:
         """
         Extract specific entities from message based on intent
@@ -118,7 +241,7 @@ class NLUAgent:
             prompt = self._create_entity_prompt(message, intent)
             
             # Get response from Gemini
-            response = await self._call_gemini(prompt)
+            response = await self._call_gemini(prompt, "entities")
             
             # Parse entities
             entities = self._parse_entity_response(response)
@@ -130,105 +253,22 @@ class NLUAgent:
             logger.error(f"Error extracting entities: {e}")
             return {}
     
-    def _build_context(self, history: List[Dict[str, Any]]) -> str:
-        """Build conversation context from history"""
-        if not history:
-            return "No previous conversation."
-        
-        context = "Previous conversation:\n"
-        for msg in history[-10:]:  # Last 5 messages
-            role = msg.get('role', 'user')
-            content = msg.get('content', '')
-            context += f"{role}: {content}\n"
-        
-        return context
+    def _build_context(self, history: List[Dict[str, Any]], memory: Optional[Dict[str, Any]] = None) -> str:
+        """Build conversation context - the constant-size memory when there is one, else recent history"""
+        if memory is not None:
+            return format_memory(memory)
+        return format_history(history)
     
     def _create_intent_prompt(self, message: str, context: str) -> str:
-        """Create prompt for intent extraction - Enhanced with real conversation patterns"""
-        return f"""
-            You are a booking assistant for sports facilities (padel courts, futsal, cricket) and salons in Karachi, Pakistan.
-
-            Analyze this WhatsApp message and classify the user's intent. The user may speak in Roman Urdu mixed with English.
-
-            Message: "{message}"
-
-            Conversation History:
-            {context}
-
-            Possible Intents:
-            1. **greeting** - Simple greeting: "Hi", "Aoa", "Salam", "Hello" (NO booking info)
-            2. **booking_request** - Want to book a slot: "book slot", "want to book", "mujhe slot chahiye", "slot karna hai"
-            3. **availability_inquiry** - Check availability (often INCOMPLETE): 
-            - Complete: "slot available tomorrow 6-9"
-            - Incomplete: "koi slot hei?", "slot hai?", "any slot?" (MISSING date/time/service)
-            - Partial: "kal slot" (has date, missing time/service), "evening slot" (has time, missing date/service)
-            4. **service_selection** - Choose service type: "padel", "futsal", "cricket", "salon"
-            5. **date_selection** - Provide/ask about date: "tomorrow", "Friday", "kal", "next week"
-            6. **time_selection** - Provide/ask about time: "6-9", "evening", "shaam", "7pm"
-            7. **price_inquiry** - Ask about pricing: "how much", "charges", "price", "discount", "kitna"
-            8. **confirmation** - Confirm booking: "yes", "ok", "confirm", "book it", "Han g"
-            9. **cancellation** - Cancel booking: "cancel", "nahi", "don't want"
-            10. **modification** - Change booking: "actually", "change to", "instead"
-            11. **information** - General questions: "what services", "what are prices"
-            12. **payment_related** - Payment questions: "payment", "transfer", "account number"
-            13. **name_provided** - Sharing name: "Jazib Waqas", "My name is..."
-            14. **unknown** - Unclear or irrelevant message
-
-            IMPORTANT: Most customers send INCOMPLETE messages:
-            - "Salam" / "Hi" / "Aoa" → greeting only, ask what they want
-            - "koi slot hei?" → availability_inquiry (MISSING: date, time, service)
-            - "kal slot" → availability_inquiry (HAS: date, MISSING: time, service)
-            - "evening slot" → availability_inquiry (HAS: time, MISSING: date, service)
-
-            Roman Urdu Patterns (Common Incomplete Queries):
-            - "Aoa" / "AoA" / "Salam" / "Hi" = greeting only (NO booking info yet)
-            - "koi slot hei?" / "slot hai?" = incomplete availability query (MISSING: date, time, service)
-            - "kal slot" / "kal ka slot" = has date (tomorrow), MISSING: time, service
-            - "evening slot" / "shaam ka slot" = has time, MISSING: date, service
-            - "padel slot" / "futsal available?" = has service, MISSING: date, time
-            - "mujhe" = "I want"
-            - "chahiye" = "need"
-            - "karna hai" = "want to do"
-            - "mil jayega" = "will be available"
-            - "kal" = "tomorrow"
-            - "aaj" = "today"
-            - "shaam" = "evening" (6-9 PM)
+        """Per-call part of the intent prompt (instructions: INTENT_SYSTEM_INSTRUCTION)"""
+        return f"""Message: "{message}"
 
-            Common Incomplete Patterns:
-            1. Just greeting: "Salam", "Hi", "Aoa" → greeting intent, no entities
-            2. Vague availability: "koi slot hei?" → availability_inquiry, missing ALL entities
-            3. Date only: "kal slot", "tomorrow slot" → availability_inquiry, has date, missing time/service
-            4. Time only: "evening slot", "shaam ka time" → availability_inquiry, has time, missing date/service
-            5. Service only: "padel slot hai?" → availability_inquiry, has service, missing date/time
-
-            Context Clues:
-            - If previous message was about availability, "yes" likely means confirmation
-            - If asking about time slot, likely availability_inquiry or booking_request
-            - If customer provided date/time, likely confirming or asking for price
-            - INCOMPLETE queries are VERY COMMON (80% of initial messages) - handle gracefully by asking for missing info
-
-            Extract entities:
-            - service_type: padel, futsal, cricket, salon (handle typos: "paddle" = "padel")
-            - date: tomorrow, today, specific date, "kal", "aaj"
-            - time: 6-9, evening, morning, "shaam", "raat", specific time
-            - customer_name: Full name or first name - ONLY if explicitly mentioned in the CURRENT message (e.g., "My name is X", "I am X", or just "X" where X is clearly a name). DO NOT extract names from conversation history. If no name is mentioned in the current message, set customer_name to null.
-
-            CRITICAL: Only extract customer_name if the user explicitly provides it in the CURRENT message. Do NOT infer names from conversation history or previous messages. If the current message does not contain a name, customer_name must be null.
-
-            
-            Respond in JSON format:
-            {{
-                "intent": "booking_request",
-                "confidence": 0.95,
-                "reasoning": "User wants to book a slot (Roman Urdu: 'mujhe slot chahiye')",
-                "entities": {{
-                    "service_type": "padel",
-                    "date": "tomorrow",
-                    "time": "18:00-21:00",
-                    "customer_name": null
-                }}
-            }}
-            """
+Conversation History:
+{context}"""
+    
+    def _create_fused_prompt(self, message: str, context: str) -> str:
+        """Per-call part of the fused prompt - same as intent; json_model adds the reply instructions"""
+        return self._create_intent_prompt(message, context)
     
     def _create_entity_prompt(self, message: str, intent: str) -> str:
         """Create prompt for entity extraction"""
@@ -258,19 +298,14 @@ class NLUAgent:
             }}
             """
     
-    async def _call_gemini(self, prompt: str) -> str:
-        """Call Gemini API with prompt"""
+    async def _call_gemini(self, prompt: str, prompt_type: str = "default", model=None) -> str:
+        """Call Gemini API with prompt (bounded, async - see nlu/gemini_client.py)"""
         logger.info(f"🤖 [_call_gemini] Calling Gemini API...")
         logger.info(f"   Model: {settings.GEMINI_MODEL}")
         logger.info(f"   Prompt length: {len(prompt)} characters")
         try:
-            import asyncio
-            # Run the synchronous Gemini call in a thread pool
             logger.info(f"   ⏳ Sending request to Gemini...")
-            response = await asyncio.get_event_loop().run_in_executor(
-                None, self.model.generate_content, prompt
-            )
-            response_text = response.text
+            response_text = await gemini_client.generate_text(model or self.model, prompt, prompt_type)
             logger.info(f"   ✅ Gemini response received: {len(response_text)} characters")
             return response_text
         except Exception as e:
@@ -349,7 +384,11 @@ class NLUAgent:
             should_check = self._should_check_availability(intent, entities)
             logger.info(f"🔍 [generate_response] Checking if database lookup needed: {should_check}")
             
-            if should_check:
+            if should_check and context.get('availability'):
+                # Already looked up by query_node this turn
+                availability_data = context['availability']
+                logger.info("✅ [generate_response] Using availability computed by query_node")
+            elif should_check:
                 logger.info("✅ [generate_response] Database check triggered - calling _check_database_availability()")
                 availability_data = await self._check_database_availability(entities)
                 logger.info(f"📊 [generate_response] Database check result: success={availability_data.get('success')}, slots_found={len(availability_data.get('available_slots', []))}")
@@ -389,6 +428,7 @@ class NLUAgent:
                         logger.warning(f"⚠️  [generate_response] Could not resolve vendor_id for name: '{vendor_name}'")
                 
                 booking_details = self._extract_booking_details(entities, context)
+                context['booking_details'] = booking_details
                 booking_result = await self._create_booking(booking_details)
                 
                 if booking_result and booking_result.get('success'):
@@ -401,13 +441,30 @@ class NLUAgent:
                     logger.error(f"❌ [generate_response] Booking result is None")
                     context['booking_error'] = 'Booking failed: No result returned'
             
+            # Data-determined replies (slot lists, confirmations, payment details) skip Gemini;
+            # in degraded mode (circuit open) templates are all we have
+            template_reply = None
+            if settings.RESPONSE_TEMPLATES_ENABLED or gemini_client.degraded:
+                template_reply = template_renderer.render(intent, entities, context, availability_data)
+                if template_reply:
+                    return template_reply
+            if gemini_client.degraded:
+                return template_renderer.render_fallback(context)
+            
             # Create response generation prompt with availability AND booking data
             logger.info("📝 [generate_response] Creating response prompt...")
             prompt = self._create_response_prompt(intent, entities, context, availability_data)
             
             # Get response from Gemini
             logger.info("🤖 [generate_response] Calling Gemini to generate response...")
-            response = await self._call_gemini(prompt)
+            try:
+                response = await self._call_gemini(prompt, "response", model=self.response_model)
+            except (GeminiUnavailableError, GeminiTimeoutError) as e:
+                logger.warning(f"⚠️  [generate_response] Gemini unavailable ({e}) - degraded reply")
+                if not settings.RESPONSE_TEMPLATES_ENABLED:
+                    template_reply = template_renderer.render(intent, entities, context, availability_data)
+                return template_reply or template_renderer.render_fallback(context)
+            metrics.inc('response_source_total', source='gemini', template='none')
             logger.info(f"✅ [generate_response] Response generated: {response[:100]}...")
             logger.info("=" * 70)
             
@@ -422,7 +479,7 @@ class NLUAgent:
     def _has_complete_booking_details(self, entities: Dict[str, Any], context: Dict[str, Any]) -> bool:
         """
         Check if we have all required details to create a booking
-        Now extracts from conversation history if not in context
+        Falls back to the conversation memory for details given in earlier turns
         """
         phone_number = context.get('phone_number')
         if not phone_number:
@@ -430,30 +487,9 @@ class NLUAgent:
             return False
         
         # Try to get date from multiple sources
-        date = entities.get('date') or context.get('selected_date')
-        
-        # If no date in entities/context, check conversation history
-        if not date:
-            conversation_history = context.get('conversation_history', [])
-            for msg in reversed(conversation_history[-5:]):  # Check last 5 messages
-                if msg.get('role') == 'assistant':
-                    content = msg.get('content', '').lower()
-                    # Look for date mentions in agent responses
-                    import re
-                    date_pattern = r'(\d{1,2}\s+(?:january|february|march|april|may|june|july|august|september|october|november|december)\s+\d{4})'
-                    date_match = re.search(date_pattern, content, re.IGNORECASE)
-                    if date_match:
-                        # Convert to YYYY-MM-DD
-                        from datetime import datetime
-                        try:
-                            parsed = datetime.strptime(date_match.group(1), '%d %B %Y')
-                            date = parsed.strftime('%Y-%m-%d')
-                            logger.info(f"   ℹ️  Extracted date from history: {date}")
-                            break
-                        except:
-                            pass
+        date = entities.get('date') or context.get('selected_date') or remembered(context, 'date')
         
-        # Try to get time from entities or conversation history
+        # Try to get time from entities, the selected slot or memory
         time = entities.get('time')
         if not time:
             # Check if selected_slot has time
@@ -461,29 +497,8 @@ class NLUAgent:
             if selected_slot:
                 time = selected_slot.get('slot_time') or selected_slot.get('time')
         
-        # If still no time, extract from conversation history
         if not time:
-            conversation_history = context.get('conversation_history', [])
-            for msg in reversed(conversation_history[-5:]):  # Check last 5 messages
-                if msg.get('role') == 'assistant':
-                    content = msg.get('content', '').lower()
-                    # Look for time mentions like "8:00 AM" or "8 AM"
-                    import re
-                    time_pattern = r'(\d{1,2}):?(\d{2})?\s*(am|pm)'
-                    time_match = re.search(time_pattern, content, re.IGNORECASE)
-                    if time_match:
-                        hour = int(time_match.group(1))
-                        minute = int(time_match.group(2)) if time_match.group(2) else 0
-                        period = time_match.group(3).lower()
-                        
-                        if period == 'pm' and hour < 12:
-                            hour += 12
-                        elif period == 'am' and hour == 12:
-                            hour = 0
-                        
-                        time = f"{hour:02d}:{minute:02d}"
-                        logger.info(f"   ℹ️  Extracted time from history: {time}")
-                        break
+            time = remembered(context, 'time')
         
         # Check if we have all required fields
         if not date:
@@ -499,10 +514,10 @@ class NLUAgent:
 
     async def _get_vendor_id_by_name(self, vendor_name: str) -> Optional[str]:
         """
-        Map vendor name to vendor_id by querying Firestore
+        Map vendor name to vendor_id via the in-memory fuzzy vendor index
         
         Args:
-            vendor_name: Vendor name (e.g., "Golden Court", "Ace Padel Club")
+            vendor_name: Vendor name (e.g., "Golden Court", "Ace Padel Club", "ace padle")
             
         Returns:
             vendor_id if found, None otherwise
@@ -513,23 +528,15 @@ class NLUAgent:
         try:
             from app.firestore import firestore_db
             
-            vendor_name_lower = vendor_name.lower().strip()
+            # In-memory fuzzy index ("ace padle", "golden courts"), rebuilt when stale
+            vendor_index.ensure_fresh(firestore_db.db)
+            vendor_id = vendor_index.resolve(vendor_name)
             
-            # Query vendors collection by name (case-insensitive match)
-            vendors_ref = firestore_db.db.collection('vendors')
-            vendors = vendors_ref.stream()
+            if vendor_id:
+                logger.info(f"✅ Found vendor_id '{vendor_id}' for name '{vendor_name}'")
+                return vendor_id
             
-            for vendor_doc in vendors:
-                vendor_data = vendor_doc.to_dict()
-                vendor_doc_name = vendor_data.get('name', '').lower().strip()
-                
-                # Check if names match (exact or contains)
-                if vendor_name_lower == vendor_doc_name or vendor_name_lower in vendor_doc_name or vendor_doc_name in vendor_name_lower:
-                    vendor_id = vendor_doc.id
-                    logger.info(f"✅ Found vendor_id '{vendor_id}' for name '{vendor_name}'")
-                    return vendor_id
-            
-            logger.warning(f"⚠️  No vendor found for name: '{vendor_name}'")
+            logger.warning(f"⚠️  No unambiguous vendor for name: '{vendor_name}' (candidates: {vendor_index.search(vendor_name, limit=3)})")
             return None
             
         except Exception as e:
@@ -538,7 +545,7 @@ class NLUAgent:
 
     def _extract_booking_details(self, entities: Dict[str, Any], context: Dict[str, Any]) -> Dict[str, Any]:
         """
-        Extract all booking details from entities, context, and conversation history
+        Extract all booking details from entities, context, and conversation memory
         """
         logger.info("=" * 70)
         logger.info("🔍 [_extract_booking_details] EXTRACTING BOOKING DETAILS")
@@ -546,178 +553,52 @@ class NLUAgent:
         logger.info(f"   Context keys: {list(context.keys())}")
         logger.info("=" * 70)
         
-        selected_slot = context.get('selected_slot', {})
+        selected_slot = context.get('selected_slot') or {}
         
         # Get slot time (try multiple formats and sources)
-        slot_time = selected_slot.get('slot_time') or selected_slot.get('time') or entities.get('time')
-        logger.info(f"   Initial slot_time from context/entities: {slot_time}")
-        
-        # If no time found, extract from conversation history
-        if not slot_time:
-            conversation_history = context.get('conversation_history', [])
-            logger.info(f"   🔍 Searching conversation history for time (history length: {len(conversation_history)})")
-            for msg in reversed(conversation_history[-5:]):
-                if msg.get('role') == 'assistant':
-                    content = msg.get('content', '')
-                    logger.info(f"   📝 Checking message: {content[:100]}...")
-                    import re
-                    time_pattern = r'(\d{1,2}):(\d{2})\s*(am|pm)'
-                    time_match = re.search(time_pattern, content, re.IGNORECASE)
-                    if time_match:
-                        hour = int(time_match.group(1))
-                        minute = int(time_match.group(2))
-                        period = time_match.group(3).lower()
-                        
-                        logger.info(f"   🕐 Matched time: {hour}:{minute:02d} {period}")
-                        
-                        if period == 'pm' and hour < 12:
-                            hour += 12
-                        elif period == 'am' and hour == 12:
-                            hour = 0
-                        # For AM times 1-11, keep as is
-                        
-                        slot_time = f"{hour:02d}:{minute:02d}"
-                        logger.info(f"   ✅ Extracted time from history: {slot_time}")
-                        break
-                    else:
-                        logger.info(f"   ❌ No time pattern matched in this message")
+        slot_time = (
+            selected_slot.get('slot_time') or selected_slot.get('time') or entities.get('time')
+            or remembered(context, 'time')
+        )
+        logger.info(f"   Initial slot_time from context/entities/memory: {slot_time}")
         
         # Normalize slot_time to HH:MM format (24-hour)
         if slot_time:
-            import re
             slot_time_str = str(slot_time).strip()
             
-            # Check if it's already in HH:MM format (24-hour)
-            if re.match(r'^\d{2}:\d{2}$', slot_time_str):
+            if HH_MM_RE.match(slot_time_str):
                 slot_time = slot_time_str
                 logger.info(f"   ✅ Time already in HH:MM format: {slot_time}")
             else:
-                # Handle "HH:MM AM/PM" format (e.g., "12:00 PM", "09:00 AM")
-                am_pm_pattern_with_colon = r'(\d{1,2}):(\d{2})\s*(am|pm)'
-                am_pm_match = re.search(am_pm_pattern_with_colon, slot_time_str, re.IGNORECASE)
-                if am_pm_match:
-                    hour = int(am_pm_match.group(1))
-                    minute = int(am_pm_match.group(2))
-                    period = am_pm_match.group(3).lower()
-                    
-                    # Convert to 24-hour format
-                    if period == 'pm' and hour < 12:
-                        hour += 12
-                    elif period == 'am' and hour == 12:
-                        hour = 0
-                    
-                    slot_time = f"{hour:02d}:{minute:02d}"
-                    logger.info(f"   ✅ Converted '{slot_time_str}' to '{slot_time}' (24-hour format)")
+                # "12:00 PM", "9 pm", "12:00 PM - 01:00 PM" (start), "7 baje", "shaam"
+                normalized = find_clock_time(slot_time_str) or (parse_time(slot_time_str) or {}).get('start')
+                if normalized:
+                    logger.info(f"   ✅ Converted '{slot_time_str}' to '{normalized}' (24-hour format)")
+                    slot_time = normalized
                 else:
-                    # Handle "X am" or "X pm" format WITHOUT colon (e.g., "11 am", "12 pm", "9 pm", "3 pm")
-                    am_pm_pattern_no_colon = r'(\d{1,2})\s*(am|pm)'
-                    am_pm_match_no_colon = re.search(am_pm_pattern_no_colon, slot_time_str, re.IGNORECASE)
-                    if am_pm_match_no_colon:
-                        hour = int(am_pm_match_no_colon.group(1))
-                        period = am_pm_match_no_colon.group(2).lower()
-                        
-                        # Convert to 24-hour format
-                        if period == 'pm' and hour < 12:
-                            hour += 12
-                        elif period == 'am' and hour == 12:
-                            hour = 0
-                        
-                        slot_time = f"{hour:02d}:00"
-                        logger.info(f"   ✅ Converted '{slot_time_str}' to '{slot_time}' (24-hour format, no colon)")
-                    else:
-                        # Try to extract time from various formats using normalize_time
-                        from agent.nodes import normalize_time
-                        normalized = normalize_time(slot_time_str)
-                        if normalized:
-                            slot_time = normalized.get('start', slot_time_str)
-                            logger.info(f"   ✅ Normalized '{slot_time_str}' to '{slot_time}' using normalize_time")
-                        else:
-                            # If normalization fails, try to extract just the time part
-                            # Handle cases like "12:00 PM - 01:00 PM" -> extract start time
-                            time_range_match = re.search(r'(\d{1,2}):(\d{2})', slot_time_str)
-                            if time_range_match:
-                                hour = int(time_range_match.group(1))
-                                minute = int(time_range_match.group(2))
-                                # Check if PM is mentioned anywhere in the string
-                                if 'pm' in slot_time_str.lower() and hour < 12:
-                                    hour += 12
-                                elif 'am' in slot_time_str.lower() and hour == 12:
-                                    hour = 0
-                                slot_time = f"{hour:02d}:{minute:02d}"
-                                logger.info(f"   ✅ Extracted time from range '{slot_time_str}' -> '{slot_time}'")
-                            else:
-                                logger.warning(f"   ⚠️  Could not normalize time: '{slot_time_str}', using as-is")
-                                slot_time = slot_time_str
+                    logger.warning(f"   ⚠️  Could not normalize time: '{slot_time_str}', using as-is")
+                    slot_time = slot_time_str
         
         # Get date - try multiple sources and normalize to YYYY-MM-DD format
-        date = entities.get('date') or context.get('selected_date')
+        date = entities.get('date') or context.get('selected_date') or remembered(context, 'date')
         
         # Normalize date if it's in text format (e.g., "December 15, 2025")
         if date:
-            import re
-            from datetime import datetime
-            
             date_str = str(date).strip()
             
-            # Check if already in YYYY-MM-DD format
-            if re.match(r'^\d{4}-\d{2}-\d{2}$', date_str):
+            if ISO_DATE_RE.match(date_str):
                 date = date_str
                 logger.info(f"   ✅ Date already in YYYY-MM-DD format: {date}")
             else:
-                # Try to parse various date formats
-                date_formats = [
-                    ('%B %d, %Y', r'(\w+)\s+(\d{1,2}),\s+(\d{4})'),  # "December 15, 2025"
-                    ('%d %B %Y', r'(\d{1,2})\s+(\w+)\s+(\d{4})'),     # "15 December 2025"
-                    ('%B %d %Y', r'(\w+)\s+(\d{1,2})\s+(\d{4})'),     # "December 15 2025"
-                ]
-                
-                parsed_date = None
-                for fmt, pattern in date_formats:
-                    match = re.search(pattern, date_str, re.IGNORECASE)
-                    if match:
-                        try:
-                            # Reconstruct date string for parsing
-                            if fmt == '%B %d, %Y':
-                                date_to_parse = f"{match.group(1)} {match.group(2)}, {match.group(3)}"
-                            elif fmt == '%d %B %Y':
-                                date_to_parse = f"{match.group(1)} {match.group(2)} {match.group(3)}"
-                            else:
-                                date_to_parse = f"{match.group(1)} {match.group(2)} {match.group(3)}"
-                            
-                            parsed = datetime.strptime(date_to_parse, fmt)
-                            parsed_date = parsed.strftime('%Y-%m-%d')
-                            logger.info(f"   ✅ Converted date '{date_str}' to '{parsed_date}'")
-                            break
-                        except Exception as e:
-                            logger.debug(f"   ⚠️  Failed to parse date with format {fmt}: {e}")
-                            continue
-                
+                parsed_date = parse_date(date_str)
                 if parsed_date:
+                    logger.info(f"   ✅ Converted date '{date_str}' to '{parsed_date}'")
                     date = parsed_date
                 else:
                     logger.warning(f"   ⚠️  Could not normalize date: '{date_str}', using as-is")
         
-        # If still no date, extract from conversation history
-        if not date:
-            conversation_history = context.get('conversation_history', [])
-            for msg in reversed(conversation_history[-5:]):
-                if msg.get('role') == 'assistant':
-                    content = msg.get('content', '').lower()
-                    import re
-                    date_pattern = r'(\d{1,2}\s+(?:january|february|march|april|may|june|july|august|september|october|november|december)\s+\d{4})'
-                    date_match = re.search(date_pattern, content, re.IGNORECASE)
-                    if date_match:
-                        from datetime import datetime
-                        try:
-                            parsed = datetime.strptime(date_match.group(1), '%d %B %Y')
-                            date = parsed.strftime('%Y-%m-%d')
-                            logger.info(f"   📅 Extracted date from history: {date}")
-                            break
-                        except:
-                            pass
-        
         # Get vendor info - try entities first, then context
-        vendor_id = entities.get('vendor_id') or context.get('vendor_id')
+        vendor_id = entities.get('vendor_id') or context.get('vendor_id') or remembered(context, 'vendor_id')
         
         # If vendor_id is not found, try to get from vendor_name or venue
         if not vendor_id:
@@ -739,7 +620,7 @@ class NLUAgent:
         phone_number = context.get('phone_number', '')
         
         # Get duration (default to 1 hour if not specified)
-        duration_hours = context.get('selected_duration', 1.0)
+        duration_hours = context.get('selected_duration') or remembered(context, 'duration_hours') or 1.0
         
         # Calculate end time based on duration
         if slot_time and duration_hours:
@@ -761,7 +642,10 @@ class NLUAgent:
             'duration_hours': duration_hours,
             'customer_info': {
                 'phone': phone_number,
-                'name': context.get('customer_name', f'Customer {phone_number}'),
+                'name': (
+                    entities.get('customer_name') or context.get('customer_name')
+                    or remembered(context, 'customer_name') or f'Customer {phone_number}'
+                ),
                 'booking_source': 'whatsapp_ai'
             },
             'selected_slot': selected_slot
@@ -856,14 +740,25 @@ class NLUAgent:
     
     async def _check_database_availability(self, entities: Dict[str, Any]) -> Dict[str, Any]:
         """
-        Check actual database for slot availability
+        Check actual database for slot availability (once per turn)
+        
+        query_node runs this and passes the result on in AgentState.query_result;
+        a repeat call in the same turn with the same entities is served from
+        the turn memo instead of Firestore.
         
         Args:
             entities: Extracted entities with date, time, service_type
             
         Returns:
-            Availability data from database
+            Availability data from database (agent.state.AvailabilityResult)
         """
+        key = ("availability", json.dumps(
+            {k: entities.get(k) for k in AVAILABILITY_ENTITY_KEYS}, sort_keys=True, default=str
+        ))
+        return await memoized(key, lambda: self._lookup_availability(entities))
+    
+    async def _lookup_availability(self, entities: Dict[str, Any]) -> Dict[str, Any]:
+        """Vendor resolution + slot query behind _check_database_availability"""
         logger.info("=" * 70)
         logger.info("🔵 [_check_database_availability] FUNCTION CALLED")
         logger.info(f"   Input entities: {entities}")
@@ -886,25 +781,14 @@ class NLUAgent:
             original_date = date
             if isinstance(date, str) and not date.startswith("202"):
                 logger.info(f"📅 [_check_database_availability] Normalizing date: '{date}'")
-                # Try to normalize relative dates
-                today = datetime.now()
-                date_lower = date.lower()
-                if date_lower in ["tomorrow", "kal"]:
-                    date = (today + timedelta(days=1)).strftime("%Y-%m-%d")
-                    logger.info(f"   ✅ Normalized 'tomorrow' to: {date}")
-                elif date_lower in ["today", "aaj"]:
-                    date = today.strftime("%Y-%m-%d")
-                    logger.info(f"   ✅ Normalized 'today' to: {date}")
+                parsed_date = parse_date(date)
+                if parsed_date:
+                    date = parsed_date
+                    logger.info(f"   ✅ Normalized '{original_date}' to: {date}")
                 else:
-                    # Try to parse as date string
-                    try:
-                        parsed_date = datetime.strptime(date, "%Y-%m-%d")
-                        date = parsed_date.strftime("%Y-%m-%d")
-                        logger.info(f"   ✅ Parsed date to: {date}")
-                    except:
-                        # Default to today if can't parse
-                        date = today.strftime("%Y-%m-%d")
-                        logger.warning(f"   ⚠️  Could not parse date, defaulting to today: {date}")
+                    # Default to today if can't parse
+                    date = datetime.now().strftime("%Y-%m-%d")
+                    logger.warning(f"   ⚠️  Could not parse date, defaulting to today: {date}")
             else:
                 logger.info(f"📅 [_check_database_availability] Date already in format: {date}")
             
@@ -982,7 +866,10 @@ class NLUAgent:
             logger.info(f"   Vendor ID: {vendor_id}")
             logger.info(f"   Date: {date}")
             logger.info(f"   Method: availability_service.get_available_slots()")
-            available_slots = await availability_service.get_available_slots(vendor_id, date)
+            available_slots = await memoized(
+                ("slots", vendor_id, date),
+                lambda: availability_service.get_available_slots(vendor_id, date)
+            )
             logger.info(f"📊 [_check_database_availability] DATABASE RESPONSE:")
             logger.info(f"   Slots returned: {len(available_slots)}")
             
@@ -996,7 +883,10 @@ class NLUAgent:
                 for days_ahead in range(1, 8):
                     check_date = (base_date + td(days=days_ahead)).strftime("%Y-%m-%d")
                     logger.info(f"   🔍 Checking {check_date}...")
-                    future_slots = await availability_service.get_available_slots(vendor_id, check_date)
+                    future_slots = await memoized(
+                        ("slots", vendor_id, check_date),
+                        lambda: availability_service.get_available_slots(vendor_id, check_date)
+                    )
                     if future_slots:
                         available_slots = future_slots
                         next_available_date = check_date
@@ -1016,14 +906,13 @@ class NLUAgent:
                     time_filter = time_range
                     logger.info(f"   ✅ Time range is dict: {time_filter}")
                 elif isinstance(time_range, str):
-                    # Try to parse time string
-                    # This is a simple parser - you might want to enhance it
-                    if "-" in time_range:
-                        parts = time_range.split("-")
-                        time_filter = {"start": parts[0].strip(), "end": parts[1].strip()}
+                    # Ranges ("6-9", "shaam", "after 6") filter; an exact hour shows the whole day
+                    parsed_time = parse_datetime(time_range)
+                    if parsed_time["time_kind"] in ("range", "period", "after") and parsed_time["time_range"]:
+                        time_filter = parsed_time["time_range"]
                         logger.info(f"   ✅ Parsed time string to: {time_filter}")
                     else:
-                        logger.info(f"   ⚠️  Time range string doesn't contain '-', skipping filter")
+                        logger.info(f"   ⚠️  Time string is not a range, skipping filter")
             
             # Filter slots by time range if provided
             original_slot_count = len(available_slots)
@@ -1053,6 +942,7 @@ class NLUAgent:
             actual_date = next_available_date if next_available_date else date
             
             result = {
+                "kind": "availability",
                 "success": True,
                 "date": actual_date,
                 "requested_date": date,
@@ -1075,6 +965,7 @@ class NLUAgent:
             logger.error(f"Traceback: {traceback.format_exc()}")
             logger.info("=" * 70)
             return {
+                "kind": "availability",
                 "success": False,
                 "error": str(e),
                 "available_slots": []
@@ -1152,30 +1043,26 @@ BOOKING FAILED:
 - Ask customer to try again or contact support
 """
         
-        return f"""
-            You are a friendly booking assistant for futsal courts and salons in Karachi.
-
-Intent: {intent}
+        # Only the turn-specific instructions - the rest is RESPONSE_SYSTEM_INSTRUCTION
+        turn_notes = []
+        if availability_info:
+            turn_notes.append("Present the REAL availability data from database clearly")
+            if availability_data.get("total_available", 0) > 0:
+                turn_notes.append("List the available slots clearly with times and prices")
+            else:
+                turn_notes.append("No slots are available: apologize and suggest alternatives")
+        if booking_info and "SUCCESSFUL" in booking_info:
+            turn_notes.append("Booking was just created: confirm it with the booking ID and thank the customer")
+        if booking_info and "FAILED" in booking_info:
+            turn_notes.append("Booking failed: apologize and suggest trying again or contacting support")
+        notes = "\n".join(f"- {note}" for note in turn_notes) or "- Guide the user to provide missing information"
+        
+        return f"""Intent: {intent}
 Entities: {entities}
-Context: {context}
-{availability_info if availability_info else ""}
-{booking_info if booking_info else ""}
-
-Generate a helpful, friendly response that:
-1. Matches the user's language style (Roman Urdu if they use "Aoa", "kal", "shaam" / English otherwise)
-2. Addresses the {intent} intent directly
-3. Uses the extracted entities naturally: {entities}
-4. {"Presents the REAL availability data from database clearly" if availability_info else "Guides the user to provide missing information"}
-5. {"If booking was just created: Confirm the booking with the booking ID and thank the customer" if booking_info and "SUCCESSFUL" in booking_info else ""}
-6. {"If booking failed: Apologize and suggest trying again or contacting support" if booking_info and "FAILED" in booking_info else ""}
+{compact_response_context(context)}
+{availability_info}
+{booking_info}
+This turn:
+{notes}
 
-Response Guidelines:
-- Tone: Friendly, professional, helpful
-- Length: 2-4 sentences (be concise)
-- Format: Use emojis sparingly (✅ 📅 ⏰ 💰)
-- Language: Match user's style exactly
-- {"If slots are available: List them clearly with times and prices" if availability_info and availability_data.get("total_available", 0) > 0 else ""}
-- {"If no slots available: Apologize and suggest alternatives" if availability_info and availability_data.get("total_available", 0) == 0 else ""}
-
-Generate the response now:
-"""
+Generate the response now:"""
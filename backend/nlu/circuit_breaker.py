@@ -0,0 +1,119 @@
+"""
+Circuit Breaker - Fail fast while Gemini is down, slow or over quota
+Tracks call outcomes over a sliding window. When the failure rate (errors,
+timeouts and calls slower than the slow-call threshold) crosses the limit the
+breaker opens and calls are rejected immediately; after the cool-down a single
+half-open probe decides whether to close again or stay open.
+"""
+
+import time
+import logging
+from collections import deque
+from typing import Dict, Any, Optional
+
+from app.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """Call rejected because the circuit is open"""
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    # Gauge values for /metrics
+    STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+    def __init__(
+        self,
+        name: str,
+        error_rate: float,
+        min_calls: int,
+        window_seconds: float,
+        slow_call_seconds: float,
+        open_seconds: float
+    ):
+        self.name = name
+        self.error_rate = error_rate
+        self.min_calls = min_calls
+        self.window_seconds = window_seconds
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+
+        self.state = self.CLOSED
+        self.opened_at: Optional[float] = None
+        self._calls = deque()  # (finished_at, failed)
+        self._probe_in_flight = False
+        metrics.set_gauge('circuit_state', self.STATE_VALUES[self.state], breaker=self.name)
+
+    def _transition(self, state: str):
+        if state == self.state:
+            return
+        logger.warning(f"Circuit '{self.name}': {self.state} -> {state}")
+        metrics.inc('circuit_transitions_total', breaker=self.name, to=state)
+        metrics.set_gauge('circuit_state', self.STATE_VALUES[state], breaker=self.name)
+        self.state = state
+        if state == self.OPEN:
+            self.opened_at = time.monotonic()
+        elif state == self.CLOSED:
+            self.opened_at = None
+            self._calls.clear()
+
+    def _cooled_down(self) -> bool:
+        return self.state == self.OPEN and time.monotonic() - self.opened_at >= self.open_seconds
+
+    @property
+    def degraded(self) -> bool:
+        """True while calls would be rejected (open and cooling down, or half-open with the probe out)"""
+        if self.state == self.HALF_OPEN:
+            return self._probe_in_flight
+        return self.state == self.OPEN and not self._cooled_down()
+
+    def allow(self) -> bool:
+        """Whether a call may go out now (claims the probe slot when half-open)"""
+        if self._cooled_down():
+            self._transition(self.HALF_OPEN)
+
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        return False
+
+    def record(self, latency_seconds: float, ok: bool):
+        """Record a finished call - errors and slow calls both count as failures"""
+        failed = not ok or latency_seconds >= self.slow_call_seconds
+
+        if self.state == self.HALF_OPEN:
+            self._probe_in_flight = False
+            self._transition(self.OPEN if failed else self.CLOSED)
+            return
+
+        now = time.monotonic()
+        self._calls.append((now, failed))
+        while self._calls and now - self._calls[0][0] > self.window_seconds:
+            self._calls.popleft()
+
+        if self.state == self.CLOSED and len(self._calls) >= self.min_calls:
+            failures = sum(1 for _, f in self._calls if f)
+            if failures / len(self._calls) >= self.error_rate:
+                self._transition(self.OPEN)
+
+    def release_probe(self):
+        """A probe ended without an outcome (cancelled) - let the next call probe"""
+        self._probe_in_flight = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        failures = sum(1 for _, f in self._calls if f)
+        return {
+            'state': self.state,
+            'degraded': self.degraded,
+            'window_calls': len(self._calls),
+            'window_failures': failures,
+            'open_for_seconds': time.monotonic() - self.opened_at if self.opened_at else 0.0
+        }
@@ -0,0 +1,142 @@
+"""
+Conversation Memory - Compact structured state carried between turns
+Instead of re-reading the transcript every turn (prompts inlining the last 10
+messages, regex scans of assistant replies for dates and times), each session
+keeps a small memory: the booking slots filled so far plus a short rolling
+summary of what happened. It is updated once at the end of each turn from
+the graph's final state, persisted in the session document next to the
+history, and is what prompts and booking-detail lookups read. Its size does
+not grow with the conversation.
+"""
+
+import copy
+from typing import Dict, Any, Optional
+
+# Booking slots remembered across turns
+MEMORY_SLOTS = ["sport", "vendor", "vendor_id", "date", "time", "duration_hours", "customer_name"]
+
+# Rolling summary keeps only the most recent events
+MAX_SUMMARY_EVENTS = 6
+# The one piece of transcript prompts still see: what the assistant just asked
+LAST_ASSISTANT_CHARS = 300
+
+# Time kinds that pin down a slot ("shaam" or "after 6" only narrow the search)
+CONCRETE_TIME_KINDS = ("clock", "hour", "hour_word", "range")
+
+# Intents worth a summary line, and how they read
+INTENT_EVENTS = {
+    "availability_inquiry": "asked availability",
+    "booking_request": "asked to book",
+    "price_inquiry": "asked prices",
+    "cancellation": "cancelled",
+    "modification": "changed request",
+    "payment_related": "asked about payment",
+    "information": "asked for venue info",
+}
+
+
+def empty_memory() -> Dict[str, Any]:
+    return {"slots": {slot: None for slot in MEMORY_SLOTS}, "events": [], "turns": 0, "last_assistant": ""}
+
+
+def normalize_memory(memory: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """A complete memory dict from whatever the session stored (older sessions have none)"""
+    result = empty_memory()
+    if not memory:
+        return result
+    result["slots"].update({k: v for k, v in (memory.get("slots") or {}).items() if k in MEMORY_SLOTS})
+    result["events"] = list(memory.get("events") or [])[-MAX_SUMMARY_EVENTS:]
+    result["turns"] = int(memory.get("turns") or 0)
+    result["last_assistant"] = memory.get("last_assistant") or ""
+    return result
+
+
+def _add_event(memory: Dict[str, Any], event: str):
+    if event and (not memory["events"] or memory["events"][-1] != event):
+        memory["events"] = (memory["events"] + [event])[-MAX_SUMMARY_EVENTS:]
+
+
+def update_memory(memory: Optional[Dict[str, Any]], final_state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Fold one finished turn into the memory
+
+    Args:
+        memory: Memory as loaded at the start of the turn (None for a new session)
+        final_state: The graph's final AgentState (entities, selected_*, query_result,
+            booking_result, response)
+
+    Returns:
+        New memory dict (the input is not modified)
+    """
+    memory = normalize_memory(copy.deepcopy(memory))
+    slots = memory["slots"]
+    entities = final_state.get("entities") or {}
+    intent = final_state.get("current_intent") or ""
+
+    sport = entities.get("service_type") or entities.get("sport_type")
+    if sport:
+        slots["sport"] = str(sport).lower()
+    vendor = entities.get("vendor_name") or entities.get("vendor") or entities.get("venue")
+    if vendor:
+        slots["vendor"] = vendor
+    if entities.get("customer_name"):
+        slots["customer_name"] = entities["customer_name"]
+    if entities.get("date"):
+        slots["date"] = entities["date"]
+
+    if final_state.get("selected_date"):
+        slots["date"] = final_state["selected_date"]
+    selected_slot = final_state.get("selected_slot") or {}
+    if selected_slot.get("slot_time") and selected_slot.get("time_kind") in CONCRETE_TIME_KINDS:
+        slots["time"] = selected_slot["slot_time"]
+    if final_state.get("selected_duration"):
+        slots["duration_hours"] = final_state["selected_duration"]
+
+    query_result = final_state.get("query_result") or {}
+    if query_result.get("kind") == "availability" and query_result.get("success"):
+        # The date the reply offered slots for (the next open day when the requested one was full)
+        if query_result.get("date"):
+            slots["date"] = query_result["date"]
+        if query_result.get("vendor_id"):
+            slots["vendor_id"] = query_result["vendor_id"]
+        offered = query_result.get("available_slots") or []
+        if len(offered) == 1 and offered[0].get("time"):
+            # A single offered slot is what a bare "yes" confirms next turn
+            slots["time"] = offered[0]["time"]
+    elif entities.get("vendor_id"):
+        slots["vendor_id"] = entities["vendor_id"]
+
+    booking = final_state.get("booking_result") or {}
+    if booking.get("success"):
+        _add_event(memory, f"booking confirmed {slots['date']} {slots['time']} (id {booking.get('booking_id', 'N/A')})")
+        # The next booking starts from a clean date/time
+        slots["date"] = slots["time"] = slots["duration_hours"] = None
+    elif booking:
+        _add_event(memory, "booking failed")
+    elif intent in INTENT_EVENTS:
+        detail = ", ".join(str(v) for v in (slots["sport"], slots["date"], slots["time"]) if v)
+        _add_event(memory, INTENT_EVENTS[intent] + (f" ({detail})" if detail else ""))
+
+    memory["turns"] += 1
+    memory["last_assistant"] = (final_state.get("response") or "")[:LAST_ASSISTANT_CHARS]
+    return memory
+
+
+def format_memory(memory: Dict[str, Any]) -> str:
+    """Memory as the prompt lines that replace the raw transcript"""
+    memory = normalize_memory(memory)
+    if not memory["turns"]:
+        return "No previous conversation."
+
+    known = ", ".join(f"{slot}={value}" for slot, value in memory["slots"].items() if value)
+    lines = [f"Known booking details: {known or 'none yet'}"]
+    if memory["events"]:
+        lines.append("Summary so far: " + "; ".join(memory["events"]))
+    if memory["last_assistant"]:
+        lines.append(f"assistant (last message): {memory['last_assistant']}")
+    return "\n".join(lines)
+
+
+def remembered(context: Dict[str, Any], slot: str) -> Any:
+    """A slot value from the memory in a generate_response context (None when absent)"""
+    return ((context.get("memory") or {}).get("slots") or {}).get(slot)
@@ -0,0 +1,352 @@
+"""
+Date/Time Parser - Roman Urdu / English date, time and duration extraction
+One precompiled master grammar tokenizes a message in a single pass
+("kal shaam 7 baje 1.5 ghanta", "parson", "agle Friday", "8:30 pm",
+"6 se 9", "dedh ghanta") and the tokens are resolved to a normalized
+YYYY-MM-DD date, {start, end} time range and duration in hours.
+
+Hour rules (the "N baje" rule normalize_time always used, applied to every form):
+- explicit am/pm wins
+- subah/morning forces AM; shaam/raat/evening/night force PM
+- with raat/night, 12 is midnight ("raat 12 baje" -> 00:00)
+- bare hours and "N baje" of 1-11 are PM unless a morning word is present
+- HH:MM without am/pm is read as 24-hour (it's how slots are written)
+- a range has one meridiem: "9am-11" borrows am, "8-9:30" / "7:30-9" are both
+  PM (24-hour only when both ends are HH:MM); hours over 23 are not a time
+"""
+
+import re
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional, List, Tuple
+
+
+MONTHS = {
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+    "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12,
+}
+WEEKDAYS = {
+    "monday": 0, "mon": 0, "peer": 0, "pir": 0,
+    "tuesday": 1, "tue": 1, "tues": 1, "mangal": 1,
+    "wednesday": 2, "wed": 2, "budh": 2,
+    "thursday": 3, "thu": 3, "thurs": 3, "jumeraat": 3, "jumerat": 3,
+    "friday": 4, "fri": 4, "jumma": 4, "juma": 4,
+    "saturday": 5, "sat": 5,
+    "sunday": 6, "itwar": 6, "itwaar": 6,
+}
+RELATIVE_DAYS = {
+    "aaj": 0, "today": 0, "tonight": 0,
+    "kal": 1, "tomorrow": 1,
+    "parson": 2, "parso": 2, "day after tomorrow": 2,
+}
+HOUR_WORDS = {
+    "ek": 1, "do": 2, "teen": 3, "char": 4, "chaar": 4, "paanch": 5, "panch": 5,
+    "chhe": 6, "che": 6, "saat": 7, "aath": 8, "nau": 9, "das": 10,
+    "gyarah": 11, "giyarah": 11, "barah": 12,
+}
+DURATION_WORDS = {
+    "aadha": 0.5, "adha": 0.5, "ek": 1.0, "dedh": 1.5, "derh": 1.5,
+    "do": 2.0, "dhai": 2.5, "dhaai": 2.5, "teen": 3.0,
+}
+PERIODS = {
+    "morning": ("am", "09:00", "12:00"), "subah": ("am", "09:00", "12:00"), "subha": ("am", "09:00", "12:00"),
+    "afternoon": ("pm", "12:00", "18:00"), "dopahar": ("pm", "12:00", "18:00"), "dopehar": ("pm", "12:00", "18:00"),
+    "evening": ("pm", "18:00", "23:00"), "shaam": ("pm", "18:00", "23:00"), "sham": ("pm", "18:00", "23:00"),
+    "night": ("night", "21:00", "23:00"), "raat": ("night", "21:00", "23:00"), "tonight": ("pm", "18:00", "23:00"),
+}
+DEFAULT_DURATION_HOURS = 1.0
+
+
+def _words(words) -> str:
+    return "|".join(sorted((re.escape(w).replace(r"\ ", r"\s+") for w in words), key=len, reverse=True))
+
+
+BAJE = r"(?:baje|bajay|bajey|bje|bjay)"
+MONTH = r"(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)"
+ORDINAL = r"(?:st|nd|rd|th)?"
+HOUR_MIN = r"\d{1,2}(?:[:.]\d{2})?"
+
+# Order matters: earlier alternatives win at the same position
+GRAMMAR: List[Tuple[str, str]] = [
+    ("duration_hm", r"\b(?P<dur_h>\d+(?:\.\d+)?)\s*(?:ghant[ae]|hours?|hrs?)\b(?:\s*(?:and\s+)?(?P<dur_hm_m>\d+)\s*(?:minutes?|mins?)\b)?"),
+    ("duration_half", r"\b(?P<dur_half>\d+)\s+and\s+a\s+half\s+(?:hours?|hrs?|ghant[ae])\b"),
+    ("duration_word", rf"\b(?P<dur_word>{_words(DURATION_WORDS)})\s+ghant[ae]\b"),
+    ("duration_m", r"\b(?P<dur_m>\d+)\s*(?:minutes?|mins?)\b"),
+    ("iso_date", r"\b(?P<iso>\d{4}-\d{2}-\d{2})\b"),
+    ("slash_date", r"\b(?P<sl_a>\d{1,2})/(?P<sl_b>\d{1,2})(?:/(?P<sl_y>\d{2,4}))?\b"),
+    ("day_month", rf"\b(?P<dm_day>\d{{1,2}}){ORDINAL}\s+(?:of\s+)?(?P<dm_month>{MONTH})\b(?:,?\s+(?P<dm_year>\d{{4}}))?"),
+    ("month_day", rf"\b(?P<md_month>{MONTH})\s+(?P<md_day>\d{{1,2}}){ORDINAL}\b(?:,?\s+(?P<md_year>\d{{4}}))?"),
+    ("relative_day", rf"\b(?P<rel>{_words(RELATIVE_DAYS)})\b"),
+    ("weekday", rf"\b(?:(?P<wd_next>next|agle|agla|aglay|agli|coming)\s+)?(?P<wd>{_words(WEEKDAYS)})\b"),
+    ("after", rf"\b(?:after|baad)\s+(?P<after_a>{HOUR_MIN})\s*(?P<after_a_mer>am|pm)?|\b(?P<after_b>{HOUR_MIN})\s*(?:{BAJE}\s*)?ke\s+baad\b"),
+    ("around", rf"\b(?:around|taqreeban|approx)\s+(?P<around_a>{HOUR_MIN})\s*(?P<around_a_mer>am|pm)?|\b(?P<around_b>{HOUR_MIN})\s*(?:{BAJE}\s*)?kei?\s+around\b"),
+    ("range", rf"\b(?P<r_start>{HOUR_MIN})\s*(?P<r_start_mer>am|pm)?\s*(?:{BAJE}\s*)?(?:-|–|to|se|till|until)\s*(?P<r_end>{HOUR_MIN})\s*(?P<r_end_mer>am|pm|{BAJE})?"),
+    ("clock", rf"\b(?P<c_time>\d{{1,2}}[:.]\d{{2}})\s*(?P<c_mer>am|pm|{BAJE})?"),
+    ("hour", rf"\b(?P<h_hour>\d{{1,2}})\s*(?P<h_mer>am|pm|{BAJE})\b"),
+    ("hour_word", rf"\b(?P<hw>{_words(HOUR_WORDS)})\s+{BAJE}\b"),
+    ("period", rf"\b(?P<per>{_words(PERIODS)})\b"),
+]
+MASTER_RE = re.compile("|".join(f"(?P<{name}>{pattern})" for name, pattern in GRAMMAR), re.IGNORECASE)
+WHITESPACE_RE = re.compile(r"\s+")
+
+# Already-normalized values
+ISO_DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+HH_MM_RE = re.compile(r"^\d{2}:\d{2}$")
+
+# "9:00 PM" / "9 pm" in assistant messages (history scans)
+CLOCK_MERIDIEM_RE = re.compile(r"\b(\d{1,2})(?::(\d{2}))?\s*(am|pm)\b", re.IGNORECASE)
+LONG_DATE_RE = re.compile(rf"\b(\d{{1,2}}){ORDINAL}\s+({MONTH})\s+(\d{{4}})\b|\b({MONTH})\s+(\d{{1,2}}){ORDINAL},?\s+(\d{{4}})\b", re.IGNORECASE)
+
+
+def tokenize(text: str) -> List[Tuple[str, re.Match]]:
+    """(token kind, match) pairs for every date/time/duration span, left to right"""
+    normalized = WHITESPACE_RE.sub(" ", (text or "").lower()).strip()
+    return [(match.lastgroup, match) for match in MASTER_RE.finditer(normalized)]
+
+
+def _split_hour_min(value: str) -> Tuple[int, int]:
+    hour, _, minute = value.replace(".", ":").partition(":")
+    return int(hour), int(minute or 0)
+
+
+def _to_24h(hour: int, minute: int, meridiem: Optional[str], hint: Optional[str], colon: bool = False) -> Tuple[int, int]:
+    if meridiem == "pm":
+        return (hour + 12 if hour < 12 else hour), minute
+    if meridiem == "am":
+        return (0 if hour == 12 else hour), minute
+    if colon and hint is None:
+        return hour, minute
+    if hint == "am":
+        return hour, minute
+    if hint == "night" and hour == 12:
+        return 0, minute
+    # baje / bare hour: PM unless it's a morning
+    return (hour + 12 if 1 <= hour <= 11 else hour), minute
+
+
+def _fmt(hour: int, minute: int) -> str:
+    return f"{hour % 24:02d}:{minute:02d}"
+
+
+def _add_hours(hour: int, minute: int, hours: float) -> str:
+    total = hour * 60 + minute + int(round(hours * 60))
+    return _fmt(total // 60, total % 60)
+
+
+def _meridiem(value: Optional[str]) -> Optional[str]:
+    if not value:
+        return None
+    value = value.lower()
+    return value if value in ("am", "pm") else None
+
+
+def _year_for(month: int, day: int, today: datetime) -> int:
+    """Month/day without a year: this year, or next year if it has passed"""
+    try:
+        candidate = today.replace(month=month, day=day)
+    except ValueError:
+        return today.year
+    return today.year if candidate.date() >= today.date() else today.year + 1
+
+
+def _safe_date(year: int, month: int, day: int) -> Optional[str]:
+    try:
+        return datetime(year, month, day).strftime("%Y-%m-%d")
+    except ValueError:
+        return None
+
+
+def _resolve_date(kind: str, m: re.Match, today: datetime) -> Optional[str]:
+    if kind == "iso_date":
+        try:
+            return datetime.strptime(m.group("iso"), "%Y-%m-%d").strftime("%Y-%m-%d")
+        except ValueError:
+            return None
+
+    if kind == "slash_date":
+        a, b = int(m.group("sl_a")), int(m.group("sl_b"))
+        year = m.group("sl_y")
+        year = int(year) + 2000 if year and len(year) == 2 else int(year) if year else None
+        # Month first (US order) as before, day first when that is impossible
+        for month, day in ((a, b), (b, a)):
+            result = _safe_date(year or _year_for(month, day, today), month, day) if 1 <= month <= 12 else None
+            if result:
+                return result
+        return None
+
+    if kind in ("day_month", "month_day"):
+        prefix = "dm" if kind == "day_month" else "md"
+        month = MONTHS[m.group(f"{prefix}_month")[:3].lower()]
+        day = int(m.group(f"{prefix}_day"))
+        year = m.group(f"{prefix}_year")
+        return _safe_date(int(year) if year else _year_for(month, day, today), month, day)
+
+    if kind == "relative_day":
+        offset = RELATIVE_DAYS[WHITESPACE_RE.sub(" ", m.group("rel").lower())]
+        return (today + timedelta(days=offset)).strftime("%Y-%m-%d")
+
+    if kind == "weekday":
+        target = WEEKDAYS[m.group("wd").lower()]
+        if m.group("wd_next"):
+            # "agle Friday" - that day in next week (weeks start Monday)
+            days_ahead = (7 - today.weekday()) + target
+        else:
+            # "Friday" - next occurrence, never today
+            days_ahead = target - today.weekday()
+            if days_ahead <= 0:
+                days_ahead += 7
+        return (today + timedelta(days=days_ahead)).strftime("%Y-%m-%d")
+
+    return None
+
+
+def _resolve_duration(kind: str, m: re.Match) -> Optional[float]:
+    if kind == "duration_hm":
+        return float(m.group("dur_h")) + (int(m.group("dur_hm_m")) / 60 if m.group("dur_hm_m") else 0)
+    if kind == "duration_half":
+        return int(m.group("dur_half")) + 0.5
+    if kind == "duration_word":
+        return DURATION_WORDS[m.group("dur_word").lower()]
+    if kind == "duration_m":
+        return int(m.group("dur_m")) / 60
+    return None
+
+
+def _resolve_time(kind: str, m: re.Match, hint: Optional[str], duration: float) -> Optional[Dict[str, str]]:
+    if kind == "range":
+        start_explicit = _meridiem(m.group("r_start_mer"))
+        end_explicit = _meridiem(m.group("r_end_mer"))
+        # Each end without am/pm takes the other's ("9am-11" -> 09:00-11:00, "8-10pm")
+        start_mer = start_explicit or end_explicit
+        end_mer = end_explicit or start_explicit
+        # 24-hour only when both ends are HH:MM ("18:00-19:30"); "8-9:30" and "7:30-9" are one meridiem
+        colon = ":" in m.group("r_start") and ":" in m.group("r_end")
+        start_raw_h, start_raw_m = _split_hour_min(m.group("r_start"))
+        end_raw_h, end_raw_m = _split_hour_min(m.group("r_end"))
+        if max(start_raw_h, end_raw_h) > 23 or max(start_raw_m, end_raw_m) > 59:
+            # "8-930" - not a time
+            return None
+        start_h, start_m = _to_24h(start_raw_h, start_raw_m, start_mer, hint, colon)
+        end_h, end_m = _to_24h(end_raw_h, end_raw_m, end_mer, hint, colon)
+        if start_h > end_h and start_mer is None and end_h > 0:
+            # "11-12" / "10-1": the PM reading would start after the end - keep the morning hour
+            start_h = start_raw_h
+        elif end_h < start_h and end_explicit is None and end_h < 12:
+            # "11am-1": the borrowed meridiem wrapped past noon
+            end_h += 12
+        return {"start": _fmt(start_h, start_m), "end": _fmt(end_h, end_m)}
+
+    if kind in ("after", "around"):
+        value = m.group(f"{kind}_a") or m.group(f"{kind}_b")
+        mer = _meridiem(m.group(f"{kind}_a_mer")) if m.group(f"{kind}_a") else None
+        hour, minute = _to_24h(*_split_hour_min(value), mer, hint)
+        if kind == "after":
+            return {"start": _fmt(hour, minute)}
+        return {"start": _fmt(hour, minute), "end": _add_hours(hour, minute, duration)}
+
+    if kind == "clock":
+        hour, minute = _to_24h(*_split_hour_min(m.group("c_time")), _meridiem(m.group("c_mer")), hint, colon=not m.group("c_mer"))
+    elif kind == "hour":
+        hour, minute = _to_24h(int(m.group("h_hour")), 0, _meridiem(m.group("h_mer")), hint)
+    elif kind == "hour_word":
+        hour, minute = _to_24h(HOUR_WORDS[m.group("hw").lower()], 0, None, hint)
+    else:
+        return None
+
+    if hour > 23 or minute > 59:
+        return None
+    return {"start": _fmt(hour, minute), "end": _add_hours(hour, minute, duration)}
+
+
+DATE_KINDS = {"iso_date", "slash_date", "day_month", "month_day", "relative_day", "weekday"}
+DURATION_KINDS = {"duration_hm", "duration_half", "duration_word", "duration_m"}
+TIME_KINDS = {"range", "after", "around", "clock", "hour", "hour_word"}
+
+
+def parse_datetime(text: str, today: datetime = None) -> Dict[str, Any]:
+    """
+    Extract date, time range and duration from a message
+
+    Args:
+        text: Message or entity text ("kal shaam 7 baje 1.5 ghanta")
+        today: Reference date for relative dates (default: now)
+
+    Returns:
+        Dict with date (YYYY-MM-DD or None), time_range ({start, end} or
+        {start} or None), time_kind (grammar rule that produced the time,
+        "period" for bare "shaam"), duration_hours (float or None) and period
+    """
+    today = today or datetime.now()
+    tokens = tokenize(text)
+
+    date = None
+    duration = None
+    period = None
+    time_token = None
+    for kind, match in tokens:
+        if kind in DATE_KINDS and date is None:
+            date = _resolve_date(kind, match, today)
+        elif kind in DURATION_KINDS and duration is None:
+            duration = _resolve_duration(kind, match)
+        elif kind in TIME_KINDS and time_token is None:
+            time_token = (kind, match)
+        elif kind == "period" and period is None:
+            period = WHITESPACE_RE.sub(" ", match.group("per").lower())
+
+        # "tonight" is both a date and an evening
+        if kind == "relative_day" and match.group("rel").lower() == "tonight" and period is None:
+            period = "tonight"
+
+    hint = PERIODS[period][0] if period else None
+    time_range = None
+    time_kind = None
+    if time_token:
+        time_range = _resolve_time(*time_token, hint, duration or DEFAULT_DURATION_HOURS)
+        time_kind = time_token[0] if time_range else None
+    if time_range is None and period:
+        _, start, end = PERIODS[period]
+        time_range = {"start": start, "end": end}
+        time_kind = "period"
+
+    return {
+        "date": date,
+        "time_range": time_range,
+        "time_kind": time_kind,
+        "duration_hours": duration,
+        "period": period,
+    }
+
+
+def parse_date(text: str, today: datetime = None) -> Optional[str]:
+    """YYYY-MM-DD for the first date in text, or None"""
+    return parse_datetime(text, today)["date"]
+
+
+def parse_time(text: str) -> Optional[Dict[str, str]]:
+    """{start, end} (or {start} for "after 6") for the first time in text, or None"""
+    return parse_datetime(text)["time_range"]
+
+
+def parse_duration_hours(text: str) -> Optional[float]:
+    """Duration in hours ("1.5 ghanta", "dedh ghanta", "90 mins"), or None"""
+    return parse_datetime(text)["duration_hours"]
+
+
+def find_clock_time(text: str) -> Optional[str]:
+    """First "9:00 PM" / "9 pm" style time as HH:MM - for scanning assistant messages"""
+    match = CLOCK_MERIDIEM_RE.search(text or "")
+    if not match:
+        return None
+    hour, minute = _to_24h(int(match.group(1)), int(match.group(2) or 0), match.group(3).lower(), None)
+    return _fmt(hour, minute)
+
+
+def find_long_date(text: str) -> Optional[str]:
+    """First "15 December 2025" / "December 15, 2025" date as YYYY-MM-DD"""
+    match = LONG_DATE_RE.search(text or "")
+    if not match:
+        return None
+    if match.group(1):
+        day, month, year = match.group(1), match.group(2), match.group(3)
+    else:
+        month, day, year = match.group(4), match.group(5), match.group(6)
+    return _safe_date(int(year), MONTHS[month[:3].lower()], int(day))
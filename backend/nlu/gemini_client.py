@@ -0,0 +1,179 @@
+"""
+Gemini Client - Async transport for all Gemini calls
+Uses the SDK's native async API (falls back to a dedicated, bounded thread pool
+so LLM calls never compete with the event loop's default executor), caps
+concurrent in-flight requests, applies a per-call timeout and fails fast
+through a circuit breaker while Gemini is unhealthy.
+"""
+
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Optional
+
+from app.config import settings
+from app.metrics import metrics
+from nlu.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+
+class GeminiTimeoutError(Exception):
+    """Gemini did not answer within GEMINI_TIMEOUT_SECONDS"""
+
+
+class GeminiUnavailableError(CircuitOpenError):
+    """Gemini circuit breaker is open - callers should use degraded mode"""
+
+
+class GeminiClient:
+    """
+    Bounded Gemini transport shared by every NLU component
+
+    Metrics:
+        gemini_queue_wait_seconds - time spent waiting for a concurrency slot
+        gemini_call_seconds       - Gemini round-trip time
+        gemini_calls_total        - calls by outcome (ok/timeout/error/rejected)
+        gemini_in_flight          - requests currently at Gemini
+        gemini_waiting            - requests queued for a slot
+        gemini_prompt_tokens      - input tokens per call (incl. system instruction)
+        gemini_cached_tokens      - input tokens served from Gemini's prefix cache
+        gemini_response_tokens    - output tokens per call
+        gemini_tokens_total       - running token totals by prompt type and kind
+    """
+
+    def __init__(self, max_concurrency: int = None, timeout_seconds: float = None):
+        self.max_concurrency = max_concurrency or settings.GEMINI_MAX_CONCURRENCY
+        self.timeout_seconds = timeout_seconds or settings.GEMINI_TIMEOUT_SECONDS
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.breaker = CircuitBreaker(
+            name="gemini",
+            error_rate=settings.GEMINI_BREAKER_ERROR_RATE,
+            min_calls=settings.GEMINI_BREAKER_MIN_CALLS,
+            window_seconds=settings.GEMINI_BREAKER_WINDOW_SECONDS,
+            slow_call_seconds=settings.GEMINI_BREAKER_SLOW_CALL_SECONDS,
+            open_seconds=settings.GEMINI_BREAKER_OPEN_SECONDS
+        )
+    
+    @property
+    def degraded(self) -> bool:
+        """Gemini circuit is open - route turns to rules and templates"""
+        return self.breaker.degraded
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_concurrency,
+                thread_name_prefix="gemini"
+            )
+        return self._executor
+
+    async def _send(self, model, prompt: Any):
+        if hasattr(model, 'generate_content_async'):
+            return await model.generate_content_async(prompt)
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(), model.generate_content, prompt)
+
+    async def generate(self, model, prompt: Any, prompt_type: str = "default"):
+        """
+        Send a prompt to Gemini
+
+        Args:
+            model: genai.GenerativeModel to call
+            prompt: Prompt text (or content list)
+            prompt_type: Label for metrics (intent, entities, response, ...)
+
+        Returns:
+            Gemini response object
+
+        Raises:
+            GeminiTimeoutError: the call exceeded the configured timeout
+            GeminiUnavailableError: the circuit breaker is open
+        """
+        if not self.breaker.allow():
+            metrics.inc('gemini_calls_total', prompt_type=prompt_type, outcome='rejected')
+            raise GeminiUnavailableError("Gemini circuit breaker is open")
+        probing = self.breaker.state == CircuitBreaker.HALF_OPEN
+        
+        semaphore = self._get_semaphore()
+
+        queued_at = time.perf_counter()
+        metrics.add_gauge('gemini_waiting', 1)
+        try:
+            await semaphore.acquire()
+        except asyncio.CancelledError:
+            # Cancelled before the probe went out - otherwise the breaker stays half-open for good
+            if probing:
+                self.breaker.release_probe()
+            raise
+        finally:
+            metrics.add_gauge('gemini_waiting', -1)
+
+        queue_wait = time.perf_counter() - queued_at
+        metrics.observe('gemini_queue_wait_seconds', queue_wait, prompt_type=prompt_type)
+        if queue_wait > 1.0:
+            logger.warning(f"Gemini call waited {queue_wait:.2f}s for a slot ({prompt_type})")
+
+        metrics.add_gauge('gemini_in_flight', 1)
+        started_at = time.perf_counter()
+        outcome = 'ok'
+        try:
+            response = await asyncio.wait_for(self._send(model, prompt), timeout=self.timeout_seconds)
+            self._record_usage(response, prompt_type)
+            return response
+        except asyncio.TimeoutError:
+            outcome = 'timeout'
+            raise GeminiTimeoutError(f"Gemini call timed out after {self.timeout_seconds}s")
+        except asyncio.CancelledError:
+            outcome = 'cancelled'
+            raise
+        except Exception:
+            outcome = 'error'
+            raise
+        finally:
+            semaphore.release()
+            latency = time.perf_counter() - started_at
+            if outcome == 'cancelled':
+                self.breaker.release_probe()
+            else:
+                self.breaker.record(latency, ok=outcome == 'ok')
+            metrics.add_gauge('gemini_in_flight', -1)
+            metrics.observe('gemini_call_seconds', latency, prompt_type=prompt_type)
+            metrics.inc('gemini_calls_total', prompt_type=prompt_type, outcome=outcome)
+
+    def _record_usage(self, response, prompt_type: str):
+        """Token counts from the response's usage_metadata (absent on some SDK paths)"""
+        usage = getattr(response, 'usage_metadata', None)
+        if usage is None:
+            return
+
+        counts = {
+            'prompt': getattr(usage, 'prompt_token_count', 0) or 0,
+            'cached': getattr(usage, 'cached_content_token_count', 0) or 0,
+            'response': getattr(usage, 'candidates_token_count', 0) or 0,
+        }
+        for kind, count in counts.items():
+            metrics.observe(f'gemini_{kind}_tokens', count, prompt_type=prompt_type)
+            metrics.inc('gemini_tokens_total', count, prompt_type=prompt_type, kind=kind)
+
+    async def generate_text(self, model, prompt: Any, prompt_type: str = "default") -> str:
+        """generate() and return the response text"""
+        response = await self.generate(model, prompt, prompt_type)
+        return response.text
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+# Global Gemini client - one concurrency budget for the whole process
+gemini_client = GeminiClient()
@@ -0,0 +1,130 @@
+"""
+Intent Cache - LRU + TTL cache for NLUAgent.extract_intent results
+Keyed on the normalized message plus a hash of the exact conversation context
+sent with it (memory lines or recent history). Gemini copies times and dates
+from that context into entities, so an entry is only reused when the prompt
+would have been identical - opening messages ("koi slot hei?", "padel kal
+shaam") and repeat phrasings in the same conversation state.
+"""
+
+import copy
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Any, Optional
+
+from app.config import settings
+from app.metrics import metrics
+
+
+# Messages with these tokens resolve against today, so their entries expire at midnight
+RELATIVE_DATE_RE = re.compile(
+    r"\b(?:aaj|today|tonight|kal|tomorrow|parson|yesterday|next|agle|agla|is\s+hafte|this\s+week|"
+    r"monday|tuesday|wednesday|thursday|friday|saturday|sunday)\b",
+    re.IGNORECASE
+)
+
+# What the last assistant turn was waiting for - the only history that changes the intent
+STATE_FLAGS = [
+    ("name", re.compile(r"\b(?:name|naam)\b", re.IGNORECASE)),
+    ("date", re.compile(r"\b(?:date|din|kab|which day|kis din)\b", re.IGNORECASE)),
+    ("time", re.compile(r"\b(?:time|baje|kis\s+waqt|what time)\b", re.IGNORECASE)),
+    ("service", re.compile(r"\b(?:padel|futsal|cricket|service|sport)\b", re.IGNORECASE)),
+    ("confirm", re.compile(r"\b(?:confirm|book\s+(?:it|kar)|shall i|should i|would you like|proceed)\b", re.IGNORECASE)),
+    ("slots", re.compile(r"\b(?:available|slots?)\b", re.IGNORECASE)),
+    ("payment", re.compile(r"\b(?:payment|account|jazzcash|easypaisa|transfer)\b", re.IGNORECASE)),
+]
+
+
+def normalize_message(message: str) -> str:
+    """Lowercase, collapse whitespace and repeated punctuation"""
+    text = re.sub(r"\s+", " ", (message or "").lower()).strip()
+    text = re.sub(r"([?!.])\1+", r"\1", text)
+    return text
+
+
+def conversation_fingerprint(history: List[Dict[str, Any]]) -> str:
+    """
+    Compact fingerprint of the conversation state relevant to classification
+
+    Only the last assistant turn matters ("yes" after an availability answer is
+    a confirmation); it is reduced to the set of things it asked about.
+    """
+    if not history:
+        return "new"
+
+    last_assistant = next(
+        (msg.get("content", "") for msg in reversed(history) if msg.get("role") == "assistant"),
+        ""
+    )
+    flags = [name for name, pattern in STATE_FLAGS if pattern.search(last_assistant or "")]
+    return "+".join(flags) or "none"
+
+
+class IntentCache:
+    def __init__(self, max_entries: int = None, ttl_seconds: float = None):
+        self.max_entries = max_entries or settings.NLU_INTENT_CACHE_SIZE
+        self.ttl_seconds = ttl_seconds or settings.NLU_INTENT_CACHE_TTL_SECONDS
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def make_key(self, message: str, context: str) -> str:
+        """
+        Args:
+            message: User's message
+            context: The conversation context string the prompt carries (NLUAgent._build_context)
+        """
+        text = normalize_message(message)
+        parts = [text, hashlib.sha1((context or "").encode("utf-8")).hexdigest()]
+        if RELATIVE_DATE_RE.search(text):
+            # "kal" means a different day tomorrow
+            parts.append(datetime.now().strftime("%Y-%m-%d"))
+        return hashlib.sha1("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and time.monotonic() - entry[0] < self.ttl_seconds:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                metrics.inc('nlu_intent_cache_total', result='hit')
+                return copy.deepcopy(entry[1])
+
+            if entry:
+                del self._entries[key]
+            self.misses += 1
+            metrics.inc('nlu_intent_cache_total', result='miss')
+            return None
+
+    def put(self, key: str, result: Dict[str, Any]):
+        """Store a successful classification (errors and unknowns are never cached)"""
+        if result.get('error') or result.get('intent', 'unknown') == 'unknown':
+            return
+
+        with self._lock:
+            self._entries[key] = (time.monotonic(), copy.deepcopy(result))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+
+# Global intent cache instance
+intent_cache = IntentCache()
@@ -0,0 +1,333 @@
+"""
+Local Intent Classifier - Offline-trained tier between the rules and Gemini
+Character n-gram features with a multinomial logistic regression, trained by
+scripts/train_intent_model.py from labelled turns (nlu/data/*.jsonl or
+exported classification logs) and saved as JSON. Pure Python so it adds no
+dependency; the model loads once at import and classifies in well under a
+millisecond.
+"""
+
+import asyncio
+import json
+import math
+import os
+import random
+import re
+import logging
+import threading
+from collections import Counter, defaultdict
+from typing import Dict, List, Any, Optional, Tuple
+
+from app.config import settings
+from app.metrics import metrics
+from nlu.rules import INTENTS, rule_classifier
+from nlu.intent_cache import conversation_fingerprint
+
+logger = logging.getLogger(__name__)
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODEL_VERSION = 1
+NGRAM_RANGE = (2, 4)
+
+# Intents the local tier never answers: names need the exact span extracted,
+# unknown means "ask Gemini"
+NON_LOCAL_INTENTS = {"name_provided", "unknown"}
+
+WORD_RE = re.compile(r"[a-z0-9']+|[^\sa-z0-9']")
+
+# Exports run on executor threads - one line written at a time
+_export_lock = threading.Lock()
+
+
+def resolve_path(path: str) -> str:
+    """Relative paths are relative to backend/"""
+    return path if os.path.isabs(path) else os.path.join(BACKEND_DIR, path)
+
+
+def extract_features(message: str, context: Optional[str] = None) -> List[str]:
+    """
+    Character n-grams (within word boundaries) plus whole words and an
+    optional conversation-state feature ("ctx=confirm+slots")
+    """
+    words = WORD_RE.findall((message or "").lower())
+    features = set()
+    for word in words:
+        features.add(f"w={word}")
+        padded = f" {word} "
+        for n in range(NGRAM_RANGE[0], NGRAM_RANGE[1] + 1):
+            for i in range(len(padded) - n + 1):
+                features.add(padded[i:i + n])
+    if context:
+        features.add(f"ctx={context}")
+    return sorted(features)
+
+
+def load_examples(path: str) -> List[Dict[str, Any]]:
+    """{text, intent[, context]} records from a JSONL file (unlabelled or unknown intents skipped)"""
+    examples = []
+    with open(resolve_path(path), encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if record.get("text") and record.get("intent") in INTENTS:
+                examples.append(record)
+    return examples
+
+
+def export_labelled_turn(message: str, history: List[Dict[str, Any]], intent: str):
+    """
+    Append a Gemini-labelled turn to NLU_TRAINING_LOG_PATH (no-op when unset)
+
+    The records are the JSONL format scripts/train_intent_model.py reads, so
+    the exported log can be reviewed and fed straight back into training.
+    Inside the event loop the file write is handed to the default executor;
+    the turn never waits for it.
+    """
+    if not settings.NLU_TRAINING_LOG_PATH or intent not in INTENTS or intent == "unknown":
+        return
+    record = {"text": message, "intent": intent, "context": conversation_fingerprint(history)}
+    line = json.dumps(record, ensure_ascii=False) + "\n"
+    path = resolve_path(settings.NLU_TRAINING_LOG_PATH)
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        # Scripts outside an event loop
+        _append_line(path, line)
+        return
+    loop.run_in_executor(None, _append_line, path, line)
+
+
+def _append_line(path: str, line: str):
+    try:
+        with _export_lock, open(path, "a", encoding="utf-8") as f:
+            f.write(line)
+    except Exception as e:
+        logger.warning(f"Could not export labelled turn: {e}")
+
+
+class LocalIntentClassifier:
+    """
+    Multinomial logistic regression over sparse binary n-gram features
+
+    weights maps feature -> per-intent weight list (pruned to non-zero rows);
+    bias is per intent. predict() returns softmax probabilities, so the
+    top probability doubles as the confidence the caller gates on.
+    """
+
+    def __init__(self, intents: List[str] = None):
+        self.intents = list(intents or INTENTS)
+        self.weights: Dict[str, List[float]] = {}
+        self.bias = [0.0] * len(self.intents)
+        self.meta: Dict[str, Any] = {}
+
+    @property
+    def loaded(self) -> bool:
+        return bool(self.weights)
+
+    def _scores(self, features: List[str]) -> List[float]:
+        scores = list(self.bias)
+        scale = 1.0 / math.sqrt(len(features)) if features else 0.0
+        for feature in features:
+            row = self.weights.get(feature)
+            if row:
+                for i, weight in enumerate(row):
+                    scores[i] += weight * scale
+        return scores
+
+    @staticmethod
+    def _softmax(scores: List[float]) -> List[float]:
+        top = max(scores)
+        exps = [math.exp(s - top) for s in scores]
+        total = sum(exps)
+        return [e / total for e in exps]
+
+    def train(
+        self,
+        examples: List[Dict[str, Any]],
+        epochs: int = 30,
+        learning_rate: float = 0.5,
+        l2: float = 1e-4,
+        seed: int = 13
+    ):
+        """
+        Fit with plain SGD on the cross-entropy loss
+
+        Args:
+            examples: {text, intent[, context]} records
+            epochs: Passes over the data
+            learning_rate: Initial step size (decays linearly)
+            l2: L2 penalty applied to the touched weight rows
+            seed: Shuffle seed, so retraining on the same data is reproducible
+        """
+        index = {intent: i for i, intent in enumerate(self.intents)}
+        data = [
+            (extract_features(ex["text"], ex.get("context")), index[ex["intent"]])
+            for ex in examples
+        ]
+        rng = random.Random(seed)
+        weights: Dict[str, List[float]] = defaultdict(lambda: [0.0] * len(self.intents))
+        self.weights = weights
+        self.bias = [0.0] * len(self.intents)
+
+        for epoch in range(epochs):
+            rng.shuffle(data)
+            rate = learning_rate * (1.0 - epoch / epochs)
+            for features, label in data:
+                probs = self._softmax(self._scores(features))
+                scale = 1.0 / math.sqrt(len(features)) if features else 0.0
+                grads = [p - (1.0 if i == label else 0.0) for i, p in enumerate(probs)]
+                for i, grad in enumerate(grads):
+                    self.bias[i] -= rate * grad
+                for feature in features:
+                    row = weights[feature]
+                    for i, grad in enumerate(grads):
+                        row[i] -= rate * (grad * scale + l2 * row[i])
+
+        # Round and drop rows that ended up negligible - keeps the JSON small
+        self.weights = {}
+        for feature, row in weights.items():
+            rounded = [round(w, 4) for w in row]
+            if max(abs(w) for w in rounded) >= 1e-3:
+                self.weights[feature] = rounded
+        self.bias = [round(b, 4) for b in self.bias]
+        self.meta = {
+            "trained_on": len(examples),
+            "intent_counts": dict(Counter(ex["intent"] for ex in examples)),
+        }
+
+    def predict(self, message: str, context: Optional[str] = None) -> Tuple[str, float]:
+        """(intent, probability) for the most likely intent"""
+        probs = self._softmax(self._scores(extract_features(message, context)))
+        best = max(range(len(probs)), key=probs.__getitem__)
+        return self.intents[best], probs[best]
+
+    def classify(self, message: str, history: List[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Classify a message with the local model
+
+        Args:
+            message: User's message
+            history: Conversation history (only its state fingerprint is used)
+
+        Returns:
+            Dict in the rule classifier's shape (intent, entities, confidence,
+            source='local'), or None when no model is loaded
+        """
+        if not self.loaded:
+            return None
+
+        context = conversation_fingerprint(history) if history is not None else None
+        intent, confidence = self.predict(message, context)
+        if intent in NON_LOCAL_INTENTS:
+            confidence = 0.0
+
+        accepted = confidence >= settings.NLU_LOCAL_CONFIDENCE_THRESHOLD
+        metrics.inc('nlu_local_total', outcome='accepted' if accepted else 'below_threshold')
+        return {
+            "intent": intent,
+            "confidence": round(confidence, 4),
+            "entities": rule_classifier.extract_entities(message),
+            "source": "local",
+        }
+
+    def evaluate(self, examples: List[Dict[str, Any]], threshold: float = None) -> Dict[str, Any]:
+        """
+        Accuracy report on labelled examples
+
+        Returns:
+            Dict with accuracy, per-intent precision/recall, and coverage /
+            precision of the predictions at or above the confidence threshold
+        """
+        threshold = settings.NLU_LOCAL_CONFIDENCE_THRESHOLD if threshold is None else threshold
+        correct = 0
+        accepted = 0
+        accepted_correct = 0
+        predicted = Counter()
+        actual = Counter()
+        hits = Counter()
+        errors = []
+
+        for ex in examples:
+            intent, confidence = self.predict(ex["text"], ex.get("context"))
+            predicted[intent] += 1
+            actual[ex["intent"]] += 1
+            ok = intent == ex["intent"]
+            if ok:
+                correct += 1
+                hits[intent] += 1
+            else:
+                errors.append({"text": ex["text"], "expected": ex["intent"], "predicted": intent, "confidence": round(confidence, 3)})
+            if confidence >= threshold and intent not in NON_LOCAL_INTENTS:
+                accepted += 1
+                accepted_correct += ok
+
+        total = len(examples)
+        return {
+            "total": total,
+            "accuracy": correct / total if total else 0.0,
+            "threshold": threshold,
+            "coverage": accepted / total if total else 0.0,
+            "precision_at_threshold": accepted_correct / accepted if accepted else 0.0,
+            "per_intent": {
+                intent: {
+                    "precision": hits[intent] / predicted[intent] if predicted[intent] else 0.0,
+                    "recall": hits[intent] / actual[intent] if actual[intent] else 0.0,
+                    "support": actual[intent],
+                }
+                for intent in self.intents if actual[intent]
+            },
+            "errors": errors,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'loaded': self.loaded,
+            'features': len(self.weights),
+            'trained_on': self.meta.get('trained_on', 0),
+            'holdout_accuracy': self.meta.get('holdout_accuracy')
+        }
+
+    def save(self, path: str):
+        with open(resolve_path(path), "w", encoding="utf-8") as f:
+            json.dump({
+                "version": MODEL_VERSION,
+                "ngram_range": list(NGRAM_RANGE),
+                "intents": self.intents,
+                "bias": self.bias,
+                "meta": self.meta,
+                "weights": self.weights,
+            }, f, ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+
+    @classmethod
+    def load(cls, path: str) -> "LocalIntentClassifier":
+        """Load a saved model; a missing or incompatible file gives an empty (disabled) classifier"""
+        classifier = cls()
+        if not path:
+            return classifier
+
+        full_path = resolve_path(path)
+        if not os.path.exists(full_path):
+            logger.info(f"Local intent model not found at {full_path} - local tier disabled")
+            return classifier
+
+        try:
+            with open(full_path, encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") != MODEL_VERSION or tuple(data.get("ngram_range", ())) != NGRAM_RANGE:
+                logger.warning(f"Local intent model at {full_path} is incompatible - retrain it")
+                return classifier
+            classifier.intents = data["intents"]
+            classifier.bias = data["bias"]
+            classifier.weights = data["weights"]
+            classifier.meta = data.get("meta", {})
+            logger.info(f"Loaded local intent model ({len(classifier.weights)} features) from {full_path}")
+        except Exception as e:
+            logger.error(f"Failed to load local intent model from {full_path}: {e}")
+        return classifier
+
+
+# Global classifier instance (loaded once at startup)
+local_classifier = LocalIntentClassifier.load(settings.NLU_LOCAL_MODEL_PATH)
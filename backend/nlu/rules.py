@@ -0,0 +1,288 @@
+"""
+Rule-Based Intent Classifier - Tier-1 fast path ahead of Gemini
+Compiled keyword/regex grammars for the Roman Urdu and English patterns listed in
+NLUAgent._create_intent_prompt. Short, formulaic messages ("Aoa", "han g", "kal",
+"6 baje") are classified without an LLM call; anything else returns a low
+confidence so the caller falls through to Gemini.
+"""
+
+import re
+import logging
+from typing import Dict, Any, Optional, List, Tuple
+
+from app.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+# Same intents as the Gemini intent prompt
+INTENTS = [
+    "greeting",
+    "booking_request",
+    "availability_inquiry",
+    "service_selection",
+    "date_selection",
+    "time_selection",
+    "price_inquiry",
+    "confirmation",
+    "cancellation",
+    "modification",
+    "information",
+    "payment_related",
+    "name_provided",
+    "unknown",
+]
+
+# Longer messages carry too much nuance for keyword rules
+MAX_RULE_WORDS = 8
+
+# Rules that score low on purpose - negations and bare "nahi" need the LLM,
+# not another keyword-driven tier (the local model reads "cancel nahi karna" as a cancel)
+LLM_ONLY_RULES = {"negation", "negated_cancellation", "cancellation"}
+
+
+def _alt(words: List[str]) -> str:
+    return "|".join(sorted((re.escape(w).replace(r"\ ", r"\s+") for w in words), key=len, reverse=True))
+
+
+GREETING_WORDS = [
+    "hi", "hello", "hey", "aoa", "salam", "salaam", "slam", "assalam", "asalam",
+    "assalamu alaikum", "assalam o alaikum", "asalam o alaikum", "assalamualaikum",
+    "walaikum assalam", "good morning", "good evening",
+]
+# No bare "k" / "g" - single letters are too easy to send by accident ("g" only as a suffix: "han g")
+CONFIRM_WORDS = [
+    "yes", "yeah", "yep", "yup", "ok", "okay", "okk", "han", "haan", "han g", "han ji",
+    "haan ji", "haan g", "ji", "jee", "theek hai", "thik hai", "theek", "sure", "done",
+    "confirm", "confirmed", "book it", "book kar do", "kar do", "kardo", "perfect", "great",
+]
+# Phrases that ask to cancel wherever they appear; a bare "no" / "nahi" only counts on its own
+CANCEL_REQUEST_WORDS = [
+    "cancel", "cancel it", "cancel karo", "cancel kar do",
+    "don't want", "dont want", "nahi chahiye", "rehne do",
+]
+CANCEL_WORDS = ["no", "nahi", "nahin", "nai"] + CANCEL_REQUEST_WORDS
+# Anywhere in a message these make a keyword match unsafe ("cancel my booking", "no booking for me")
+NEGATION_WORDS = [
+    "no", "not", "nahi", "nahin", "nai", "mat", "never", "don't", "dont", "do not",
+    "cancel", "cancelled", "rehne do",
+]
+SERVICE_WORDS = {
+    "padel": "padel", "paddle": "padel", "padal": "padel",
+    "futsal": "futsal", "football": "futsal",
+    "cricket": "cricket",
+    "pickleball": "pickleball",
+    "salon": "salon",
+}
+DATE_WORDS = [
+    "aaj", "today", "kal", "tomorrow", "parson", "day after tomorrow",
+    "monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday",
+]
+PERIOD_WORDS = [
+    "morning", "subah", "afternoon", "dopahar", "evening", "shaam", "sham",
+    "night", "raat",
+]
+
+GREETING_RE = re.compile(rf"^(?:{_alt(GREETING_WORDS)})\b", re.IGNORECASE)
+GREETING_ONLY_RE = re.compile(rf"^(?:{_alt(GREETING_WORDS)})(?:\s+(?:ji|g|bhai|sir))?[\s!.,]*$", re.IGNORECASE)
+CANCEL_ANYWHERE_RE = re.compile(rf"(?<![\w'])(?:{_alt(CANCEL_REQUEST_WORDS)})(?![\w'])", re.IGNORECASE)
+CONFIRM_RE = re.compile(rf"^(?:{_alt(CONFIRM_WORDS)})(?:\s+(?:ji|g|please|plz|bhai))?[\s!.,]*$", re.IGNORECASE)
+CANCEL_RE = re.compile(rf"^(?:{_alt(CANCEL_WORDS)})(?:\s+(?:ji|g|please|plz|bhai))?[\s!.,]*$", re.IGNORECASE)
+NEGATION_RE = re.compile(rf"(?<![\w'])(?:{_alt(NEGATION_WORDS)})(?![\w'])", re.IGNORECASE)
+SERVICE_RE = re.compile(rf"\b(?P<service>{_alt(list(SERVICE_WORDS))})\b", re.IGNORECASE)
+DATE_RE = re.compile(
+    rf"\b(?P<date>(?:(?:next|agle|agla|is|this)\s+)?(?:{_alt(DATE_WORDS)})|\d{{4}}-\d{{2}}-\d{{2}}|\d{{1,2}}/\d{{1,2}}(?:/\d{{2,4}})?)\b",
+    re.IGNORECASE
+)
+CLOCK_TIME_RE = re.compile(
+    r"(?P<time>\b\d{1,2}(?::\d{2})?\s*(?:-|to|se)\s*\d{1,2}(?::\d{2})?\s*(?:am|pm|baje|bajay|bje)?"
+    r"|\b\d{1,2}(?::\d{2})?\s*(?:am|pm|baje|bajay|bjay|bje)\b"
+    r"|\b\d{1,2}:\d{2}\b)",
+    re.IGNORECASE
+)
+PERIOD_RE = re.compile(rf"\b(?P<time>{_alt(PERIOD_WORDS)})\b", re.IGNORECASE)
+BARE_NUMBER_RE = re.compile(r"^\s*(?P<number>\d{1,2})(?::(?P<minute>\d{2}))?\s*[.!?]*\s*$")
+PRICE_RE = re.compile(r"\b(?:price|prices|pricing|charges?|kitna|kitne|kitni|rate|rates|how\s+much|discounts?|fees?|cost)\b", re.IGNORECASE)
+PAYMENT_RE = re.compile(r"\b(?:payment|pay|paid|transfer|account\s+(?:number|no|details)|jazzcash|jazz\s+cash|easypaisa|easy\s+paisa|iban|bank)\b", re.IGNORECASE)
+AVAILABILITY_RE = re.compile(r"\b(?:slots?|available|availability|khali|free|mil\s+jaye?ga|milega|time\s+(?:hai|hei|he))\b|\b(?:hai|hei)\s*\?", re.IGNORECASE)
+BOOKING_RE = re.compile(r"\b(?:book|booking|reserve|chahiye|chahye|karna\s+hai|karni\s+hai|krna\s+hai)\b", re.IGNORECASE)
+MODIFY_RE = re.compile(r"^(?:actually|change|instead|badal|badlo)\b|\b(?:change\s+(?:it\s+)?to|instead\s+of)\b", re.IGNORECASE)
+INFO_RE = re.compile(r"\b(?:what\s+services|which\s+services|timings?|address|location|kahan|where|kya\s+services)\b", re.IGNORECASE)
+NAME_RE = re.compile(
+    r"^(?:my\s+name\s+is|mera\s+naam|name\s*:?)\s+(?P<name>[a-z][a-z'-]+(?:\s+[a-z][a-z'-]+){0,2})"
+    r"(?:\s+(?:hai|he|h))?[\s.!]*$",
+    re.IGNORECASE
+)
+
+# Assistant turns that make a bare number an answer about time / bare words a name
+TIME_QUESTION_RE = re.compile(r"\b(?:time|baje|slot|kab|when|what time|kis\s+waqt)\b", re.IGNORECASE)
+NAME_QUESTION_RE = re.compile(r"\b(?:name|naam)\b", re.IGNORECASE)
+# "i am fine" / "i'm outside" are not names - only an answer to our name question is
+SELF_INTRO_RE = re.compile(
+    r"^(?:i\s+am|i'm)\s+(?P<name>[a-z][a-z'-]+(?:\s+[a-z][a-z'-]+){0,2})[\s.!]*$",
+    re.IGNORECASE
+)
+BARE_NAME_RE = re.compile(r"^(?P<name>[a-z][a-z'-]+(?:\s+[a-z][a-z'-]+){0,2})[\s.!]*$", re.IGNORECASE)
+
+
+class RuleBasedClassifier:
+    """
+    Deterministic tier-1 intent classifier
+
+    classify() returns the same shape as NLUAgent.extract_intent plus
+    'source': 'rules' and the matched 'rule'. Callers compare 'confidence'
+    against NLU_RULES_CONFIDENCE_THRESHOLD and fall back to Gemini below it.
+    """
+
+    def __init__(self):
+        self.total = 0
+        self.accepted = 0
+        self.by_intent: Dict[str, int] = {}
+
+    def extract_entities(self, message: str) -> Dict[str, Any]:
+        """service_type / date / time tokens in the raw forms the Gemini prompt produces"""
+        entities = {}
+
+        service = SERVICE_RE.search(message)
+        if service:
+            entities["service_type"] = SERVICE_WORDS[re.sub(r"\s+", " ", service.group("service").lower())]
+
+        date = DATE_RE.search(message)
+        if date:
+            entities["date"] = date.group("date").lower()
+
+        # A clock time is more specific than "shaam" in "kal shaam 7 baje"
+        time = CLOCK_TIME_RE.search(message) or PERIOD_RE.search(message)
+        if time:
+            entities["time"] = time.group("time").strip().lower()
+
+        return entities
+
+    def _match(self, text: str, last_assistant: Optional[str]) -> Tuple[str, float, str, Dict[str, Any]]:
+        """(intent, confidence, rule, entities) for a normalized message"""
+        if GREETING_ONLY_RE.match(text):
+            return "greeting", 0.97, "greeting", {}
+
+        if CONFIRM_RE.match(text):
+            return "confirmation", 0.92, "confirmation", {}
+
+        if CANCEL_RE.match(text):
+            # Below the threshold: a bare "no" may decline an offer rather than cancel a booking
+            return "cancellation", 0.8, "cancellation", {}
+
+        asked_name = bool(last_assistant and NAME_QUESTION_RE.search(last_assistant))
+        name = NAME_RE.match(text) or (asked_name and SELF_INTRO_RE.match(text))
+        if name:
+            return "name_provided", 0.9, "name", {"customer_name": name.group("name").title()}
+
+        bare = BARE_NUMBER_RE.match(text)
+        if bare:
+            # "6" alone is only clearly a time when we just asked for one
+            confidence = 0.9 if last_assistant and TIME_QUESTION_RE.search(last_assistant) else 0.6
+            # "6 baje" is the form normalize_time understands (PM unless subah/morning)
+            time = f"{bare.group('number')}:{bare.group('minute')}" if bare.group("minute") else f"{bare.group('number')} baje"
+            return "time_selection", confidence, "bare_number", {"time": time}
+
+        entities = self.extract_entities(text)
+        if GREETING_RE.match(text):
+            # "Aoa kal slot hai?" - greeting prefix doesn't change the intent
+            text = GREETING_RE.sub("", text).strip(" ,!.")
+
+        if NEGATION_RE.search(text):
+            # "cancel my booking for kal", "no booking for me" - keywords below would read
+            # these as requests; leave them to Gemini (the guess only serves degraded mode)
+            if CANCEL_ANYWHERE_RE.search(text):
+                return "cancellation", 0.7, "negated_cancellation", entities
+            return "unknown", 0.0, "negation", entities
+
+        if PAYMENT_RE.search(text):
+            return "payment_related", 0.88, "payment", entities
+
+        if PRICE_RE.search(text):
+            return "price_inquiry", 0.88, "price", entities
+
+        if MODIFY_RE.search(text):
+            return "modification", 0.75, "modification", entities
+
+        if BOOKING_RE.search(text):
+            return "booking_request", 0.86, "booking", entities
+
+        if AVAILABILITY_RE.search(text):
+            return "availability_inquiry", 0.86, "availability", entities
+
+        if INFO_RE.search(text):
+            return "information", 0.75, "information", entities
+
+        # Entity-only replies: "kal", "6 baje", "padel", "kal shaam"
+        leftover = text
+        for pattern in (SERVICE_RE, DATE_RE, CLOCK_TIME_RE, PERIOD_RE):
+            leftover = pattern.sub("", leftover)
+        leftover = re.sub(r"\b(?:ka|ki|ke|ko|at|on|for|slot|se|tak|please|plz)\b|[\s,.!?]", "", leftover, flags=re.IGNORECASE)
+
+        if entities and not leftover:
+            if "service_type" in entities and ("date" in entities or "time" in entities):
+                # "padel kal shaam" - a slot query, as the intent prompt classifies it
+                return "availability_inquiry", 0.9, "availability_entities", entities
+            if "time" in entities:
+                return "time_selection", 0.9, "time", entities
+            if "date" in entities:
+                return "date_selection", 0.9, "date", entities
+            return "service_selection", 0.9, "service", entities
+
+        # "Jazib Waqas" right after we asked for a name
+        bare_name = BARE_NAME_RE.match(text)
+        if bare_name and not entities and last_assistant and NAME_QUESTION_RE.search(last_assistant):
+            return "name_provided", 0.88, "bare_name", {"customer_name": bare_name.group("name").title()}
+
+        return "unknown", 0.0, "none", entities
+
+    def classify(self, message: str, last_assistant: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Classify a message with the rule grammars
+
+        Args:
+            message: User's message
+            last_assistant: Previous assistant message (disambiguates bare numbers)
+
+        Returns:
+            Dict with intent, entities, confidence, source, rule and
+            llm_only (skip the local model, go straight to Gemini),
+            or None when the message is too long for rules
+        """
+        text = re.sub(r"\s+", " ", (message or "").strip())
+        self.total += 1
+
+        if not text or len(text.split()) > MAX_RULE_WORDS:
+            metrics.inc('nlu_rules_total', outcome='skipped')
+            return None
+
+        intent, confidence, rule, entities = self._match(text, last_assistant)
+        metrics.inc('nlu_rules_total', outcome='matched' if confidence else 'unmatched')
+
+        return {
+            "intent": intent,
+            "confidence": confidence,
+            "entities": entities,
+            "source": "rules",
+            "rule": rule,
+            "llm_only": rule in LLM_ONLY_RULES,
+        }
+
+    def record_accepted(self, result: Dict[str, Any]):
+        """Count a rule result the caller used instead of Gemini"""
+        self.accepted += 1
+        self.by_intent[result["intent"]] = self.by_intent.get(result["intent"], 0) + 1
+        metrics.inc('nlu_rules_accepted_total', intent=result["intent"])
+
+    def coverage(self) -> Dict[str, Any]:
+        """Share of messages answered without Gemini since startup"""
+        return {
+            "total": self.total,
+            "accepted": self.accepted,
+            "coverage": self.accepted / self.total if self.total else 0.0,
+            "by_intent": dict(self.by_intent),
+        }
+
+
+# Global classifier instance
+rule_classifier = RuleBasedClassifier()
@@ -0,0 +1,117 @@
+"""
+Session Cache - Write-through, in-process cache of conversation sessions
+The worker that handled a customer's last message already holds the session it
+just wrote, so the next message is served from here instead of re-reading
+conversation_states/{phone}. Each entry carries the Firestore update_time of
+that write as its version; the next write is conditioned on it, so when
+another worker touched the session in between the write is rejected and the
+state manager drops the entry and falls back to a Firestore read.
+"""
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+from app.config import settings
+from app.metrics import metrics
+
+
+class SessionCache:
+    """LRU of phone -> (last access, session, version) with an idle TTL"""
+
+    def __init__(self, max_entries: int = None, idle_seconds: float = None):
+        self.max_entries = max_entries or settings.SESSION_CACHE_SIZE
+        self.idle_seconds = idle_seconds or settings.SESSION_CACHE_IDLE_SECONDS
+        self._entries: "OrderedDict[str, list]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.conflicts = 0
+
+    def get(self, phone_number: str) -> Optional[Tuple[Dict[str, Any], Any]]:
+        """
+        Cached (session copy, version) for a phone number, or None on a miss
+
+        A hit refreshes the idle timer; entries idle past SESSION_CACHE_IDLE_SECONDS
+        are dropped (the customer may have continued on another worker meanwhile).
+        """
+        with self._lock:
+            entry = self._entries.get(phone_number)
+            now = time.monotonic()
+            if entry and now - entry[0] < self.idle_seconds:
+                entry[0] = now
+                self._entries.move_to_end(phone_number)
+                self.hits += 1
+                metrics.inc('session_cache_total', result='hit')
+                return copy.deepcopy(entry[1]), entry[2]
+
+            if entry:
+                del self._entries[phone_number]
+            self.misses += 1
+            metrics.inc('session_cache_total', result='expired' if entry else 'miss')
+            return None
+
+    def put(self, phone_number: str, session: Dict[str, Any], version: Any):
+        """Store a session as read from or written to Firestore with that document's update_time"""
+        with self._lock:
+            self._entries[phone_number] = [time.monotonic(), copy.deepcopy(session), version]
+            self._entries.move_to_end(phone_number)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def apply_write(self, phone_number: str, fields: Dict[str, Any], version: Any):
+        """
+        Fold a successful top-level field write into the cached session
+
+        Only plain values - nested maps merge server-side and can't be mirrored
+        here, so callers writing those invalidate instead. No-op when the session
+        isn't cached (the next read fetches it).
+        """
+        with self._lock:
+            entry = self._entries.get(phone_number)
+            if not entry:
+                return
+            entry[0] = time.monotonic()
+            entry[1].update(copy.deepcopy(fields))
+            entry[2] = version
+            self._entries.move_to_end(phone_number)
+
+    def version(self, phone_number: str) -> Any:
+        """Version of the cached entry (None when not cached) - does not count as a lookup"""
+        with self._lock:
+            entry = self._entries.get(phone_number)
+            return entry[2] if entry else None
+
+    def invalidate(self, phone_number: str, conflict: bool = False):
+        """
+        Drop a session so the next read goes to Firestore
+
+        Args:
+            phone_number: Customer's phone number
+            conflict: True when a conditional write found the document changed elsewhere
+        """
+        with self._lock:
+            self._entries.pop(phone_number, None)
+            if conflict:
+                self.conflicts += 1
+                metrics.inc('session_cache_conflicts_total')
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'conflicts': self.conflicts,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+
+# Global session cache instance
+session_cache = SessionCache()
@@ -5,10 +5,17 @@ Handles conversation state for WhatsApp interactions
 
 import logging
 from typing import Dict, List, Any, Optional
+from google.api_core.exceptions import FailedPrecondition, NotFound
+from google.cloud import firestore
 from app.firestore import firestore_db
+from app.metrics import metrics
+from nlu.session_cache import session_cache
 
 logger = logging.getLogger(__name__)
 
+# Messages kept in the session document (older ones are trimmed on write)
+MAX_HISTORY_MESSAGES = 10
+
 
 class StateManager:
     """Conversation state manager using Firestore"""
@@ -29,17 +36,23 @@ class StateManager:
             Session data with state, context, and history
         """
         try:
-            logger.info(f"Getting session for {phone_number}")
-            
-            session = await self.db.get_conversation_state(phone_number)
-            
-            # Ensure required fields exist
-            if 'state' not in session:
-                session['state'] = 'greeting'
-            if 'context' not in session:
-                session['context'] = {}
-            if 'history' not in session:
-                session['history'] = []
+            cached = session_cache.get(phone_number)
+            if cached:
+                session = cached[0]
+            else:
+                logger.info(f"Getting session for {phone_number}")
+                session, update_time = await self.db.get_conversation_state_versioned(phone_number)
+                session = session or {'phone_number': phone_number}
+                
+                # Ensure required fields exist
+                if 'state' not in session:
+                    session['state'] = 'greeting'
+                if 'context' not in session:
+                    session['context'] = {}
+                if 'history' not in session:
+                    session['history'] = []
+                
+                session_cache.put(phone_number, session, update_time)
             
             logger.info(f"Session state: {session.get('state', 'unknown')}")
             return session
@@ -67,15 +80,14 @@ class StateManager:
         try:
             logger.info(f"Updating session for {phone_number}")
             
-            # Get current session
-            current_session = await self.get_session(phone_number)
-            
-            # Merge new data with current session
-            updated_session = {**current_session, **data}
-            updated_session['phone_number'] = phone_number
+            # set(merge=True) merges server-side - no need to read the session first
+            updated_session = {**data, 'phone_number': phone_number}
             
             # Update in Firestore
             success = await self.db.update_conversation_state(phone_number, updated_session)
+            metrics.inc('conversation_state_writes_total', op='update_session')
+            # Nested maps merge server-side, so the cached copy can't be patched - re-read next time
+            session_cache.invalidate(phone_number)
             
             if success:
                 logger.info(f"Session updated successfully: {data}")
@@ -88,6 +100,80 @@ class StateManager:
             logger.error(f"Error updating session: {e}")
             return False
     
+    async def append_turn(
+        self,
+        phone_number: str,
+        user_message: str,
+        assistant_message: str,
+        history: Optional[List[Dict[str, Any]]] = None,
+        memory: Optional[Dict[str, Any]] = None
+    ) -> bool:
+        """
+        Append a user message and the assistant reply in one write (no pre-read)
+        
+        The write is conditioned on the version of the cached session; if another
+        worker changed the session since, the cache entry is dropped, the session
+        re-read and the turn appended to the fresh history instead.
+        
+        Args:
+            phone_number: Customer's phone number
+            user_message: Incoming message text
+            assistant_message: Reply sent back
+            history: Session history as read at the start of this turn. When given,
+                the stored list is replaced with the trimmed result; otherwise the
+                two messages are array-appended server-side and trimmed on a later write.
+            memory: Updated conversation memory, stored in the same write (every key is
+                always present, so it replaces the stored map whole)
+            
+        Returns:
+            Success status
+        """
+        try:
+            timestamp = self._get_timestamp()
+            messages = [
+                {'role': 'user', 'content': user_message, 'timestamp': timestamp},
+                {'role': 'assistant', 'content': assistant_message, 'timestamp': timestamp}
+            ]
+            
+            if history is None:
+                success = await self.db.update_conversation_state(phone_number, {
+                    'phone_number': phone_number,
+                    'history': firestore.ArrayUnion(messages),
+                    **({'memory': memory} if memory is not None else {})
+                })
+                metrics.inc('conversation_state_writes_total', op='append_turn')
+                session_cache.invalidate(phone_number)
+                return success
+            
+            fields = {
+                'phone_number': phone_number,
+                'history': (list(history) + messages)[-MAX_HISTORY_MESSAGES:]
+            }
+            if memory is not None:
+                fields['memory'] = memory
+            try:
+                update_time = await self.db.write_conversation_state(
+                    phone_number, fields, last_update_time=session_cache.version(phone_number)
+                )
+            except (FailedPrecondition, NotFound):
+                # Another worker wrote (or cleared) the session since we cached it
+                logger.info(f"Session for {phone_number} changed elsewhere - re-reading before append")
+                session_cache.invalidate(phone_number, conflict=True)
+                fresh = await self.get_session(phone_number)
+                fields['history'] = (fresh.get('history', []) + messages)[-MAX_HISTORY_MESSAGES:]
+                update_time = await self.db.write_conversation_state(
+                    phone_number, fields, last_update_time=session_cache.version(phone_number)
+                )
+            metrics.inc('conversation_state_writes_total', op='append_turn')
+            
+            session_cache.apply_write(phone_number, fields, update_time)
+            return True
+            
+        except Exception as e:
+            logger.error(f"Error appending turn to history: {e}")
+            session_cache.invalidate(phone_number)
+            return False
+    
     async def add_message_to_history(self, phone_number: str, role: str, content: str) -> bool:
         """
         Add message to conversation history
@@ -112,9 +198,8 @@ class StateManager:
                 'timestamp': self._get_timestamp()
             })
             
-            # Keep only last 10 messages to avoid large documents
-            if len(history) > 10:
-                history = history[-10:]
+            # Keep only the last messages to avoid large documents
+            history = history[-MAX_HISTORY_MESSAGES:]
             
             # Update session
             return await self.update_session(phone_number, {'history': history})
@@ -158,13 +243,8 @@ class StateManager:
             Success status
         """
         try:
-            session = await self.get_session(phone_number)
-            context = session.get('context', {})
-            
-            # Update context with booking data
-            context.update(booking_data)
-            
-            return await self.update_session(phone_number, {'context': context})
+            # Merge-write merges the nested context map server-side
+            return await self.update_session(phone_number, {'context': booking_data})
             
         except Exception as e:
             logger.error(f"Error setting booking context: {e}")
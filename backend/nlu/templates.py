@@ -0,0 +1,289 @@
+"""
+Response Templates - Deterministic bilingual replies
+Availability lists, booking confirmations, payment/pricing details and "which
+date?" follow-ups are fully determined by data, so they are rendered from
+precompiled English / Roman Urdu templates instead of a Gemini call. Anything
+open-ended returns None and falls through to Gemini.
+"""
+
+import re
+import logging
+from string import Template
+from datetime import datetime
+from typing import Dict, List, Any, Optional
+
+from app.metrics import metrics
+from nlu.rules import SERVICE_RE, DATE_RE
+
+logger = logging.getLogger(__name__)
+
+
+# Words that mark a message as Roman Urdu (reply in kind)
+ROMAN_URDU_RE = re.compile(
+    r"\b(?:aoa|salam|salaam|koi|hei|hai|hain|kal|aaj|parson|shaam|subah|raat|baje|bajay|"
+    r"chahiye|karna|karni|krna|kitna|kitne|mujhe|mera|naam|han|haan|nahi|theek|thik|ji|kya|kab|dein|karein|bhej|batao|bata)\b",
+    re.IGNORECASE
+)
+
+# Asking where to pay: "account number?" / "kahan transfer karun?" / "how do I pay" -
+# not reporting a payment ("payment kar di", "payment send kar di")
+PAYMENT_DETAILS_RE = re.compile(
+    r"\b(?:account|iban|bank|details?|kahan|kidhar|where)\b"
+    r"|\b(?:how|kaise|kese)\s+(?:(?:do|can|should)\s+i\s+|to\s+)?(?:pay|transfer|send|kar\w*)\b"
+    r"|\bnumber\s+(?:bhej\w*|send|de|do|dein|dedo)\b|\bsend\s+(?:me\s+)?(?:the\s+|your\s+)?number\b",
+    re.IGNORECASE
+)
+
+# Slots listed in one availability reply
+MAX_LISTED_SLOTS = 10
+
+
+def _compile(templates: Dict[str, Dict[str, str]]) -> Dict[str, Dict[str, Template]]:
+    return {name: {lang: Template(text) for lang, text in variants.items()} for name, variants in templates.items()}
+
+
+TEMPLATES = _compile({
+    "availability": {
+        "en": "📅 Available slots on *$date*:\n\n$slots\n\nWhich time would you like to book?",
+        "ur": "📅 *$date* ko ye slots available hain:\n\n$slots\n\nKaunsa time book karna hai?",
+    },
+    "availability_next_date": {
+        "en": "Sorry, nothing is free on $requested_date. 📅 Next available slots on *$date*:\n\n$slots\n\nWhich time would you like to book?",
+        "ur": "Sorry, $requested_date ko koi slot khali nahi hai. 📅 Agla available din *$date* hai:\n\n$slots\n\nKaunsa time book karna hai?",
+    },
+    "no_availability": {
+        "en": "Sorry, there are no slots available on $date or in the next 7 days. Please contact the venue directly.",
+        "ur": "Sorry, $date ya agle 7 din mein koi slot available nahi hai. Please venue se direct contact karein.",
+    },
+    "availability_error": {
+        "en": "Sorry, I couldn't check availability right now. Please try again in a moment.",
+        "ur": "Sorry, abhi availability check nahi ho saki. Thori der mein dobara try karein.",
+    },
+    "booking_confirmed": {
+        "en": "✅ *Booking Confirmed!*\n\nBooking ID: $booking_id\nDate: $date\nTime: $time\n\nThank you for using BookForMe!",
+        "ur": "✅ *Booking confirm ho gayi!*\n\nBooking ID: $booking_id\nDate: $date\nTime: $time\n\nBookForMe use karne ka shukriya!",
+    },
+    "booking_failed": {
+        "en": "Sorry, I couldn't complete the booking for that slot. Please try another time or contact support.",
+        "ur": "Sorry, is slot ki booking nahi ho saki. Koi aur time try karein ya support se rabta karein.",
+    },
+    "payment": {
+        "en": "💳 *Payment Details*\n\nAccount Title: $account_title\nAccount Number: $account_number\nIBAN: $iban\nBank: $bank_name\n\nPlease share a screenshot once you've transferred.",
+        "ur": "💳 *Payment Details*\n\nAccount Title: $account_title\nAccount Number: $account_number\nIBAN: $iban\nBank: $bank_name\n\nTransfer ke baad screenshot share kar dein.",
+    },
+    "pricing": {
+        "en": "💰 *Prices (per hour)*\n\n$blocks\n\nWhich date and time would you like?",
+        "ur": "💰 *Rates (per hour)*\n\n$blocks\n\nKis din aur kis time ke liye chahiye?",
+    },
+    "ask_service": {
+        "en": "Sure! Which sport would you like to book - padel, futsal or cricket?",
+        "ur": "Zaroor! Kaunsa sport book karna hai - padel, futsal ya cricket?",
+    },
+    "ask_date": {
+        "en": "Sure! Which date would you like to play $service? (e.g. today, tomorrow, Friday)",
+        "ur": "Zaroor! $service kis din ke liye chahiye? (aaj, kal, Friday...)",
+    },
+    "ask_service_and_date": {
+        "en": "Sure! Which sport and which date? (e.g. padel tomorrow evening)",
+        "ur": "Zaroor! Kaunsa sport aur kis din? (jaise: padel kal shaam)",
+    },
+    "degraded": {
+        "en": "Sorry, I'm a bit slow right now 🙏 Please send the sport, date and time (e.g. padel tomorrow 7pm) and I'll check availability for you.",
+        "ur": "Sorry, system abhi thora slow hai 🙏 Sport, din aur time bhej dein (jaise: padel kal 7 baje), hum availability check kar dete hain.",
+    },
+})
+
+PRICE_LINE = Template("• $name ($start-$end): Rs $price")
+SLOT_LINE = Template("$index. $time - Rs $price")
+
+
+def detect_language(message: str) -> str:
+    """'ur' for Roman Urdu messages, 'en' otherwise"""
+    return "ur" if ROMAN_URDU_RE.search(message or "") else "en"
+
+
+def display_time(value: str) -> str:
+    """'18:00' -> '6:00 PM' (unparseable values pass through)"""
+    try:
+        return datetime.strptime(str(value), "%H:%M").strftime("%I:%M %p").lstrip("0")
+    except ValueError:
+        return str(value)
+
+
+def display_date(value: str) -> str:
+    """'2026-01-15' -> 'Thu, 15 Jan' (unparseable values pass through)"""
+    try:
+        return datetime.strptime(str(value), "%Y-%m-%d").strftime("%a, %d %b")
+    except ValueError:
+        return str(value)
+
+
+def _format_price(value: Any) -> str:
+    try:
+        return f"{int(float(value)):,}"
+    except (TypeError, ValueError):
+        return str(value)
+
+
+def _mentioned_in_history(pattern: re.Pattern, history: List[Dict[str, Any]]) -> bool:
+    return any(pattern.search(msg.get("content") or "") for msg in history[-6:])
+
+
+class TemplateRenderer:
+    """
+    Picks and renders a template for a turn, or returns None for open-ended chat
+
+    render() is called by NLUAgent.generate_response after the availability
+    lookup and booking write, so the data it formats is the same data the
+    Gemini prompt would have been given.
+    """
+
+    def _render(self, name: str, lang: str, **values) -> str:
+        return TEMPLATES[name][lang].safe_substitute(**values)
+
+    def _slot_lines(self, slots: List[Dict[str, Any]]) -> str:
+        return "\n".join(
+            SLOT_LINE.substitute(
+                index=i,
+                time=display_time(slot.get("time", "N/A")),
+                price=_format_price(slot.get("price", 0))
+            )
+            for i, slot in enumerate(slots[:MAX_LISTED_SLOTS], 1)
+        )
+
+    def _availability(self, availability_data: Dict[str, Any], lang: str) -> str:
+        if not availability_data.get("success"):
+            return self._render("availability_error", lang)
+
+        slots = availability_data.get("available_slots", [])
+        requested_date = availability_data.get("requested_date") or availability_data.get("date", "")
+        if not slots:
+            return self._render("no_availability", lang, date=display_date(requested_date))
+
+        next_date = availability_data.get("next_available_date")
+        if next_date and next_date != requested_date:
+            return self._render(
+                "availability_next_date", lang,
+                requested_date=display_date(requested_date),
+                date=display_date(next_date),
+                slots=self._slot_lines(slots)
+            )
+
+        return self._render(
+            "availability", lang,
+            date=display_date(availability_data.get("date", requested_date)),
+            slots=self._slot_lines(slots)
+        )
+
+    def _pricing(self, pricing: Dict[str, Any], lang: str) -> Optional[str]:
+        blocks = pricing.get("time_blocks") or {}
+        if not blocks:
+            return None
+
+        lines = "\n".join(
+            PRICE_LINE.substitute(
+                name=name.title(),
+                start=display_time(block.get("start", "")),
+                end=display_time(block.get("end", "")),
+                price=_format_price(block.get("price_per_hour", 0))
+            )
+            for name, block in blocks.items()
+        )
+        return self._render("pricing", lang, blocks=lines)
+
+    def _missing_details(
+        self,
+        entities: Dict[str, Any],
+        history: List[Dict[str, Any]],
+        memory: Optional[Dict[str, Any]],
+        lang: str
+    ) -> Optional[str]:
+        # Details given in earlier turns need Gemini to merge them - only template clean gaps
+        if memory is not None:
+            slots = memory.get("slots") or {}
+            has_service = bool(entities.get("service_type") or slots.get("sport"))
+            has_date = bool(entities.get("date") or slots.get("date"))
+            first_turn = not memory.get("turns")
+        else:
+            has_service = bool(entities.get("service_type")) or _mentioned_in_history(SERVICE_RE, history)
+            has_date = bool(entities.get("date")) or _mentioned_in_history(DATE_RE, history)
+            first_turn = not history
+
+        if not has_service and not has_date:
+            return self._render("ask_service_and_date", lang)
+        if not has_service and entities.get("date") and first_turn:
+            return self._render("ask_service", lang)
+        if has_service and not has_date and entities.get("service_type"):
+            return self._render("ask_date", lang, service=str(entities["service_type"]).title())
+        return None
+
+    def render(
+        self,
+        intent: str,
+        entities: Dict[str, Any],
+        context: Dict[str, Any],
+        availability_data: Optional[Dict[str, Any]] = None
+    ) -> Optional[str]:
+        """
+        Render a deterministic reply for this turn
+
+        Args:
+            intent: Detected intent
+            entities: Extracted entities
+            context: generate_response context (booking_result, query_result, history, ...)
+            availability_data: Result of the availability lookup, if one ran
+
+        Returns:
+            Reply text, or None when the turn needs Gemini
+        """
+        lang = detect_language(context.get("current_message", ""))
+        history = context.get("conversation_history") or []
+        name = None
+        reply = None
+
+        if context.get("booking_result"):
+            name = "booking_confirmed"
+            booking = context["booking_result"]
+            details = context.get("booking_details") or {}
+            reply = self._render(
+                name, lang,
+                booking_id=booking.get("booking_id", "N/A"),
+                date=display_date(details.get("date") or entities.get("date", "")),
+                time=display_time(details.get("time") or "")
+            )
+        elif context.get("booking_error"):
+            name = "booking_failed"
+            # Internal errors stay in the logs - the customer gets the fixed reason
+            logger.warning(f"Booking failed reply sent for error: {context['booking_error']}")
+            reply = self._render(name, lang)
+        elif availability_data is not None:
+            name = "availability"
+            reply = self._availability(availability_data, lang)
+        elif intent == "payment_related" and PAYMENT_DETAILS_RE.search(context.get("current_message", "")):
+            payment = (context.get("query_result") or {}).get("payment_details")
+            if not payment:
+                from data.ace_padel_club import PAYMENT_DETAILS
+                payment = PAYMENT_DETAILS
+            name = "payment"
+            reply = self._render(name, lang, **payment)
+        elif intent == "price_inquiry":
+            name = "pricing"
+            reply = self._pricing((context.get("query_result") or {}).get("pricing") or {}, lang)
+        elif intent in ["availability_inquiry", "booking_request"]:
+            name = "missing_details"
+            reply = self._missing_details(entities, history, context.get("memory"), lang)
+
+        if reply:
+            metrics.inc('response_source_total', source='template', template=name)
+            logger.info(f"📄 Template reply: {name} ({lang})")
+        return reply
+
+    def render_fallback(self, context: Dict[str, Any]) -> str:
+        """Degraded-mode reply when Gemini is unavailable and no data template applies"""
+        lang = detect_language(context.get("current_message", ""))
+        metrics.inc('response_source_total', source='template', template='degraded')
+        return self._render("degraded", lang)
+
+
+# Global renderer instance
+template_renderer = TemplateRenderer()
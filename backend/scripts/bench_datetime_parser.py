@@ -0,0 +1,48 @@
+"""
+Date/Time Parser Micro-Benchmark
+Times nlu.datetime_parser.parse_datetime over typical customer messages
+"""
+
+import sys
+import os
+import time
+
+# Add the backend directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nlu.datetime_parser import parse_datetime
+
+MESSAGES = [
+    "Aoa kal shaam 7 baje padel ka slot hai?",
+    "Hi is there a slot available tomorrow Wednesday between 6-9",
+    "agle Friday 8pm 1.5 ghanta",
+    "parson subah 8 baje",
+    "15 December 2026 at 7:30 pm",
+    "after 6",
+    "han ji book kar dein",
+    "What are your prices?",
+]
+
+ITERATIONS = 20000
+
+
+def main():
+    # Warm up
+    for message in MESSAGES:
+        parse_datetime(message)
+
+    print(f"{'message':<62} µs/parse")
+    total = 0.0
+    for message in MESSAGES:
+        start = time.perf_counter()
+        for _ in range(ITERATIONS):
+            parse_datetime(message)
+        elapsed = (time.perf_counter() - start) / ITERATIONS * 1e6
+        total += elapsed
+        print(f"{message[:60]:<62} {elapsed:8.2f}")
+
+    print(f"\nMean: {total / len(MESSAGES):.2f} µs/parse over {ITERATIONS} iterations per message")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Date/Time Parser Accuracy Check
+Runs nlu.datetime_parser over a labelled corpus of Roman Urdu / English phrases
+against a fixed reference date and reports mismatches (exit code 1 if any)
+"""
+
+import sys
+import os
+from datetime import datetime
+
+# Add the backend directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nlu.datetime_parser import parse_datetime
+
+# Monday - relative dates in the corpus resolve against this
+REFERENCE_DATE = datetime(2026, 10, 19)
+
+# (message, expected date, expected time range, expected duration hours)
+CORPUS = [
+    ("kal shaam 7 baje 1.5 ghanta", "2026-10-20", {"start": "19:00", "end": "20:30"}, 1.5),
+    ("aaj 6-9", "2026-10-19", {"start": "18:00", "end": "21:00"}, None),
+    ("11-12", None, {"start": "11:00", "end": "12:00"}, None),
+    ("10-1", None, {"start": "10:00", "end": "13:00"}, None),
+    ("today from 8-9:30", "2026-10-19", {"start": "20:00", "end": "21:30"}, None),
+    ("7:30-9", None, {"start": "19:30", "end": "21:00"}, None),
+    ("18:00-19:30", None, {"start": "18:00", "end": "19:30"}, None),
+    ("9am-11", None, {"start": "09:00", "end": "11:00"}, None),
+    ("8-930", None, None, None),
+    ("5 to 7 pm", None, {"start": "17:00", "end": "19:00"}, None),
+    ("6 baje se 8 baje tak", None, {"start": "18:00", "end": "20:00"}, None),
+    ("agle Friday", "2026-10-30", None, None),
+    ("Friday 8pm", "2026-10-23", {"start": "20:00", "end": "21:00"}, None),
+    ("jumma ko 9 baje", "2026-10-23", {"start": "21:00", "end": "22:00"}, None),
+    ("is Saturday raat 10 baje", "2026-10-24", {"start": "22:00", "end": "23:00"}, None),
+    ("next monday morning", "2026-10-26", {"start": "09:00", "end": "12:00"}, None),
+    ("after 6", None, {"start": "18:00"}, None),
+    ("around 8", None, {"start": "20:00", "end": "21:00"}, None),
+    ("dedh ghanta", None, None, 1.5),
+    ("aadha ghanta", None, None, 0.5),
+    ("2 ghante", None, None, 2.0),
+    ("90 mins", None, None, 1.5),
+    ("25/10", "2026-10-25", None, None),
+    ("15 December 2026", "2026-12-15", None, None),
+    ("December 24, 2026", "2026-12-24", None, None),
+    ("2026-11-02", "2026-11-02", None, None),
+    ("today", "2026-10-19", None, None),
+    ("tonight", "2026-10-19", {"start": "18:00", "end": "23:00"}, None),
+    ("shaam", None, {"start": "18:00", "end": "23:00"}, None),
+    ("saat baje", None, {"start": "19:00", "end": "20:00"}, None),
+    ("12 am", None, {"start": "00:00", "end": "01:00"}, None),
+    ("raat 12 baje", None, {"start": "00:00", "end": "01:00"}, None),
+    ("kal raat 12 baje", "2026-10-20", {"start": "00:00", "end": "01:00"}, None),
+    ("dopahar 12 baje", None, {"start": "12:00", "end": "13:00"}, None),
+    ("parson subah 8 baje", "2026-10-21", {"start": "08:00", "end": "09:00"}, None),
+    ("tomorrow 7:30 pm", "2026-10-20", {"start": "19:30", "end": "20:30"}, None),
+    ("kal dopahar 2 baje", "2026-10-20", {"start": "14:00", "end": "15:00"}, None),
+    ("kal slot hai?", "2026-10-20", None, None),
+]
+
+
+def main():
+    failures = 0
+    for text, date, time_range, duration in CORPUS:
+        result = parse_datetime(text, REFERENCE_DATE)
+        got = (result["date"], result["time_range"], result["duration_hours"])
+        expected = (date, time_range, duration)
+        if got == expected:
+            print(f"  ✅ {text}")
+        else:
+            failures += 1
+            print(f"  ❌ {text}\n     expected {expected}\n     got      {got}")
+
+    passed = len(CORPUS) - failures
+    print(f"\nAccuracy: {passed}/{len(CORPUS)} ({passed / len(CORPUS) * 100:.1f}%)")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
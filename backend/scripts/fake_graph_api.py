@@ -0,0 +1,82 @@
+"""
+Fake WhatsApp Graph API
+Local stand-in for graph.facebook.com so outbound sends can be exercised
+without a Meta account: accepts POST /{version}/{phone_number_id}/messages,
+answers like the Cloud API and records what was sent. Latency, throttling
+(429 + Retry-After) and server errors can be injected to test the retries.
+
+Usage:
+    python scripts/fake_graph_api.py --port 8090 --latency-ms 150 --throttle-every 5
+    WHATSAPP_API_BASE_URL=http://localhost:8090/v22.0 uvicorn app.main:app
+
+    curl localhost:8090/sent      # messages received so far
+"""
+
+import argparse
+import asyncio
+import itertools
+import time
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+app = FastAPI(title="Fake Graph API")
+
+config = {"latency_ms": 0, "throttle_every": 0, "fail_every": 0}
+counter = itertools.count(1)
+sent = []
+
+
+@app.post("/{version}/{phone_number_id}/messages")
+async def send_message(version: str, phone_number_id: str, request: Request):
+    n = next(counter)
+    if config["latency_ms"]:
+        await asyncio.sleep(config["latency_ms"] / 1000)
+
+    if not request.headers.get("authorization", "").startswith("Bearer "):
+        return JSONResponse(status_code=401, content={"error": {"message": "Missing access token", "code": 190}})
+    if config["throttle_every"] and n % config["throttle_every"] == 0:
+        return JSONResponse(
+            status_code=429,
+            headers={"Retry-After": "1"},
+            content={"error": {"message": "Too many messages", "code": 130429}}
+        )
+    if config["fail_every"] and n % config["fail_every"] == 0:
+        return JSONResponse(status_code=503, content={"error": {"message": "Service unavailable", "code": 2}})
+
+    body = await request.json()
+    message_id = f"wamid.FAKE{n:08d}"
+    sent.append({"id": message_id, "phone_number_id": phone_number_id, "received_at": time.time(), **body})
+    return {
+        "messaging_product": "whatsapp",
+        "contacts": [{"input": body.get("to"), "wa_id": body.get("to")}],
+        "messages": [{"id": message_id}]
+    }
+
+
+@app.get("/sent")
+async def list_sent():
+    return {"count": len(sent), "messages": sent}
+
+
+@app.delete("/sent")
+async def clear_sent():
+    sent.clear()
+    return {"count": 0}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake WhatsApp Graph API server")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency-ms", type=int, default=0, help="Delay added to every send")
+    parser.add_argument("--throttle-every", type=int, default=0, help="Answer every Nth send with 429")
+    parser.add_argument("--fail-every", type=int, default=0, help="Answer every Nth send with 503")
+    args = parser.parse_args()
+
+    config.update(latency_ms=args.latency_ms, throttle_every=args.throttle_every, fail_every=args.fail_every)
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
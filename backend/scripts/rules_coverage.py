@@ -0,0 +1,83 @@
+"""
+Rule Classifier Coverage Report
+Runs the tier-1 rule classifier over the customer messages in
+conversations/examples and reports how many would skip Gemini
+"""
+
+import sys
+import os
+import re
+from collections import Counter
+
+# Add the backend directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import settings
+from nlu.rules import RuleBasedClassifier
+
+EXAMPLES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'conversations', 'examples')
+
+# 4:57 PM - "Hi is there a slot available tomorrow Wednesday between 6-9"
+MESSAGE_LINE = re.compile(r'^\s*\d{1,2}:\d{2}\s*[AP]M\s*-\s*"(?P<text>[^"]+)"')
+# Customer: "Koi slot hei?"
+PATTERN_LINE = re.compile(r'^Customer:\s*"(?P<text>[^"]+)"')
+
+
+def load_turns(path: str):
+    """(role, text) pairs from an example conversation file"""
+    role = None
+    turns = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.startswith('CUSTOMER'):
+                role = 'user'
+            elif line.startswith('AGENT'):
+                role = 'assistant'
+            elif line.startswith('KEY LEARNINGS'):
+                break
+            elif PATTERN_LINE.match(line):
+                turns.append(('user', PATTERN_LINE.match(line).group('text')))
+            else:
+                match = MESSAGE_LINE.match(line)
+                if match and role:
+                    turns.append((role, match.group('text')))
+    return turns
+
+
+def main():
+    classifier = RuleBasedClassifier()
+    threshold = settings.NLU_RULES_CONFIDENCE_THRESHOLD
+    
+    intents = Counter()
+    misses = []
+    total = 0
+    
+    for name in sorted(os.listdir(EXAMPLES_DIR)):
+        last_assistant = None
+        for role, text in load_turns(os.path.join(EXAMPLES_DIR, name)):
+            if role == 'assistant':
+                last_assistant = text
+                continue
+            
+            total += 1
+            result = classifier.classify(text, last_assistant)
+            if result and result['confidence'] >= threshold:
+                classifier.record_accepted(result)
+                intents[result['intent']] += 1
+                print(f"  ✅ {result['intent']:<22} {result['confidence']:.2f}  {text}")
+            else:
+                misses.append(text)
+    
+    print(f"\n❌ Sent to Gemini ({len(misses)}):")
+    for text in misses:
+        print(f"  - {text}")
+    
+    coverage = classifier.coverage()
+    print(f"\nCoverage: {coverage['accepted']}/{total} customer messages "
+          f"({coverage['accepted'] / total * 100 if total else 0:.1f}%) at threshold {threshold}")
+    for intent, count in intents.most_common():
+        print(f"  {intent:<22} {count}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Train / Evaluate the Local Intent Model
+Trains nlu/local_classifier.py from labelled JSONL turns ({"text", "intent"[, "context"]}
+per line - the seed set in nlu/data/ and/or logs exported via NLU_TRAINING_LOG_PATH),
+saves the model JSON and prints an accuracy report on the holdout set.
+
+Usage:
+    python scripts/train_intent_model.py
+    python scripts/train_intent_model.py --data nlu/data/intent_train.jsonl --data exported_turns.jsonl
+    python scripts/train_intent_model.py --eval-only --min-accuracy 0.85
+"""
+
+import argparse
+import sys
+import os
+import time
+
+# Add the backend directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import settings
+from nlu.local_classifier import LocalIntentClassifier, load_examples, resolve_path
+
+DEFAULT_TRAIN = "nlu/data/intent_train.jsonl"
+DEFAULT_HOLDOUT = "nlu/data/intent_holdout.jsonl"
+
+
+def print_report(report):
+    print(f"\nHoldout accuracy: {report['accuracy'] * 100:.1f}% ({report['total']} examples)")
+    print(f"At threshold {report['threshold']}: coverage {report['coverage'] * 100:.1f}%, "
+          f"precision {report['precision_at_threshold'] * 100:.1f}%")
+    print(f"\n  {'intent':<22} {'precision':>9} {'recall':>7} {'n':>4}")
+    for intent, row in report['per_intent'].items():
+        print(f"  {intent:<22} {row['precision']:>9.2f} {row['recall']:>7.2f} {row['support']:>4}")
+    if report['errors']:
+        print(f"\n❌ Misclassified ({len(report['errors'])}):")
+        for error in report['errors']:
+            print(f"  - {error['text']!r}: expected {error['expected']}, got {error['predicted']} ({error['confidence']})")
+
+
+def time_classify(classifier, examples, rounds: int = 200) -> float:
+    """Mean µs per predict() over the examples"""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for ex in examples:
+            classifier.predict(ex['text'], ex.get('context'))
+    return (time.perf_counter() - start) / (rounds * len(examples)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the local intent classifier")
+    parser.add_argument("--data", action="append", help=f"Training JSONL (repeatable, default {DEFAULT_TRAIN})")
+    parser.add_argument("--holdout", default=DEFAULT_HOLDOUT, help="Labelled holdout JSONL for the report")
+    parser.add_argument("--out", default=settings.NLU_LOCAL_MODEL_PATH, help="Model output path")
+    parser.add_argument("--epochs", type=int, default=30)
+    parser.add_argument("--eval-only", action="store_true", help="Evaluate the saved model without retraining")
+    parser.add_argument("--min-accuracy", type=float, default=0.0, help="Exit 1 if holdout accuracy is below this")
+    args = parser.parse_args()
+
+    if args.eval_only:
+        classifier = LocalIntentClassifier.load(args.out)
+        if not classifier.loaded:
+            print(f"❌ No model at {resolve_path(args.out)}")
+            sys.exit(1)
+    else:
+        examples = []
+        for path in args.data or [DEFAULT_TRAIN]:
+            loaded = load_examples(path)
+            print(f"📥 {len(loaded)} examples from {path}")
+            examples.extend(loaded)
+
+        classifier = LocalIntentClassifier()
+        start = time.perf_counter()
+        classifier.train(examples, epochs=args.epochs)
+        print(f"🏋️  Trained on {len(examples)} examples in {time.perf_counter() - start:.1f}s "
+              f"({len(classifier.weights)} features)")
+
+    holdout = load_examples(args.holdout)
+    report = classifier.evaluate(holdout)
+    print_report(report)
+    print(f"\n⏱️  {time_classify(classifier, holdout):.1f} µs per classification")
+
+    if not args.eval_only:
+        os.makedirs(os.path.dirname(resolve_path(args.out)), exist_ok=True)
+        classifier.meta['holdout_accuracy'] = round(report['accuracy'], 4)
+        classifier.save(args.out)
+        print(f"💾 Saved model to {resolve_path(args.out)} ({os.path.getsize(resolve_path(args.out)) // 1024} KB)")
+
+    if report['accuracy'] < args.min_accuracy:
+        print(f"\n❌ Holdout accuracy {report['accuracy']:.3f} below required {args.min_accuracy}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
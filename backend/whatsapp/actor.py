@@ -0,0 +1,183 @@
+"""
+Conversation Actors - Per-phone serial processing with burst coalescing
+Customers type in bursts ("Salam" / "padel" / "kal shaam" a second apart).
+Each phone number gets a mailbox drained by a single task, so its messages are
+handled strictly in order and never race on the same session. Messages that
+arrive within the debounce window of each other are joined into one agent
+turn, which means one pipeline run and one reply per burst.
+
+Posting a message never waits for its turn, so whoever feeds the actors (the
+inbound queue workers) is free again immediately; a semaphore caps how many
+turns run at once across all phones instead.
+"""
+
+import asyncio
+import time
+import logging
+from typing import Dict, Any, List, Tuple, Callable, Awaitable, Optional
+
+from app.config import settings
+from app.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+TurnHandler = Callable[[str, str], Awaitable[Dict[str, Any]]]
+
+
+class _Mailbox:
+    """Pending messages for one phone number and the task draining them"""
+
+    __slots__ = ("pending", "first_at", "last_at", "task")
+
+    def __init__(self):
+        self.pending: List[Tuple[str, asyncio.Future, float]] = []
+        self.first_at = 0.0
+        self.last_at = 0.0
+        self.task: Optional[asyncio.Task] = None
+
+
+class ConversationActors:
+    """
+    One actor per active phone number in front of the agent
+
+    post() drops a message in the mailbox and returns a future; submit() awaits
+    it. The future resolves once the message has been handled: the last message
+    of a burst gets the handler's result, earlier ones {'success': True, 'coalesced': True}.
+    Actors exist only while messages are pending or being processed.
+    """
+
+    def __init__(
+        self,
+        handler: TurnHandler,
+        debounce_seconds: float = None,
+        max_wait_seconds: float = None,
+        concurrency: int = None
+    ):
+        """
+        Args:
+            handler: Coroutine (phone_number, text) -> result dict for one turn
+            debounce_seconds: Quiet period after the latest message before a turn starts
+            max_wait_seconds: Upper bound on the wait since the first message of a burst
+            concurrency: Turns (handler calls) allowed to run at once across all phones
+        """
+        self.handler = handler
+        self.debounce_seconds = settings.WHATSAPP_DEBOUNCE_SECONDS if debounce_seconds is None else debounce_seconds
+        self.max_wait_seconds = settings.WHATSAPP_DEBOUNCE_MAX_SECONDS if max_wait_seconds is None else max_wait_seconds
+        self.concurrency = concurrency or settings.WHATSAPP_TURN_CONCURRENCY
+        self._turn_slots = asyncio.Semaphore(self.concurrency)
+        self._running = 0
+        self._mailboxes: Dict[str, _Mailbox] = {}
+
+    def post(self, phone_number: str, text: str, enqueued_at: float = None) -> asyncio.Future:
+        """
+        Queue a message for its phone's actor without waiting for its turn
+
+        Args:
+            phone_number: Customer's phone number
+            text: Message text
+            enqueued_at: time.monotonic() when the message was accepted (defaults to now);
+                whatsapp_queue_wait_seconds runs from here to the start of its turn
+
+        Returns:
+            Future with the outcome (see submit)
+        """
+        future = asyncio.get_running_loop().create_future()
+        mailbox = self._mailboxes.get(phone_number)
+        if mailbox is None:
+            mailbox = self._mailboxes[phone_number] = _Mailbox()
+
+        now = time.monotonic()
+        if not mailbox.pending:
+            mailbox.first_at = now
+        mailbox.last_at = now
+        mailbox.pending.append((text, future, now if enqueued_at is None else enqueued_at))
+
+        if mailbox.task is None:
+            mailbox.task = asyncio.create_task(self._run(phone_number, mailbox))
+            metrics.set_gauge('whatsapp_active_conversations', len(self._mailboxes))
+        return future
+
+    async def submit(self, phone_number: str, text: str) -> Dict[str, Any]:
+        """
+        Queue a message for its phone's actor and wait for the outcome
+
+        Args:
+            phone_number: Customer's phone number
+            text: Message text
+
+        Returns:
+            The turn handler's result, or {'success': True, 'coalesced': True}
+            when the message was folded into a later one's turn
+        """
+        return await self.post(phone_number, text)
+
+    async def _wait_for_quiet(self, mailbox: _Mailbox):
+        """Sleep until no message arrived for debounce_seconds (capped at max_wait_seconds)"""
+        while True:
+            deadline = min(mailbox.last_at + self.debounce_seconds, mailbox.first_at + self.max_wait_seconds)
+            delay = deadline - time.monotonic()
+            if delay <= 0:
+                return
+            await asyncio.sleep(delay)
+
+    async def _run(self, phone_number: str, mailbox: _Mailbox):
+        batch: List[Tuple[str, asyncio.Future, float]] = []
+        try:
+            while mailbox.pending:
+                await self._wait_for_quiet(mailbox)
+                # Messages arriving while we wait for a free slot join this turn too
+                async with self._turn_slots:
+                    batch, mailbox.pending = mailbox.pending, []
+                    started = time.monotonic()
+                    for _, _, enqueued_at in batch:
+                        metrics.observe('whatsapp_queue_wait_seconds', started - enqueued_at)
+
+                    if len(batch) > 1:
+                        metrics.inc('whatsapp_messages_coalesced_total', len(batch) - 1)
+                        logger.info(f"Coalesced {len(batch)} messages from {phone_number} into one turn")
+                    metrics.inc('whatsapp_actor_turns_total')
+
+                    self._running += 1
+                    metrics.set_gauge('whatsapp_turns_running', self._running)
+                    try:
+                        result = await self.handler(phone_number, "\n".join(text for text, _, _ in batch))
+                    except Exception as e:
+                        logger.error(f"Turn for {phone_number} failed: {e}")
+                        result = {'success': False, 'error': str(e)}
+                    finally:
+                        self._running -= 1
+                        metrics.set_gauge('whatsapp_turns_running', self._running)
+
+                for _, future, _ in batch[:-1]:
+                    if not future.done():
+                        future.set_result({'success': True, 'coalesced': True})
+                if not batch[-1][1].done():
+                    batch[-1][1].set_result(result)
+        finally:
+            # Single-threaded loop: nothing can be appended between the check and the removal
+            for _, future, _ in batch + mailbox.pending:
+                if not future.done():
+                    future.set_result({'success': False, 'error': 'Conversation actor stopped'})
+            self._mailboxes.pop(phone_number, None)
+            metrics.set_gauge('whatsapp_active_conversations', len(self._mailboxes))
+
+    async def drain(self, timeout: float):
+        """Let pending bursts and running turns finish for up to timeout seconds, then stop the actors"""
+        deadline = time.monotonic() + timeout
+        while self._mailboxes and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        tasks = [m.task for m in self._mailboxes.values() if m.task is not None]
+        if tasks:
+            logger.warning(f"Stopping {len(tasks)} conversation actors with unfinished turns")
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'active_conversations': len(self._mailboxes),
+            'pending_messages': sum(len(m.pending) for m in self._mailboxes.values()),
+            'running_turns': self._running,
+            'turn_concurrency': self.concurrency,
+            'debounce_seconds': self.debounce_seconds
+        }
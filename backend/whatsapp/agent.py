@@ -51,16 +51,18 @@ class WhatsAppAgent:
                     "content": msg.get('content', '')
                 })
             
-            # Process message through LangGraph agent
-            response = await self.booking_agent.process(
+            # Process message through LangGraph agent - prompts carry the memory, not the transcript
+            result = await self.booking_agent.process_turn(
                 user_phone=phone_number,
                 message=message,
-                conversation_history=conversation_history
+                conversation_history=conversation_history,
+                # Sessions from before memory existed use their history for one turn
+                memory=session.get('memory')
             )
+            response = result["response"]
             
-            # Update conversation state in Firestore
-            await self.state_manager.add_message_to_history(phone_number, 'user', message)
-            await self.state_manager.add_message_to_history(phone_number, 'assistant', response)
+            # Update conversation state in Firestore - both messages and the memory in one write
+            await self.state_manager.append_turn(phone_number, message, response, history, memory=result["memory"])
             
             logger.info(f"Generated response: {response[:100]}...")
             return response
@@ -0,0 +1,150 @@
+"""
+Inbound De-duplication - Drop redelivered WhatsApp messages by message ID
+Meta delivers webhooks at least once; a redelivery would otherwise run the
+whole agent turn again (Gemini calls, maybe a second booking attempt) and send
+a second reply. The webhook claims each message id before enqueueing it and
+acknowledges ids that were already claimed without doing any work.
+
+SeenStore is the interface; MemorySeenStore is a bounded TTL set for a single
+process and FirestoreSeenStore shares claims between workers (with the memory
+store in front, so repeat redeliveries to the same worker cost nothing).
+Claims are async: the Firestore calls run in the default executor so the
+webhook never blocks the event loop on a round trip.
+"""
+
+import asyncio
+import threading
+import time
+import logging
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any
+
+from google.api_core.exceptions import AlreadyExists
+
+from app.config import settings
+from app.metrics import metrics
+from database.schema import Collections
+
+logger = logging.getLogger(__name__)
+
+
+class SeenStore:
+    """Interface for the webhook's message-id claims"""
+
+    async def claim(self, message_id: str) -> bool:
+        """Record message_id as seen; False when it already was (a duplicate)"""
+        raise NotImplementedError
+
+    async def release(self, message_id: str):
+        """Forget a claim whose message was not processed, so Meta's redelivery is accepted"""
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+
+class MemorySeenStore(SeenStore):
+    """Insertion-ordered id -> claim time, trimmed by TTL and size"""
+
+    def __init__(self, ttl_seconds: float = None, max_entries: int = None):
+        self.ttl_seconds = ttl_seconds or settings.WHATSAPP_DEDUP_TTL_SECONDS
+        self.max_entries = max_entries or settings.WHATSAPP_DEDUP_MAX_ENTRIES
+        self._seen: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _expire(self, now: float):
+        # Oldest first - stop at the first live entry
+        while self._seen:
+            message_id, claimed_at = next(iter(self._seen.items()))
+            if now - claimed_at < self.ttl_seconds and len(self._seen) < self.max_entries:
+                break
+            self._seen.popitem(last=False)
+
+    def claim_local(self, message_id: str) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            if message_id in self._seen:
+                return False
+            self._seen[message_id] = now
+            return True
+
+    def release_local(self, message_id: str):
+        with self._lock:
+            self._seen.pop(message_id, None)
+
+    async def claim(self, message_id: str) -> bool:
+        return self.claim_local(message_id)
+
+    async def release(self, message_id: str):
+        self.release_local(message_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {'backend': 'memory', 'entries': len(self._seen)}
+
+
+class FirestoreSeenStore(SeenStore):
+    """
+    Claims as documents in processed_messages/{message_id}
+
+    create() fails if the document exists, so exactly one worker wins each id.
+    Documents carry expires_at for a Firestore TTL policy to clean them up.
+    """
+
+    def __init__(self, db_client, local: MemorySeenStore = None):
+        self.db = db_client
+        self.local = local or MemorySeenStore()
+
+    def _create(self, message_id: str):
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=self.local.ttl_seconds)
+        self.db.collection(Collections.PROCESSED_MESSAGES).document(message_id).create({
+            'expires_at': expires_at
+        })
+
+    def _delete(self, message_id: str):
+        self.db.collection(Collections.PROCESSED_MESSAGES).document(message_id).delete()
+
+    async def claim(self, message_id: str) -> bool:
+        if not self.local.claim_local(message_id):
+            return False
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, self._create, message_id)
+            return True
+        except AlreadyExists:
+            # Another worker took it - keep the local claim so the next redelivery stays free
+            return False
+        except Exception as e:
+            # Fail open: a rare duplicate reply beats dropping a customer's message
+            logger.warning(f"Shared dedup check failed for {message_id}: {e}")
+            return True
+
+    async def release(self, message_id: str):
+        self.local.release_local(message_id)
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, self._delete, message_id)
+        except Exception as e:
+            logger.warning(f"Could not release dedup claim {message_id}: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.local.stats(), 'backend': 'firestore'}
+
+
+def create_seen_store() -> SeenStore:
+    """The store selected by WHATSAPP_DEDUP_BACKEND ("memory" or "firestore")"""
+    if settings.WHATSAPP_DEDUP_BACKEND == "firestore":
+        from app.firestore import firestore_db
+        if firestore_db.db is not None:
+            return FirestoreSeenStore(firestore_db.db)
+        logger.warning("Firestore unavailable - falling back to in-memory message de-duplication")
+    return MemorySeenStore()
+
+
+async def is_duplicate(store: SeenStore, message_id: str) -> bool:
+    """Claim a message id, counting duplicates (messages without an id are never duplicates)"""
+    if not message_id:
+        return False
+    if await store.claim(message_id):
+        return False
+    metrics.inc('whatsapp_duplicates_total')
+    return True
@@ -0,0 +1,132 @@
+"""
+Graph API Client - Shared, pooled async HTTP client for the WhatsApp Cloud API
+One httpx.AsyncClient per process, opened on startup and closed on shutdown, so
+outbound sends reuse keep-alive connections instead of paying a TLS handshake
+each time and never block the event loop. 429 and 5xx responses and connection
+failures are retried with exponential backoff (Retry-After is honoured).
+
+Point WHATSAPP_API_BASE_URL at scripts/fake_graph_api.py to exercise sends locally.
+"""
+
+import asyncio
+import random
+import time
+import logging
+from typing import Dict, Any, Optional
+
+import httpx
+
+from app.config import settings
+from app.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Only failures where the request cannot have reached Meta - a read timeout may
+# already have delivered the message, and retrying it would send it twice
+RETRY_EXCEPTIONS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout, httpx.RemoteProtocolError)
+
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_MAX_SECONDS = 8.0
+
+
+class GraphAPIClient:
+    """Connection-pooled Graph API client with retries"""
+
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _http2_available(self) -> bool:
+        if not settings.WHATSAPP_HTTP2:
+            return False
+        try:
+            import h2  # noqa: F401 - httpx needs it for HTTP/2
+            return True
+        except ImportError:
+            logger.warning("WHATSAPP_HTTP2 is set but the h2 package is not installed - using HTTP/1.1")
+            return False
+
+    async def start(self):
+        """Open the shared client (idempotent)"""
+        if self._client is not None:
+            return
+        self._client = httpx.AsyncClient(
+            base_url=settings.WHATSAPP_API_BASE_URL,
+            headers={"Authorization": f"Bearer {settings.WHATSAPP_ACCESS_TOKEN}"},
+            timeout=httpx.Timeout(settings.WHATSAPP_HTTP_TIMEOUT_SECONDS, connect=5.0),
+            limits=httpx.Limits(
+                max_connections=settings.WHATSAPP_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.WHATSAPP_HTTP_MAX_CONNECTIONS
+            ),
+            http2=self._http2_available()
+        )
+        logger.info(f"Graph API client started ({settings.WHATSAPP_API_BASE_URL})")
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @staticmethod
+    def _backoff(attempt: int, response: Optional[httpx.Response]) -> float:
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after:
+            try:
+                return min(float(retry_after), BACKOFF_MAX_SECONDS)
+            except ValueError:
+                pass
+        # Full jitter so a burst of throttled sends doesn't retry in lockstep
+        return random.uniform(0, min(BACKOFF_BASE_SECONDS * 2 ** attempt, BACKOFF_MAX_SECONDS))
+
+    async def post(self, path: str, payload: Dict[str, Any], retry_throttled: bool = True) -> httpx.Response:
+        """
+        POST JSON to the Graph API, retrying throttling, server errors and failed connects
+
+        Args:
+            path: Path relative to WHATSAPP_API_BASE_URL, e.g. "/{phone_number_id}/messages"
+            payload: JSON body
+            retry_throttled: False returns 429s straight away (the outbound scheduler
+                pauses the whole number instead of retrying one request)
+
+        Returns:
+            The final response (possibly a non-2xx one once retries are exhausted)
+
+        Raises:
+            httpx.HTTPError: When the last attempt failed without a response
+        """
+        if self._client is None:
+            # Scripts and tests that never ran the app's startup hook
+            await self.start()
+
+        attempts = settings.WHATSAPP_HTTP_MAX_RETRIES + 1
+        for attempt in range(attempts):
+            response = None
+            start = time.monotonic()
+            try:
+                response = await self._client.post(path, json=payload)
+            except RETRY_EXCEPTIONS as e:
+                metrics.inc('graph_api_requests_total', outcome=type(e).__name__)
+                if attempt == attempts - 1:
+                    raise
+                logger.warning(f"Graph API {path} failed ({e!r}) - retrying")
+            else:
+                metrics.observe('graph_api_request_seconds', time.monotonic() - start)
+                metrics.inc('graph_api_requests_total', outcome=str(response.status_code))
+                retryable = response.status_code in RETRY_STATUSES and (retry_throttled or response.status_code != 429)
+                if not retryable or attempt == attempts - 1:
+                    return response
+                logger.warning(f"Graph API {path} returned {response.status_code} - retrying")
+
+            metrics.inc('graph_api_retries_total')
+            await asyncio.sleep(self._backoff(attempt, response))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'open': self._client is not None,
+            'base_url': settings.WHATSAPP_API_BASE_URL,
+            'http2': self._client is not None and self._http2_available()
+        }
+
+
+# Global Graph API client - one connection pool for all outbound sends
+graph_client = GraphAPIClient()
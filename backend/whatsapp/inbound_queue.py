@@ -0,0 +1,143 @@
+"""
+Inbound Queue - Acknowledge webhooks fast, process turns in the background
+The webhook validates the payload, enqueues the message and returns 200 in
+milliseconds; a bounded pool of workers takes messages off the queue and
+drops them in the per-phone actors' mailboxes, which run the agent and send the
+reply on their own tasks.
+Meta redelivers slow webhooks, so nothing slow may sit on the request path.
+Capacity counts every accepted message until its turn is done - queued, in a
+mailbox or waiting for a turn slot - not just the ones waiting for a worker.
+
+InboundQueue is the interface the webhook depends on; InProcessQueue is the
+asyncio implementation. A durable queue (Pub/Sub, Cloud Tasks) can replace
+it without touching the webhook.
+"""
+
+import asyncio
+import time
+import logging
+from typing import Dict, Any, List, Callable, Awaitable, Optional
+
+from app.config import settings
+from app.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# handler(message) where message is {'phone_number', 'text', 'enqueued_at', ...}; it may
+# return a future for the rest of the message's processing, which holds capacity until done
+MessageHandler = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+
+class InboundQueue:
+    """Interface for the webhook's processing backend"""
+
+    def start(self, handler: MessageHandler):
+        """Begin delivering messages to handler (call once the event loop is running)"""
+        raise NotImplementedError
+
+    def enqueue(self, message: Dict[str, Any]) -> bool:
+        """Accept a message without waiting for it to be processed; False when full or stopping"""
+        raise NotImplementedError
+
+    async def drain(self, timeout: float):
+        """Stop accepting messages and finish the accepted ones, giving up after timeout seconds"""
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+
+class InProcessQueue(InboundQueue):
+    """
+    asyncio.Queue drained by a fixed pool of worker tasks, bounded on pending messages
+
+    Messages are lost if the process dies before they are handled - the trade
+    for acknowledging instantly without a broker. Workers dequeue in arrival
+    order and post to the actors without yielding in between, so per-phone
+    order is preserved. A message stays pending until the future its handler
+    returns resolves, so work handed on to the actors still counts against max_size.
+    """
+
+    def __init__(self, max_size: int = None, workers: int = None):
+        self.max_size = max_size or settings.WHATSAPP_QUEUE_SIZE
+        self.worker_count = workers or settings.WHATSAPP_WORKERS
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._handler: Optional[MessageHandler] = None
+        self._accepting = False
+        self._busy = 0
+        self._pending = 0
+
+    def start(self, handler: MessageHandler):
+        if self._workers:
+            return
+        self._handler = handler
+        self._queue = asyncio.Queue()
+        self._workers = [asyncio.create_task(self._worker(i)) for i in range(self.worker_count)]
+        self._accepting = True
+        logger.info(f"Inbound queue started ({self.worker_count} workers, capacity {self.max_size})")
+
+    def enqueue(self, message: Dict[str, Any]) -> bool:
+        if not self._accepting:
+            metrics.inc('whatsapp_queue_rejected_total', reason='stopped')
+            return False
+        if self._pending >= self.max_size:
+            metrics.inc('whatsapp_queue_rejected_total', reason='full')
+            logger.warning(f"Inbound queue full ({self.max_size} messages pending) - rejecting message")
+            return False
+        self._queue.put_nowait({**message, 'enqueued_at': time.monotonic()})
+        self._pending += 1
+        metrics.set_gauge('whatsapp_queue_depth', self._pending)
+        return True
+
+    def _release(self, _=None):
+        """One accepted message fully handled - its capacity is free again"""
+        self._pending -= 1
+        metrics.set_gauge('whatsapp_queue_depth', self._pending)
+
+    async def _worker(self, index: int):
+        while True:
+            message = await self._queue.get()
+            self._busy += 1
+            metrics.set_gauge('whatsapp_workers_busy', self._busy)
+            start = time.monotonic()
+            outcome = None
+            try:
+                outcome = await self._handler(message)
+            except Exception as e:
+                logger.error(f"Inbound worker {index} failed on message from {message.get('phone_number')}: {e}")
+                metrics.inc('whatsapp_queue_failures_total')
+            finally:
+                if isinstance(outcome, asyncio.Future):
+                    outcome.add_done_callback(self._release)
+                else:
+                    self._release()
+                metrics.observe('whatsapp_queue_processing_seconds', time.monotonic() - start)
+                self._busy -= 1
+                metrics.set_gauge('whatsapp_workers_busy', self._busy)
+                self._queue.task_done()
+
+    async def drain(self, timeout: float):
+        if not self._workers:
+            return
+        self._accepting = False
+        pending = self._queue.qsize() + self._busy
+        logger.info(f"Draining inbound queue ({pending} messages in flight, up to {timeout}s)")
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Inbound queue drain timed out with {self._queue.qsize() + self._busy} messages unfinished")
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'depth': self._pending,
+            'waiting_for_worker': self._queue.qsize() if self._queue else 0,
+            'capacity': self.max_size,
+            'workers': self.worker_count,
+            'busy_workers': self._busy,
+            'accepting': self._accepting
+        }
@@ -0,0 +1,271 @@
+"""
+Outbound Scheduler - Rate-limited, prioritized WhatsApp sends
+Meta caps throughput per business phone number and answers 429 beyond it.
+Every send goes through here instead of straight to the Graph API:
+
+- a token bucket per phone_number_id paces sends; a 429 pauses that number's
+  bucket for Retry-After and the message is put back at the head of its lane
+- priority lanes: conversational replies, then transactional messages
+  (booking confirmations), then bulk (reminders, promos). Bulk never holds
+  more than a share of the senders and always yields tokens to waiting replies
+- per-recipient ordering: one send in flight per recipient, lanes are FIFO
+"""
+
+import asyncio
+import time
+import logging
+from collections import deque
+from typing import Dict, Any, Deque, List, Optional, Set
+
+import httpx
+
+from app.config import settings
+from app.metrics import metrics
+from whatsapp.http_client import graph_client
+
+logger = logging.getLogger(__name__)
+
+# Lanes, highest priority first
+PRIORITY_REPLY = 0
+PRIORITY_TRANSACTIONAL = 1
+PRIORITY_BULK = 2
+LANE_NAMES = {PRIORITY_REPLY: "reply", PRIORITY_TRANSACTIONAL: "transactional", PRIORITY_BULK: "bulk"}
+
+DEFAULT_RETRY_AFTER_SECONDS = 1.0
+
+
+class TokenBucket:
+    """
+    Async token bucket for one business phone number
+
+    Waiters are served by priority: a bulk send never takes a token while a
+    reply is waiting for one.
+    """
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.waiting = {priority: 0 for priority in LANE_NAMES}
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def pause(self, seconds: float):
+        """Stop handing out tokens for a while (Meta answered 429)"""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+
+    async def acquire(self, priority: int):
+        self.waiting[priority] += 1
+        try:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                outranked = any(self.waiting[p] for p in self.waiting if p < priority)
+                if self.tokens >= 1 and not outranked:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep(max((1 - self.tokens) / self.rate, 0.005))
+        finally:
+            self.waiting[priority] -= 1
+
+
+class OutboundScheduler:
+    """Priority lanes feeding a pool of sender tasks, paced by per-number token buckets"""
+
+    def __init__(self, concurrency: int = None, rate: float = None, burst: float = None, bulk_share: float = None):
+        self.concurrency = concurrency or settings.WHATSAPP_SEND_CONCURRENCY
+        self.rate = rate or settings.WHATSAPP_SEND_RATE_PER_SECOND
+        self.burst = burst or settings.WHATSAPP_SEND_BURST
+        share = settings.WHATSAPP_SEND_BULK_SHARE if bulk_share is None else bulk_share
+        # Senders bulk may occupy at once - the rest stay free for live replies
+        self.bulk_limit = max(1, int(self.concurrency * share))
+        self._lanes: Dict[int, Deque[Dict[str, Any]]] = {priority: deque() for priority in LANE_NAMES}
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._busy_recipients: Set[str] = set()
+        self._bulk_in_flight = 0
+        self._senders: List[asyncio.Task] = []
+        self._changed: Optional[asyncio.Condition] = None
+        self._accepting = False
+
+    def start(self):
+        """Start the sender tasks (needs the running event loop; idempotent)"""
+        if self._senders:
+            return
+        self._changed = asyncio.Condition()
+        self._accepting = True
+        self._senders = [asyncio.create_task(self._sender(i)) for i in range(self.concurrency)]
+        logger.info(f"Outbound scheduler started ({self.concurrency} senders, {self.rate}/s per number)")
+
+    def _bucket(self, phone_number_id: str) -> TokenBucket:
+        bucket = self._buckets.get(phone_number_id)
+        if bucket is None:
+            bucket = self._buckets[phone_number_id] = TokenBucket(self.rate, self.burst)
+        return bucket
+
+    def _record_depth(self):
+        for priority, lane in self._lanes.items():
+            metrics.set_gauge('outbound_queue_depth', len(lane), lane=LANE_NAMES[priority])
+
+    async def send(
+        self,
+        phone_number_id: str,
+        to_phone: str,
+        payload: Dict[str, Any],
+        priority: int = PRIORITY_REPLY
+    ) -> httpx.Response:
+        """
+        Queue a Graph API message send and wait for its response
+
+        Args:
+            phone_number_id: Business number sending the message (the rate-limited unit)
+            to_phone: Recipient - sends to one recipient go out in submission order per lane
+            payload: Graph API /messages body
+            priority: PRIORITY_REPLY, PRIORITY_TRANSACTIONAL or PRIORITY_BULK
+
+        Returns:
+            The Graph API response (a 429 only after WHATSAPP_HTTP_MAX_RETRIES re-queues)
+
+        Raises:
+            RuntimeError: When the scheduler is shutting down
+            httpx.HTTPError: When the request failed without a response
+        """
+        if not self._senders:
+            # Scripts that never ran the app's startup hook
+            self.start()
+        if not self._accepting:
+            raise RuntimeError("Outbound scheduler is shutting down")
+
+        job = {
+            'phone_number_id': phone_number_id,
+            'to': to_phone,
+            'payload': payload,
+            'priority': priority,
+            'attempts': 0,
+            'queued_at': time.monotonic(),
+            'future': asyncio.get_running_loop().create_future()
+        }
+        async with self._changed:
+            self._lanes[priority].append(job)
+            self._record_depth()
+            self._changed.notify()
+        return await job['future']
+
+    def _take_job(self) -> Optional[Dict[str, Any]]:
+        """Highest-priority queued job whose recipient has nothing in flight"""
+        for priority, lane in self._lanes.items():
+            if priority == PRIORITY_BULK and self._bulk_in_flight >= self.bulk_limit:
+                continue
+            for index, job in enumerate(lane):
+                if job['to'] in self._busy_recipients:
+                    # Its earlier message is still going out - don't overtake it
+                    continue
+                del lane[index]
+                self._busy_recipients.add(job['to'])
+                if priority == PRIORITY_BULK:
+                    self._bulk_in_flight += 1
+                self._record_depth()
+                return job
+        return None
+
+    async def _release(self, job: Dict[str, Any], requeue: bool = False):
+        async with self._changed:
+            self._busy_recipients.discard(job['to'])
+            if job['priority'] == PRIORITY_BULK:
+                self._bulk_in_flight -= 1
+            if requeue:
+                # Back to the head of its lane so the recipient's order holds
+                self._lanes[job['priority']].appendleft(job)
+                self._record_depth()
+            self._changed.notify_all()
+
+    async def _sender(self, index: int):
+        while True:
+            async with self._changed:
+                job = self._take_job()
+                while job is None:
+                    await self._changed.wait()
+                    job = self._take_job()
+
+            lane = LANE_NAMES[job['priority']]
+            bucket = self._bucket(job['phone_number_id'])
+            requeue = False
+            try:
+                await bucket.acquire(job['priority'])
+                metrics.observe('outbound_queue_wait_seconds', time.monotonic() - job['queued_at'], lane=lane)
+                job['attempts'] += 1
+                response = await graph_client.post(
+                    f"/{job['phone_number_id']}/messages", job['payload'], retry_throttled=False
+                )
+
+                if response.status_code == 429 and job['attempts'] <= settings.WHATSAPP_HTTP_MAX_RETRIES:
+                    # Throughput limit is per number - slow every send from it, not just this one
+                    retry_after = self._retry_after(response)
+                    bucket.pause(retry_after)
+                    metrics.inc('outbound_throttled_total')
+                    logger.warning(f"Graph API throttled {job['phone_number_id']} - pausing sends for {retry_after}s")
+                    requeue = True
+                else:
+                    metrics.inc('outbound_sent_total', lane=lane, status=str(response.status_code))
+                    metrics.observe('outbound_send_seconds', time.monotonic() - job['queued_at'], lane=lane)
+                    job['future'].set_result(response)
+            except asyncio.CancelledError:
+                if not job['future'].done():
+                    job['future'].set_exception(RuntimeError("Outbound scheduler stopped"))
+                raise
+            except Exception as e:
+                metrics.inc('outbound_sent_total', lane=lane, status='error')
+                logger.error(f"Outbound sender {index} failed sending to {job['to']}: {e}")
+                if not job['future'].done():
+                    job['future'].set_exception(e)
+            finally:
+                await self._release(job, requeue=requeue)
+
+    @staticmethod
+    def _retry_after(response: httpx.Response) -> float:
+        try:
+            return float(response.headers.get("Retry-After", DEFAULT_RETRY_AFTER_SECONDS))
+        except ValueError:
+            return DEFAULT_RETRY_AFTER_SECONDS
+
+    async def drain(self, timeout: float):
+        """Stop accepting sends, flush the queued ones for up to timeout seconds, then stop the senders"""
+        if not self._senders:
+            return
+        self._accepting = False
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline and (any(self._lanes.values()) or self._busy_recipients):
+            await asyncio.sleep(0.05)
+
+        for lane in self._lanes.values():
+            while lane:
+                job = lane.popleft()
+                if not job['future'].done():
+                    job['future'].set_exception(RuntimeError("Outbound scheduler stopped"))
+        for task in self._senders:
+            task.cancel()
+        await asyncio.gather(*self._senders, return_exceptions=True)
+        self._senders = []
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'queued': {LANE_NAMES[p]: len(lane) for p, lane in self._lanes.items()},
+            'in_flight': len(self._busy_recipients),
+            'bulk_in_flight': self._bulk_in_flight,
+            'senders': len(self._senders),
+            'numbers': {
+                number: {'tokens': round(bucket.tokens, 2), 'paused': bucket.paused_until > time.monotonic()}
+                for number, bucket in self._buckets.items()
+            }
+        }
+
+
+# Global outbound scheduler - all WhatsApp sends share the per-number budget
+outbound_scheduler = OutboundScheduler()
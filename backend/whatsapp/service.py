@@ -4,9 +4,9 @@ Handles WhatsApp message sending via Meta WhatsApp Business API
 """
 
 import logging
-import requests
 from typing import Dict, Any, Optional
 from app.config import settings
+from whatsapp.outbound import PRIORITY_REPLY, PRIORITY_TRANSACTIONAL, outbound_scheduler
 
 logger = logging.getLogger(__name__)
 
@@ -19,19 +19,20 @@ class WhatsAppService:
         try:
             self.access_token = settings.WHATSAPP_ACCESS_TOKEN
             self.phone_number_id = settings.WHATSAPP_PHONE_NUMBER_ID
-            self.api_url = f"https://graph.facebook.com/v22.0/{self.phone_number_id}/messages"
             logger.info("WhatsApp Service initialized with Meta Business API")
         except Exception as e:
             logger.error(f"Failed to initialize Meta WhatsApp client: {e}")
             raise
     
-    async def send_message(self, to_phone: str, message: str) -> Dict[str, Any]:
+    async def send_message(self, to_phone: str, message: str, priority: int = PRIORITY_REPLY) -> Dict[str, Any]:
         """
         Send WhatsApp message via Meta Business API
         
         Args:
             to_phone: Recipient phone number
             message: Message text to send
+            priority: Outbound lane - PRIORITY_REPLY for conversation replies,
+                PRIORITY_TRANSACTIONAL / PRIORITY_BULK for notifications
             
         Returns:
             Dict with send result
@@ -49,17 +50,8 @@ class WhatsAppService:
                 }
             }
             
-            # Send message via Meta API
-            headers = {
-                "Authorization": f"Bearer {self.access_token}",
-                "Content-Type": "application/json"
-            }
-            
-            response = requests.post(
-                self.api_url,
-                json=message_data,
-                headers=headers
-            )
+            # Send message via Meta API - paced per number, replies ahead of notifications
+            response = await outbound_scheduler.send(self.phone_number_id, to_phone, message_data, priority)
             
             if response.status_code == 200:
                 result_data = response.json()
@@ -111,7 +103,7 @@ Customer: {booking_data.get('customer_name', 'N/A')}
 Thank you for using BookForMe!
             """.strip()
             
-            return await self.send_message(phone, message)
+            return await self.send_message(phone, message, priority=PRIORITY_TRANSACTIONAL)
             
         except Exception as e:
             logger.error(f"Failed to send booking confirmation: {e}")
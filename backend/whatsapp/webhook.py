@@ -3,10 +3,16 @@ WhatsApp Webhook Handler
 Handles incoming WhatsApp messages via Twilio webhook
 """
 
+import asyncio
 import logging
+import time
 from typing import Dict, Any
 from fastapi import Request
+from app.metrics import metrics
+from whatsapp.actor import ConversationActors
 from whatsapp.agent import WhatsAppAgent
+from whatsapp.dedup import create_seen_store, is_duplicate
+from whatsapp.inbound_queue import InProcessQueue
 from whatsapp.service import WhatsAppService
 
 logger = logging.getLogger(__name__)
@@ -19,8 +25,53 @@ class WhatsAppWebhookHandler:
         """Initialize webhook handler"""
         self.whatsapp_agent = WhatsAppAgent()
         self.whatsapp_service = WhatsAppService()
+        # One in-order actor per phone; bursts become a single turn
+        self.actors = ConversationActors(self.handle_turn)
+        # Webhooks only enqueue; workers feed the actors off the request path
+        self.queue = InProcessQueue()
+        # Meta redelivers webhooks - message ids already taken are acknowledged and dropped
+        self.seen = create_seen_store()
         logger.info("WhatsApp Webhook Handler initialized")
     
+    def start(self):
+        """Start the background workers (needs the running event loop)"""
+        self.queue.start(self.process_queued)
+    
+    async def process_queued(self, message: Dict[str, Any]) -> asyncio.Future:
+        """
+        Queue worker entry point: drop the message in its phone's mailbox (the actor runs the turn)
+
+        Returns the actor's future, so the message holds queue capacity until its turn is done
+        """
+        return self.actors.post(message['phone_number'], message['text'], message['enqueued_at'])
+    
+    async def drain(self, timeout: float):
+        """Shutdown: stop intake, then let queued messages and their turns finish within timeout seconds"""
+        deadline = time.monotonic() + timeout
+        await self.queue.drain(timeout)
+        await self.actors.drain(max(deadline - time.monotonic(), 0.0))
+    
+    async def handle_turn(self, phone_number: str, text: str) -> Dict[str, Any]:
+        """
+        Run one agent turn and send the reply (called by the phone's actor)
+        
+        Args:
+            phone_number: Customer's phone number
+            text: Message text - several newline-joined messages for a coalesced burst
+            
+        Returns:
+            Dict with success and, on failure, error
+        """
+        response_text = await self.whatsapp_agent.process_message(phone_number, text)
+        
+        send_result = await self.whatsapp_service.send_message(phone_number, response_text)
+        
+        if send_result['success']:
+            logger.info(f"✅ Response sent successfully to {phone_number}")
+        else:
+            logger.error(f"❌ Failed to send response: {send_result['error']}")
+        return send_result
+    
     async def handle_webhook(self, request: Request) -> Dict[str, Any]:
         """
         Handle incoming WhatsApp webhook
@@ -29,67 +80,62 @@ class WhatsAppWebhookHandler:
             request: FastAPI request object
             
         Returns:
-            Response for Twilio
+            Acknowledgement with queued / status / skipped counts
+            (status 'busy' when the queue rejected part of the batch)
         """
         try:
             # Parse JSON data from Meta API
             data = await request.json()
             
             # Debug: Log the received data
-            logger.info(f"📥 Received webhook data: {data}")
+            logger.debug(f"📥 Received webhook data: {data}")
             
-            # Initialize variables
-            phone_number = None
-            incoming_msg = None
-            
-            # Extract message data from Meta webhook format
-            if 'entry' in data and len(data['entry']) > 0:
-                entry = data['entry'][0]
-                if 'changes' in entry and len(entry['changes']) > 0:
-                    change = entry['changes'][0]
-                    if 'value' in change and 'messages' in change['value']:
-                        messages = change['value']['messages']
-                        if len(messages) > 0:
-                            message = messages[0]
-                            incoming_msg = message.get('text', {}).get('body', '').strip()
-                            phone_number = message.get('from', '')
-                            
-                            logger.info(f"📱 Received WhatsApp message from {phone_number}: {incoming_msg}")
+            # Meta batches several messages (and senders) per delivery under load - walk all of them.
+            # Messages are enqueued in delivery order; the actors keep each sender in order
+            # while different senders run concurrently.
+            queued = 0
+            rejected = 0
+            statuses = 0
+            skipped = 0
+            duplicates = 0
+            for entry in data.get('entry') or []:
+                for change in entry.get('changes') or []:
+                    value = change.get('value') or {}
+                    
+                    for status in value.get('statuses') or []:
+                        self._record_status(status)
+                        statuses += 1
+                    
+                    for message in value.get('messages') or []:
+                        phone_number = message.get('from', '')
+                        incoming_msg = (message.get('text') or {}).get('body', '').strip()
+                        if not phone_number or not incoming_msg:
+                            metrics.inc('whatsapp_messages_skipped_total', type=message.get('type', 'unknown'))
+                            skipped += 1
+                            continue
+                        
+                        message_id = message.get('id')
+                        if await is_duplicate(self.seen, message_id):
+                            logger.info(f"🔁 Duplicate delivery of {message_id} from {phone_number} - ignored")
+                            duplicates += 1
+                            continue
+                        
+                        logger.info(f"📱 Received WhatsApp message from {phone_number}: {incoming_msg}")
+                        # Acknowledge now - the agent turn and the reply happen in the background
+                        if self.queue.enqueue({'phone_number': phone_number, 'text': incoming_msg, 'message_id': message_id}):
+                            queued += 1
                         else:
-                            logger.info("No messages in webhook data")
-                            return {"status": "success", "message": "No messages to process"}
-                    else:
-                        logger.info("No message data in webhook")
-                        return {"status": "success", "message": "No message data"}
-                else:
-                    logger.info("No changes in webhook data")
-                    return {"status": "success", "message": "No changes"}
-            else:
-                logger.info("No entry in webhook data")
-                return {"status": "success", "message": "No entry"}
-            
-            # Only process if we have valid message data
-            if not phone_number or not incoming_msg:
-                logger.info("No valid message data to process")
-                return {"status": "success", "message": "No valid message data"}
+                            rejected += 1
+                            # Not processed - Meta's redelivery must not look like a duplicate
+                            if message_id:
+                                await self.seen.release(message_id)
             
-            # Process message through WhatsApp agent
-            response_text = await self.whatsapp_agent.process_message(phone_number, incoming_msg)
+            result = {"queued": queued, "statuses": statuses, "skipped": skipped, "duplicates": duplicates}
+            if rejected:
+                # Part of the batch was not accepted - let Meta redeliver it
+                return {"status": "busy", "message": "Inbound queue full - retry later", "rejected": rejected, **result}
             
-            # Send response via WhatsApp service
-            send_result = await self.whatsapp_service.send_message(phone_number, response_text)
-            
-            if send_result['success']:
-                logger.info(f"✅ Response sent successfully to {phone_number}")
-            else:
-                logger.error(f"❌ Failed to send response: {send_result['error']}")
-            
-            return {
-                "status": "success",
-                "message": "Webhook processed",
-                "phone_number": phone_number,
-                "response_sent": send_result['success']
-            }
+            return {"status": "success", "message": "Webhook accepted", **result}
             
         except Exception as e:
             logger.error(f"❌ Webhook processing failed: {e}")
@@ -97,6 +143,18 @@ class WhatsAppWebhookHandler:
             logger.error(f"❌ Traceback: {traceback.format_exc()}")
             return {
                 "status": "error",
-                "message": str(e),
-                "phone_number": phone_number if 'phone_number' in locals() else "unknown"
+                "message": str(e)
             }
+    
+    def _record_status(self, status: Dict[str, Any]):
+        """
+        Count a delivery status callback (sent / delivered / read / failed) - no agent involved
+        
+        Args:
+            status: One entry of value['statuses']
+        """
+        state = status.get('status', 'unknown')
+        metrics.inc('whatsapp_status_total', status=state)
+        if state == 'failed':
+            errors = [error.get('title') or error.get('code') for error in status.get('errors') or []]
+            logger.warning(f"❌ Delivery of {status.get('id')} to {status.get('recipient_id')} failed: {errors}")